@@ -0,0 +1,249 @@
+"""
+Benchmark: AST memory and code-generation time for the original dict-based
+sil_ast classes vs. __slots__ nodes, with and without node interning.
+
+The workload is an N x N matrix multiply unrolled into dot products,
+c_i_j = a_i_0 * b_0_j + a_i_1 * b_1_j + ..., so the same identifiers
+appear N times each.
+
+Each representation is measured in a fresh interpreter, so heap growth
+from one measurement does not skew the next.
+
+Usage:
+    python benchmarks/bench_ast_nodes.py [--n 64]
+"""
+
+import argparse
+import contextlib
+import gc
+import hashlib
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+# === Original node classes (one __dict__ per instance) ===
+
+class VarDecl:
+    def __init__(self, name, var_type, value):
+        self.name = name
+        self.var_type = var_type
+        self.value = value
+
+class ConstDecl:
+    def __init__(self, name, const_type, value):
+        self.name = name
+        self.const_type = const_type
+        self.value = value
+
+class Param:
+    def __init__(self, name, param_type):
+        self.name = name
+        self.param_type = param_type
+
+class Kernel:
+    def __init__(self, name, params, return_type, body):
+        self.name = name
+        self.params = params
+        self.return_type = return_type
+        self.body = body
+
+class Return:
+    def __init__(self, value=None):
+        self.value = value
+
+class Assign:
+    def __init__(self, target, value):
+        self.target = target
+        self.value = value
+
+class If:
+    def __init__(self, condition, then_body, else_body=None):
+        self.condition = condition
+        self.then_body = then_body
+        self.else_body = else_body
+
+class Loop:
+    def __init__(self, body):
+        self.body = body
+
+class Break:
+    pass
+
+class Continue:
+    pass
+
+class BinaryOp:
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+class UnaryOp:
+    def __init__(self, op, expr):
+        self.op = op
+        self.expr = expr
+
+class Literal:
+    def __init__(self, value):
+        self.value = value
+
+class Ident:
+    def __init__(self, name):
+        self.name = name
+
+class CpuBlock:
+    def __init__(self, code):
+        self.code = code
+
+class BitwiseExpr:
+    def __init__(self, expr):
+        self.expr = expr
+
+class CastExpr:
+    def __init__(self, expr, target_type):
+        self.expr = expr
+        self.target_type = target_type
+
+class Dereference:
+    def __init__(self, expr):
+        self.expr = expr
+
+class AddressOf:
+    def __init__(self, expr):
+        self.expr = expr
+
+
+LEGACY_CLASSES = {
+    cls.__name__: cls for cls in (
+        VarDecl, ConstDecl, Param, Kernel, Return, Assign, If, Loop, Break,
+        Continue, BinaryOp, UnaryOp, Literal, Ident, CpuBlock, BitwiseExpr,
+        CastExpr, Dereference, AddressOf,
+    )
+}
+
+
+class LegacyNodeFactory:
+    Literal = Literal
+    Ident = Ident
+    BinaryOp = BinaryOp
+    UnaryOp = UnaryOp
+    Dereference = Dereference
+    AddressOf = AddressOf
+    BitwiseExpr = BitwiseExpr
+    CastExpr = CastExpr
+
+
+@contextlib.contextmanager
+def legacy_nodes():
+    """Swaps the original classes into sil_ast, where parser and generator look them up."""
+    saved = {name: getattr(sil_ast, name) for name in LEGACY_CLASSES}
+    for name, cls in LEGACY_CLASSES.items():
+        setattr(sil_ast, name, cls)
+    try:
+        yield
+    finally:
+        for name, cls in saved.items():
+            setattr(sil_ast, name, cls)
+
+
+# === Workload ===
+
+def matmul_source(n):
+    params = ", ".join(
+        f"{name}_{i}_{j}: uint" for name in ("a", "b", "c") for i in range(n) for j in range(n)
+    )
+    body = "\n".join(
+        f"c_{i}_{j} = " + " + ".join(f"a_{i}_{k} * b_{k}_{j}" for k in range(n)) + ";"
+        for i in range(n) for j in range(n)
+    )
+    return f"kernel matmul({params}) {{\n{body}\n}}\n"
+
+
+def count_nodes(ast):
+    """Returns (nodes in the tree, distinct node objects)."""
+    total = 0
+    seen = set()
+    stack = list(ast)
+    while stack:
+        node = stack.pop()
+        total += 1
+        seen.add(id(node))
+        for name in ("left", "right", "expr", "target", "value"):
+            child = getattr(node, name, None)
+            if child is not None and not isinstance(child, (int, float, str)):
+                stack.append(child)
+        stack.extend(getattr(node, "body", ()))
+    return total, len(seen)
+
+
+MODES = {
+    "dict (original)": LegacyNodeFactory,
+    "__slots__": sil_ast.NodeFactory,
+    "slots + leaf interning": sil_ast.InterningNodeFactory,
+    "slots + hash-consing": lambda: sil_ast.InterningNodeFactory(hash_cons=True),
+}
+
+
+def measure(mode, src, runs):
+    """Prints one result row and returns a digest of the generated SPIR-V."""
+    legacy = mode == "dict (original)"
+    with legacy_nodes() if legacy else contextlib.nullcontext():
+        gc.collect()
+        tracemalloc.start()
+        ast = parser.Parser(lexer.iter_tokens(src), MODES[mode]()).parse()
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        total, distinct = count_nodes(ast)
+        best = float("inf")
+        for _ in range(runs):
+            gc.collect()
+            start = time.perf_counter()
+            spirv = generator.Generator().generate(ast)
+            best = min(best, time.perf_counter() - start)
+
+    print(f"{mode:<22} {distinct:>9} {retained / 2**20:9.1f} MB "
+          f"{retained / total * 1e6 / 2**20:10.1f} MB {best:9.2f} s")
+    return hashlib.sha256(spirv.encode()).hexdigest()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--n", type=int, default=64, help="matrix side length")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--mode", choices=list(MODES), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    src = matmul_source(args.n)
+    if args.mode:
+        print(measure(args.mode, src, args.runs))
+        return
+
+    total, _ = count_nodes(parser.Parser(lexer.iter_tokens(src)).parse())
+    print(f"{args.n}x{args.n} matmul: {total} AST nodes")
+    print(f"{'':<22} {'objects':>9} {'AST':>12} {'per 1M nodes':>13} {'generate':>9}")
+
+    digests = set()
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, __file__, "--n", str(args.n), "--runs", str(args.runs), "--mode", mode],
+            capture_output=True, text=True, check=True,
+        ).stdout.splitlines()
+        print(out[0])
+        digests.add(out[1])
+    if len(digests) != 1:
+        raise SystemExit("node representations generated different SPIR-V")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: in-process binary encoding (generator.binary.encode) against
+writing the assembly to disk and running spirv-as on it.
+
+For every program under sil_tests/ and the unrolled workloads of
+bench_generator.py, reports the size of the binary module and the time to
+turn the generated module into it:
+- encode: encode(module).tobytes()
+- spirv-as: module.text() written to a .spvasm file, spirv-as run on it
+  and the .spv file read back, as main.py used to do (only if spirv-as is
+  on the PATH)
+
+When spirv-as is available, both binaries are also checked to be equal
+word for word, apart from the generator word of the header.
+
+Usage:
+    python benchmarks/bench_binary.py [--sizes 8 16] [--repeat 5]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from bench_generator import WORKLOADS  # noqa: E402
+from generator import generator  # noqa: E402
+from generator.binary import encode  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def module_of(src):
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse()))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    return generator.Generator().generate_module(kernels) if kernels else None
+
+
+def encode_time(module, repeat):
+    """Best time of encode(module).tobytes(), and the binary."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        binary = encode(module).tobytes()
+        best = min(best, time.perf_counter() - start)
+    return best, binary
+
+
+def assembler_time(module, repeat, tmp):
+    """Best time of the .spvasm → spirv-as → .spv round trip, and the binary."""
+    asm_path = os.path.join(tmp, "bench.spvasm")
+    spv_path = os.path.join(tmp, "bench.spv")
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(asm_path, "w") as f:
+            f.write(module.text())
+        subprocess.run(["spirv-as", asm_path, "-o", spv_path], check=True)
+        with open(spv_path, "rb") as f:
+            binary = f.read()
+        best = min(best, time.perf_counter() - start)
+    return best, binary
+
+
+def same_words(a, b):
+    # Word 2 of the header names the generator, which differs by design
+    return len(a) == len(b) and a[:8] == b[:8] and a[12:] == b[12:]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[8, 16])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            programs.append((f"{workload} N={n}", source(n)))
+
+    has_assembler = shutil.which("spirv-as") is not None
+    if not has_assembler:
+        print("spirv-as not found: timing the in-process encoder only\n")
+
+    print(f"{'program':<24} {'bytes':>8} {'encode':>10} {'spirv-as':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, source in programs:
+            module = module_of(source)
+            if module is None:
+                continue
+            seconds, binary = encode_time(module, args.repeat)
+            line = f"{name:<24} {len(binary):>8} {seconds * 1e3:8.2f}ms"
+            if has_assembler:
+                asm_seconds, asm_binary = assembler_time(module, args.repeat, tmp)
+                line += f" {asm_seconds * 1e3:8.2f}ms"
+                if not same_words(binary, asm_binary):
+                    line += "  (binaries differ)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: local value numbering (Generator(cse=True)) against the
+generator without it.
+
+Counts SPIR-V instructions per kernel on every program under sil_tests/
+and on unrolled workloads:
+- matmul: c[i][j] = c[i][j] + a[i][k] * b[k][j] unrolled over N x N
+  buffers, where each c[i][j] is read back right after it is written
+- stencil: out[i] = (x[i-1] + x[i] + x[i+1]) * (x[i-1] + x[i] + x[i+1])
+  over a local array, the same sums written twice per statement
+
+With --run, every workload kernel is also assembled with spirv-as and
+timed on the first OpenCL device (needs pyopencl, numpy and spirv-as).
+
+Usage:
+    python benchmarks/bench_cse.py [--sizes 4 8 16] [--run] [--repeat 20]
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def matmul_source(n):
+    return (
+        f"kernel matmul(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        f"            for k in range(0, {n}):\n"
+        "                c[i][j] = c[i][j] + a[i][k] * b[k][j];\n"
+        "}\n"
+    )
+
+
+def stencil_source(n):
+    return (
+        f"kernel stencil(inp: uint = array[{n + 2}], out: uint = array[{n}]) {{\n"
+        f"    var x: uint = array[{n + 2}];\n"
+        f"    for i in range(0, {n + 2}):\n"
+        "        x[i] = inp[i];\n"
+        f"    for i in range(1, {n + 1}):\n"
+        "        out[i - 1] = (x[i - 1] + x[i] + x[i + 1]) * (x[i - 1] + x[i] + x[i + 1]);\n"
+        "}\n"
+    )
+
+
+WORKLOADS = {"matmul": matmul_source, "stencil": stencil_source}
+
+
+def compile_program(src, cse):
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse()))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    return generator.Generator(cse=cse).generate(kernels), kernels
+
+
+def function_instructions(spirv):
+    """Number of instructions between OpFunction and OpFunctionEnd, over all kernels."""
+    count = 0
+    inside = False
+    for line in spirv.splitlines():
+        if " = OpFunction " in line:
+            inside = True
+        if inside:
+            count += 1
+        if line == "OpFunctionEnd":
+            inside = False
+    return count
+
+
+def device_time(spirv, kernel, repeat):
+    """Best wall time of one launch of `kernel`, with zeroed buffers for its arguments."""
+    import numpy as np
+    from runtime.host import HostRuntime
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_path = os.path.join(tmp, "bench.spvasm")
+        spv_path = os.path.join(tmp, "bench.spv")
+        with open(asm_path, "w") as f:
+            f.write(spirv)
+        subprocess.run(["spirv-as", asm_path, "-o", spv_path], check=True)
+        rt = HostRuntime()
+        rt.load_spirv(spv_path)
+
+    buffers = []
+    for p in kernel.params:
+        size = 1
+        for d in p.dims or ():
+            size *= d
+        dtype = np.float32 if p.param_type == "float" else np.uint32
+        buffers.append(rt.upload_array(np.zeros(size), dtype))
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rt.run(kernel.name, *buffers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[4, 8, 16])
+    ap.add_argument("--run", action="store_true", help="also time the workloads on the device")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(root, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.basename(path), f.read(), False))
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            programs.append((f"{workload} N={n}", source(n), True))
+
+    header = f"{'program':<20} {'no cse':>8} {'cse':>8} {'saved':>7}"
+    if args.run:
+        header += f" {'no cse':>10} {'cse':>10}"
+    print(header)
+
+    for name, src, timed in programs:
+        plain, kernels = compile_program(src, False)
+        numbered, _ = compile_program(src, True)
+        before, after = function_instructions(plain), function_instructions(numbered)
+        line = f"{name:<20} {before:>8} {after:>8} {(before - after) / before:6.0%}"
+        if args.run and timed:
+            line += (f" {device_time(plain, kernels[0], args.repeat) * 1e3:8.3f}ms"
+                     f" {device_time(numbered, kernels[0], args.repeat) * 1e3:8.3f}ms")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark: dead code elimination (Generator(dce=True)) against the
+generator without it. Both sides run mem2reg and value numbering.
+
+Reports, per program, the instructions inside its kernels, the size of
+the whole module (lines and bytes of assembly) and the time to generate
+it, on every program under sil_tests/ and on workloads that leave dead
+code behind:
+- matmul: the unrolled c[i][j] = c[i][j] + a[i][k] * b[k][j] over N x N
+  buffers, where every store to c[i][j] but the last is overwritten
+- early_exit: N guarded `return`s and loops ending in `break`, each
+  followed by statements that never run, and locals only written
+
+If spirv-as is on the PATH, the size of the binary module and the time to
+assemble it are reported too. With --run, the time the OpenCL driver
+takes to build the binary is measured as well (needs pyopencl and numpy).
+
+Usage:
+    python benchmarks/bench_dce.py [--sizes 4 16] [--run] [--repeat 5]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def matmul_source(n):
+    return (
+        f"kernel matmul(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        f"            for k in range(0, {n}):\n"
+        "                c[i][j] = c[i][j] + a[i][k] * b[k][j];\n"
+        "}\n"
+    )
+
+
+def early_exit_source(n):
+    lines = ["kernel early_exit(out: uint = array[2], n: uint) {",
+             "    var i: uint = 0;",
+             "    var trace: uint = 0;"]
+    for step in range(n):
+        lines += [
+            "    loop {",
+            f"        i = i + {step};",
+            f"        trace = trace + i * {step};",
+            "        break;",
+            "        i = i * 2;",
+            "    }",
+            f"    if (i > n + {step}) {{",
+            "        out[0] = i;",
+            "        return;",
+            "        out[1] = i;",
+            "    }",
+        ]
+    lines += ["    out[0] = i;", "}"]
+    return "\n".join(lines) + "\n"
+
+
+WORKLOADS = {"matmul": matmul_source, "early_exit": early_exit_source}
+
+
+def compile_program(src, dce):
+    """Returns (SPIR-V assembly, seconds spent in the generator)."""
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse()))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    start = time.perf_counter()
+    spirv = generator.Generator(dce=dce).generate(kernels)
+    return spirv, time.perf_counter() - start
+
+
+def function_instructions(spirv):
+    """Number of instructions between OpFunction and OpFunctionEnd, over all kernels."""
+    count = 0
+    inside = False
+    for line in spirv.splitlines():
+        if " = OpFunction " in line:
+            inside = True
+        if inside:
+            count += 1
+        if line == "OpFunctionEnd":
+            inside = False
+    return count
+
+
+def assemble(spirv, tmp):
+    """Assembles with spirv-as; returns (binary path, seconds)."""
+    asm_path = os.path.join(tmp, "bench.spvasm")
+    spv_path = os.path.join(tmp, "bench.spv")
+    with open(asm_path, "w") as f:
+        f.write(spirv)
+    start = time.perf_counter()
+    subprocess.run(["spirv-as", asm_path, "-o", spv_path], check=True)
+    return spv_path, time.perf_counter() - start
+
+
+def driver_build_time(spv_path, repeat):
+    """Best time of building the binary with the first OpenCL device's compiler."""
+    from runtime.host import HostRuntime
+
+    rt = HostRuntime()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rt.load_spirv(spv_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[4, 16])
+    ap.add_argument("--run", action="store_true", help="also time the driver's build of each module")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    has_assembler = shutil.which("spirv-as") is not None
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(root, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.basename(path), f.read()))
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            programs.append((f"{workload} N={n}", source(n)))
+
+    columns = ["instructions", "lines", "bytes", "generate"]
+    if has_assembler:
+        columns += ["binary", "assemble"]
+        if args.run:
+            columns += ["build"]
+    print(f"{'program':<18}" + "".join(f" {c:>22}" for c in columns))
+
+    totals = {}
+    for name, src in programs:
+        row = {}
+        for dce in (False, True):
+            spirv, seconds = compile_program(src, dce)
+            values = {
+                "instructions": function_instructions(spirv),
+                "lines": spirv.count("\n") + 1,
+                "bytes": len(spirv.encode()),
+                "generate": seconds * 1e3,
+            }
+            if has_assembler:
+                with tempfile.TemporaryDirectory() as tmp:
+                    spv_path, seconds = assemble(spirv, tmp)
+                    values["binary"] = os.path.getsize(spv_path)
+                    values["assemble"] = seconds * 1e3
+                    if args.run:
+                        values["build"] = driver_build_time(spv_path, args.repeat) * 1e3
+            for column, value in values.items():
+                row.setdefault(column, []).append(value)
+                totals.setdefault(column, [0, 0])[dce] += value
+
+        cells = []
+        for column in columns:
+            before, after = row[column]
+            if column in ("generate", "assemble", "build"):
+                cells.append(f"{before:.2f} -> {after:.2f}ms")
+            else:
+                cells.append(f"{before} -> {after}")
+        print(f"{name:<18}" + "".join(f" {cell:>22}" for cell in cells))
+
+    print("\ntotal, with dce against without:")
+    for column in columns:
+        before, after = totals[column]
+        print(f"  {column:<13} {before:12.2f} -> {after:12.2f} ({(after - before) / before:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Benchmark: parse throughput of the table-driven expression parser vs.
+the original seven-level recursive descent, on long unrolled arithmetic
+statements.
+
+Usage:
+    python benchmarks/bench_expression_parser.py [--statements 20000]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import sil_ast  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+# --- The original recursive-descent expression grammar, verbatim ---
+
+# === Logical / Binary Expressions (precedence-aware) ===
+
+def legacy_parse_logical_or(self):
+    """
+    Parses logical OR expressions (left-associative).
+    Example: a || b || c
+    """
+    left = self.parse_logical_and()
+    while self.peek() == '||':
+        op = self.next()
+        right = self.parse_logical_and()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_logical_and(self):
+    """
+    Parses logical AND expressions.
+    Example: a && b && c
+    """
+    left = self.parse_equality()
+    while self.peek() == '&&':
+        op = self.next()
+        right = self.parse_equality()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_equality(self):
+    """
+    Parses equality and inequality expressions.
+    Example: a == b, a != b
+    """
+    left = self.parse_relational()
+    while self.peek() in ['==', '!=']:
+        op = self.next()
+        right = self.parse_relational()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_relational(self):
+    """
+    Parses relational expressions.
+    Example: a < b, a >= c
+    """
+    left = self.parse_additive()
+    while self.peek() in ['<', '>', '<=', '>=']:
+        op = self.next()
+        right = self.parse_additive()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_additive(self):
+    """
+    Parses addition and subtraction.
+    Example: a + b - c
+    """
+    left = self.parse_multiplicative()
+    while self.peek() in ['+', '-']:
+        op = self.next()
+        right = self.parse_multiplicative()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_multiplicative(self):
+    """
+    Parses multiplication, division, floor-division and modulo.
+    Example: a * b / c % d
+    """
+    left = self.parse_unary()
+    while self.peek() in ['*', '/', '//', '%']:
+        op = self.next()
+        right = self.parse_unary()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+# === Unary & Primary Expressions ===
+
+def legacy_parse_unary(self):
+    """
+    Parses unary operators and dereferencing/address-of.
+    Supported: !, -, ~, *, &
+    """
+    tok = self.peek()
+    if tok == '!':
+        self.next()
+        return sil_ast.UnaryOp('!', self.parse_unary())
+    elif tok == '-':
+        self.next()
+        return sil_ast.UnaryOp('-', self.parse_unary())
+    elif tok == '~':
+        self.next()
+        return sil_ast.UnaryOp('~', self.parse_unary())
+    elif tok == '*':
+        self.next()
+        return sil_ast.Dereference(self.parse_unary())
+    elif tok == '&':
+        self.next()
+        return sil_ast.AddressOf(self.parse_unary())
+    else:
+        return self.parse_primary()
+
+
+def legacy_parse_primary(self):
+    """
+    Parses primary expressions:
+    - literals
+    - identifiers
+    - grouped expressions in parentheses
+    - cast and bitwise blocks
+    """
+    tok = self.peek()
+
+    if tok == "bitwise":
+        return self.parse_bitwise_block()
+    if tok == "cast":
+        return self.parse_cast_block()
+    if tok == "(":
+        self.next()
+        expr = self.parse_expression()
+        if self.peek() != ")":
+            raise Exception(f"Expected ')', but found '{self.peek()}'")
+        self.next()
+        return expr
+
+    tok = self.next()
+    if tok is None:
+        raise Exception("Unexpected end of input while parsing expression")
+
+    # Numeric literals: decimal, float, hex
+    if isinstance(tok, str):
+        try:
+            if tok.startswith(("0x", "0X")):
+                return sil_ast.Literal(int(tok, 16))
+            elif '.' in tok:
+                return sil_ast.Literal(float(tok))
+            elif tok.lstrip('-').isdigit():
+                return sil_ast.Literal(int(tok))
+        except ValueError:
+            pass
+
+    # Identifiers
+    if self._is_identifier(tok):
+        return sil_ast.Ident(tok)
+
+    raise Exception(f"Unexpected token in expression: '{tok}'")
+
+
+# === Bitwise Block Expressions ===
+
+def legacy_parse_bitwise_block(self):
+    """
+    Parses a 'bitwise { ... }' block.
+    This block evaluates only bitwise logic (&, |, ^, <<, >>)
+    """
+    self.expect("bitwise")
+    self.expect("{")
+    expr = self.parse_bitwise_expression()
+    self.expect("}")
+    return sil_ast.BitwiseExpr(expr)
+
+
+def legacy_parse_bitwise_expression(self):
+    """
+    Parses a chain of bitwise binary operations.
+    """
+    left = self.parse_bitwise_unary()
+    while self.peek() in ['&', '|', '^', '<<', '>>']:
+        op = self.next()
+        right = self.parse_bitwise_unary()
+        left = sil_ast.BinaryOp(left, op, right)
+    return left
+
+
+def legacy_parse_bitwise_unary(self):
+    """
+    Parses unary ops within a bitwise expression.
+    Supported: ~, -
+    """
+    tok = self.peek()
+    if tok in ['~', '-']:
+        self.next()
+        operand = self.parse_bitwise_unary()
+        return sil_ast.UnaryOp(tok, operand)
+    else:
+        return self.parse_bitwise_primary()
+
+
+def legacy_parse_bitwise_primary(self):
+    """
+    Parses literals and identifiers inside a bitwise block.
+    Supports parentheses to group expressions.
+    """
+    tok = self.peek()
+
+    if tok == "(":
+        self.next()
+        expr = self.parse_bitwise_expression()
+        if self.peek() != ")":
+            raise Exception(f"Expected ')', but found '{self.peek()}'")
+        self.next()
+        return expr
+
+    tok = self.next()
+    if tok is None:
+        raise Exception("Unexpected end of input in bitwise expression")
+
+    if isinstance(tok, str) and tok.isdigit():
+        return sil_ast.Literal(int(tok))
+
+    try:
+        if '.' in tok:
+            return sil_ast.Literal(float(tok))
+        if tok.lstrip('-').isdigit():
+            return sil_ast.Literal(int(tok))
+    except ValueError:
+        pass
+
+    if self._is_identifier(tok):
+        return sil_ast.Ident(tok)
+
+    raise Exception(f"Unexpected token in bitwise expression: '{tok}'")
+
+
+# === Cast Block ===
+
+def legacy_parse_cast_block(self):
+    """
+    Parses a cast block of the form:
+        cast { expression as target_type }
+    """
+    self.expect("cast")
+    self.expect("{")
+    expr = self.parse_expression()
+    self.expect("as")
+    target_type = self.next()
+    self.expect("}")
+    return sil_ast.CastExpr(expr, target_type)
+
+
+class LegacyParser(parser.Parser):
+    """Parser wired to the original one-function-per-precedence-level grammar."""
+
+    def parse_expression(self):
+        return self.parse_logical_or()
+
+    def parse_logical_or(self):
+        return legacy_parse_logical_or(self)
+
+    def parse_logical_and(self):
+        return legacy_parse_logical_and(self)
+
+    def parse_equality(self):
+        return legacy_parse_equality(self)
+
+    def parse_relational(self):
+        return legacy_parse_relational(self)
+
+    def parse_additive(self):
+        return legacy_parse_additive(self)
+
+    def parse_multiplicative(self):
+        return legacy_parse_multiplicative(self)
+
+    def parse_unary(self):
+        return legacy_parse_unary(self)
+
+    def parse_primary(self):
+        return legacy_parse_primary(self)
+
+    def parse_bitwise_block(self):
+        return legacy_parse_bitwise_block(self)
+
+    def parse_bitwise_expression(self):
+        return legacy_parse_bitwise_expression(self)
+
+    def parse_bitwise_unary(self):
+        return legacy_parse_bitwise_unary(self)
+
+    def parse_bitwise_primary(self):
+        return legacy_parse_bitwise_primary(self)
+
+    def parse_cast_block(self):
+        return legacy_parse_cast_block(self)
+
+
+def dump(node):
+    """Structural dump of an AST, independent of node __repr__ coverage."""
+    if isinstance(node, list):
+        return [dump(n) for n in node]
+    if isinstance(node, (str, int, float)) or node is None:
+        return node
+    fields = getattr(node, "__slots__", None) or sorted(vars(node))
+    return (type(node).__name__,) + tuple(dump(getattr(node, f)) for f in fields)
+
+
+_OPS = ['+', '-', '*', '//', '%', '==', '!=', '<', '>', '<=', '>=', '&&', '||']
+
+
+def random_expr(rng, depth=0):
+    r = rng.random()
+    if depth > 3 or r < 0.3:
+        return rng.choice([f"a_{rng.randrange(64)}_{rng.randrange(64)}", str(rng.randrange(100))])
+    if r < 0.4:
+        return f"({random_expr(rng, depth + 1)})"
+    if r < 0.45:
+        return f"!{random_expr(rng, depth + 1)}"
+    if r < 0.5:
+        return f"bitwise{{ x << {rng.randrange(31)} | y >> 2 }}"
+    return f"{random_expr(rng, depth + 1)} {rng.choice(_OPS)} {random_expr(rng, depth + 1)}"
+
+
+def generate_program(statements, seed=0):
+    """Unrolled element-wise and dot-product statements mixed with random expressions."""
+    rng = random.Random(seed)
+    lines = []
+    for k in range(statements):
+        i, j = divmod(k, 64)
+        if k % 4 == 1:
+            terms = " + ".join(f"a_{i % 64}_{t} * b_{t}_{j}" for t in range(16))
+            lines.append(f"    c_{i % 64}_{j} = {terms};")
+        elif k % 4 in (2, 3):
+            lines.append(f"    c_{i % 64}_{j} = a_{i % 64}_{j} * b_{i % 64}_{j};")
+        else:
+            lines.append(f"    acc_{k % 97} = {random_expr(rng)} + {random_expr(rng)} * {random_expr(rng)};")
+    body = "\n".join(lines)
+    return f"kernel unrolled(out: uint) {{\n{body}\n}}\n"
+
+
+def timed_parse(parser_cls, tokens, repeat=3):
+    """Best-of-`repeat` parse time, with no other AST alive while timing."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        parser_cls(tokens).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--statements", type=int, default=20000)
+    args = ap.parse_args()
+
+    src = generate_program(args.statements)
+    tokens = lexer.tokenize(src)
+    print(f"{args.statements} statements, {len(tokens)} tokens")
+
+    t_old = timed_parse(LegacyParser, tokens)
+    t_new = timed_parse(parser.Parser, tokens)
+    if dump(LegacyParser(tokens).parse()) != dump(parser.Parser(tokens).parse()):
+        raise SystemExit("table-driven parser built a different AST")
+
+    print(f"recursive descent {t_old:7.2f} s  {len(tokens) / t_old / 1e3:8.0f} k tokens/s")
+    print(f"table-driven      {t_new:7.2f} s  {len(tokens) / t_new / 1e3:8.0f} k tokens/s")
+    print(f"speedup           {t_old / t_new:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: SPIR-V instructions per kernel with and without constant
+folding (optimizer.fold), on every program under sil_tests/.
+
+Each program goes through the pipeline of main.py (parse, Mini-SIL,
+optionally fold, generate). A kernel's count is the number of instructions
+between its OpFunction and OpFunctionEnd; the module count includes the
+types and constants.
+
+Usage:
+    python benchmarks/bench_fold.py [--arrays minisil|native] [files...]
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def compile_program(src, arrays, fold):
+    ast = parser.Parser(lexer.iter_tokens(src)).parse()
+    if arrays == "minisil":
+        ast = minisil_ast.expand_program(ast)
+    if fold:
+        ast = fold_program(ast)
+    return generator.Generator().generate([n for n in ast if not isinstance(n, sil_ast.CpuBlock)])
+
+
+def count_instructions(spirv):
+    """
+    Returns:
+        tuple: (module instruction count, {kernel name: instruction count})
+    """
+    lines = [ln for ln in spirv.splitlines() if ln and not ln.startswith(";")]
+    names = {}
+    for ln in lines:
+        if ln.startswith("OpEntryPoint"):
+            parts = ln.split()
+            names[parts[2]] = parts[3].strip('"')
+
+    kernels = {}
+    current = None
+    for ln in lines:
+        if " = OpFunction " in ln:
+            current = names[ln.split(" = ")[0]]
+            kernels[current] = 0
+        if current is not None:
+            kernels[current] += 1
+        if ln == "OpFunctionEnd":
+            current = None
+    return len(lines), kernels
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--arrays", choices=["minisil", "native"], default="minisil")
+    ap.add_argument("files", nargs="*")
+    args = ap.parse_args()
+    files = args.files or sorted(glob.glob(os.path.join(root, "sil_tests", "**", "*.sil"), recursive=True))
+
+    print(f"{'kernel':<28} {'before':>7} {'after':>7} {'saved':>7}")
+    totals = [0, 0, 0, 0]
+    for path in files:
+        with open(path, encoding="utf-8") as f:
+            src = f.read()
+        module_before, before = count_instructions(compile_program(src, args.arrays, False))
+        module_after, after = count_instructions(compile_program(src, args.arrays, True))
+        for name, count in before.items():
+            saved = count - after[name]
+            print(f"{name:<28} {count:>7} {after[name]:>7} {saved:>7}")
+            totals[0] += count
+            totals[1] += after[name]
+        totals[2] += module_before
+        totals[3] += module_after
+
+    print(f"{'all kernels':<28} {totals[0]:>7} {totals[1]:>7} {totals[0] - totals[1]:>7}")
+    print(f"{'whole modules':<28} {totals[2]:>7} {totals[3]:>7} {totals[2] - totals[3]:>7}")
+
+
+if __name__ == "__main__":
+    main()
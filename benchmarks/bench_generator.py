@@ -0,0 +1,109 @@
+"""
+Benchmark: generation time of large unrolled kernels.
+
+Times Generator.generate (code generation, every optimization pass and
+the final text) on kernels that unroll into tens of thousands of
+instructions:
+- matmul: c[i][j] = c[i][j] + a[i][k] * b[k][j] over N x N buffers
+- stencil: out[i] = x[i-1] + 2 * x[i] + x[i+1] over a local array of N*N
+- branches: N*N statements each guarded by an if/else
+
+Each kernel is expanded (Mini-SIL) and folded once; only the generator is
+timed, best of --repeat runs, with all passes on and with all off.
+
+Usage:
+    python benchmarks/bench_generator.py [--sizes 8 16] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def matmul_source(n):
+    return (
+        f"kernel matmul(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        f"            for k in range(0, {n}):\n"
+        "                c[i][j] = c[i][j] + a[i][k] * b[k][j];\n"
+        "}\n"
+    )
+
+
+def stencil_source(n):
+    size = n * n
+    return (
+        f"kernel stencil(inp: uint = array[{size + 2}], out: uint = array[{size}]) {{\n"
+        f"    var x: uint = array[{size + 2}];\n"
+        f"    for i in range(0, {size + 2}):\n"
+        "        x[i] = inp[i];\n"
+        f"    for i in range(1, {size + 1}):\n"
+        "        out[i - 1] = x[i - 1] + 2 * x[i] + x[i + 1];\n"
+        "}\n"
+    )
+
+
+def branches_source(n):
+    size = n * n
+    return (
+        f"kernel branches(inp: uint = array[{size}], out: uint = array[{size}], t: uint) {{\n"
+        f"    for i in range(0, {size}):\n"
+        "        if (inp[i] > t) {\n"
+        "            out[i] = inp[i] - t;\n"
+        "        } else {\n"
+        "            out[i] = t // 2;\n"
+        "        }\n"
+        "}\n"
+    )
+
+
+WORKLOADS = {"matmul": matmul_source, "stencil": stencil_source, "branches": branches_source}
+
+NO_PASSES = dict(cse=False, mem2reg=False, dce=False, licm=False, peephole=False)
+
+
+def kernels_of(src):
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse()))
+    return [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+
+
+def generation_time(kernels, options, repeat):
+    """Best time of Generator(**options).generate(kernels), and the size of its output."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        spirv = generator.Generator(**options).generate(kernels)
+        best = min(best, time.perf_counter() - start)
+    return best, spirv.count("\n") + 1
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[8, 16])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'kernel':<16} {'lines':>8} {'no passes':>10} {'lines':>8} {'all passes':>11}")
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            kernels = kernels_of(source(n))
+            plain, plain_lines = generation_time(kernels, NO_PASSES, args.repeat)
+            full, full_lines = generation_time(kernels, {}, args.repeat)
+            print(f"{f'{workload} N={n}':<16} {plain_lines:>8} {plain * 1e3:8.1f}ms"
+                  f" {full_lines:>8} {full * 1e3:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark: regex-based lexer.tokenize vs. the original character-by-character
+tokenizer on generated, MiniSIL-style unrolled sources.
+
+Usage:
+    python benchmarks/bench_lexer.py [--max-mb 50] [--legacy-max-mb 50]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+
+
+def legacy_tokenize(source_code):
+    """The original character-by-character tokenizer, kept for comparison."""
+    tokens = []
+    current = ''
+    specials = {
+        '(', ')', '{', '}', ':', ',', ';', '=', '+', '-', '*',
+        '/', '%', '!', '<', '>', '&', '|', '~', '.'
+    }
+    multi_char_specials = {
+        '->', '==', '!=', '<=', '>=', '&&', '||', '//', '>>', '<<'
+    }
+
+    i = 0
+    while i < len(source_code):
+        if (
+            i + 1 < len(source_code)
+            and source_code[i] == '/'
+            and source_code[i + 1] == '*'
+        ):
+            i += 2
+            while (
+                i + 1 < len(source_code)
+                and not (source_code[i] == '*' and source_code[i + 1] == '/')
+            ):
+                i += 1
+            i += 2 if i + 1 < len(source_code) else 1
+            continue
+
+        if i + 1 < len(source_code):
+            two_chars = source_code[i] + source_code[i + 1]
+            if two_chars in multi_char_specials:
+                if current:
+                    tokens.append(current)
+                    current = ''
+                tokens.append(two_chars)
+                i += 2
+                continue
+
+        char = source_code[i]
+
+        if char.isspace():
+            if current:
+                tokens.append(current)
+                current = ''
+            i += 1
+
+        elif char == '@':
+            if current:
+                tokens.append(current)
+                current = ''
+            word = '@'
+            i += 1
+            while i < len(source_code) and (
+                source_code[i].isalnum() or source_code[i] == '_'
+            ):
+                word += source_code[i]
+                i += 1
+            tokens.append(word)
+            if word == "@cpu":
+                raw_code = ""
+                while i < len(source_code) and source_code[i].isspace():
+                    i += 1
+                while i < len(source_code):
+                    raw_code += source_code[i]
+                    i += 1
+                tokens.append(raw_code)
+                break
+            continue
+
+        elif char in specials:
+            if (
+                char == '.'
+                and current.isdigit()
+                and i + 1 < len(source_code)
+                and source_code[i + 1].isdigit()
+            ):
+                current += char
+                i += 1
+                continue
+
+            if current:
+                tokens.append(current)
+                current = ''
+            tokens.append(char)
+            i += 1
+
+        else:
+            current += char
+            i += 1
+
+    if current:
+        tokens.append(current)
+
+    return tokens
+
+
+def generate_source(size):
+    """Builds an unrolled kernel of roughly `size` characters."""
+    header = "kernel big(a: uint, out: ptr_uint) {\n    var acc: uint = 0;\n"
+    footer = "    *out = acc;\n}\n"
+    parts = [header]
+    total = len(header) + len(footer)
+    k = 0
+    while total < size:
+        i, j = divmod(k, 64)
+        line = (
+            f"    /* step {k} */ acc = (acc + a_{i}_{j} * 3) // 2 + 1.5 - b_{j}_{i};\n"
+            if k % 16 == 0 else
+            f"    acc = (acc + a_{i}_{j} * 3) // 2 + 1.5 - b_{j}_{i};\n"
+        )
+        parts.append(line)
+        total += len(line)
+        k += 1
+    parts.append(footer)
+    return "".join(parts)
+
+
+def timed(fn, arg):
+    start = time.perf_counter()
+    result = fn(arg)
+    return result, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--max-mb", type=float, default=50.0,
+                    help="largest source size to generate (MB)")
+    ap.add_argument("--legacy-max-mb", type=float, default=50.0,
+                    help="skip the legacy tokenizer above this size (MB)")
+    args = ap.parse_args()
+
+    sizes = [1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20, 50 << 20]
+    sizes = [s for s in sizes if s <= args.max_mb * (1 << 20)]
+
+    print(f"{'size':>10} {'tokens':>10} {'legacy s':>10} {'regex s':>10} {'speedup':>8} {'Token s':>10}")
+    for size in sizes:
+        src = generate_source(size)
+        new, t_new = timed(lexer.tokenize, src)
+        records, t_records = timed(lexer.tokenize_tokens, src)
+        if [tok.text for tok in records] != new:
+            raise SystemExit(f"Token records disagree with tokenize() at size {size}")
+        del records
+
+        if size <= args.legacy_max_mb * (1 << 20):
+            old, t_old = timed(legacy_tokenize, src)
+            if old != new:
+                raise SystemExit(f"token mismatch at size {size}")
+            speedup = f"{t_old / t_new:7.1f}x"
+            t_old_str = f"{t_old:10.3f}"
+        else:
+            speedup, t_old_str = "    n/a", "       n/a"
+
+        print(f"{size:>10} {len(new):>10} {t_old_str} {t_new:10.3f} {speedup} {t_records:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark: loop-invariant code motion (Generator(licm=True)) against the
+generator without it. Both sides run every other optimization.
+
+Counts, for each loop of a micro-benchmark kernel, the instructions between
+its OpLoopMerge and its merge block, which is what runs on every iteration
+(plus the exits):
+- axpy: y[i] = x[row * 32 + col] * (a * b + 1.0) + x[i] * a in a loop {}
+  over n elements; a, b, row and col are scalar parameters
+- rows: a for-loop with a runtime trip count nested in one with literal
+  bounds, summing a[i][k] * scale / (bias + 1) into c[i]
+
+With --run, the kernel is also assembled with spirv-as and timed on the
+first OpenCL device (needs pyopencl, numpy and spirv-as).
+
+Usage:
+    python benchmarks/bench_licm.py [--n 1024] [--run] [--repeat 20]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def source(n):
+    return (
+        f"kernel axpy(x: float = array[{n}], y: float = array[{n}], a: float, b: float, "
+        "row: uint, col: uint, n: uint) {\n"
+        "    var i: uint = 0;\n"
+        "    loop {\n"
+        "        if (i >= n) { break; }\n"
+        "        y[i] = x[row * 32 + col] * (a * b + 1.0) + x[i] * a;\n"
+        "        i = i + 1;\n"
+        "    }\n"
+        "}\n"
+        "\n"
+        f"kernel rows(a: uint = array[8][{n}], c: uint = array[8], scale: uint, bias: uint, n: uint) {{\n"
+        "    var acc: uint = 0;\n"
+        "    for i in range(0, 8):\n"
+        "        acc = 0;\n"
+        "        for k in range(0, n):\n"
+        "            acc = acc + a[i][k] * scale / (bias + 1);\n"
+        "        c[i] = acc;\n"
+        "}\n"
+    )
+
+
+def compile_program(src, licm):
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse(), 4))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    return generator.Generator(max_unroll=4, licm=licm).generate(kernels), kernels
+
+
+def loop_sizes(spirv):
+    """Instructions between each OpLoopMerge and its merge block, by kernel."""
+    sizes = {}
+    names = {}
+    kernel = None
+    lines = spirv.splitlines()
+    for line in lines:
+        if line.startswith("OpEntryPoint "):
+            parts = line.split()
+            names[parts[2]] = parts[3].strip('"')
+        elif " = OpFunction " in line:
+            kernel = names[line.split()[0]]
+        elif line.startswith("OpLoopMerge "):
+            sizes.setdefault(kernel, []).append(line.split()[1])
+    for kernel, merges in sizes.items():
+        counts = []
+        for merge in merges:
+            count = 0
+            start = next(i for i, line in enumerate(lines) if line.startswith(f"OpLoopMerge {merge} "))
+            for line in lines[start + 1:]:
+                if line == f"{merge} = OpLabel":
+                    break
+                if not line.endswith("= OpLabel"):
+                    count += 1
+            counts.append(count)
+        sizes[kernel] = counts
+    return sizes
+
+
+def device_time(spirv, kernel, n, repeat):
+    """Best wall time of one launch of `kernel`; arrays are ones, scalars are n (trip counts) or 1."""
+    import numpy as np
+    from runtime.host import HostRuntime
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_path = os.path.join(tmp, "bench.spvasm")
+        spv_path = os.path.join(tmp, "bench.spv")
+        with open(asm_path, "w") as f:
+            f.write(spirv)
+        subprocess.run(["spirv-as", asm_path, "-o", spv_path], check=True)
+        rt = HostRuntime()
+        rt.load_spirv(spv_path)
+
+    buffers = []
+    for p in kernel.params:
+        dtype = np.float32 if p.param_type == "float" else np.uint32
+        if p.dims:
+            size = 1
+            for d in p.dims:
+                size *= d
+            buffers.append(rt.upload_array(np.ones(size), dtype=dtype))
+        else:
+            buffers.append(rt.upload_array(np.array([n if p.name == "n" else 1]), dtype=dtype))
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rt.run(kernel.name, *buffers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--n", type=int, default=1024, help="elements per loop")
+    ap.add_argument("--run", action="store_true", help="also time the kernels on the device")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    src = source(args.n)
+    plain, kernels = compile_program(src, False)
+    hoisted, _ = compile_program(src, True)
+    before, after = loop_sizes(plain), loop_sizes(hoisted)
+
+    header = f"{'kernel':<8} {'loop':>4} {'in loop, no licm':>17} {'licm':>6} {'saved/iter':>10}"
+    if args.run:
+        header += f" {'no licm':>10} {'licm':>10}"
+    print(header)
+    for kernel in kernels:
+        for number, (b, a) in enumerate(zip(before[kernel.name], after[kernel.name])):
+            line = f"{kernel.name:<8} {number:>4} {b:>17} {a:>6} {b - a:>10}"
+            if args.run and number == 0:
+                line += (f" {device_time(plain, kernel, args.n, args.repeat) * 1e3:8.3f}ms"
+                         f" {device_time(hoisted, kernel, args.n, args.repeat) * 1e3:8.3f}ms")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark: promotion of locals to SSA values (Generator(mem2reg=True))
+against keeping them in Function memory. Both sides run value numbering.
+
+Counts, per program, the instructions of its kernels and how many of them
+are OpVariable, OpLoad, OpStore and OpPhi, on every program under
+sil_tests/ and on loop workloads whose locals live across iterations:
+- sums: a loop {} accumulating into locals under if/else, N iterations
+- matmul: a for-loop kept as a loop (runtime trip count) accumulating
+  c[i][j] in a local, over N x N buffers
+
+With --run, the workloads are also assembled with spirv-as and timed on
+the first OpenCL device (needs pyopencl, numpy and spirv-as).
+
+Usage:
+    python benchmarks/bench_mem2reg.py [--sizes 4 16] [--run] [--repeat 20]
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def sums_source(n):
+    return (
+        "kernel sums(out: uint = array[2], n: uint) {\n"
+        "    var i: uint = 0;\n"
+        "    var even: uint = 0;\n"
+        "    var odd: uint = 0;\n"
+        "    loop {\n"
+        f"        if (i >= n * {n}) {{ break; }}\n"
+        "        if (i % 2 == 0) {\n"
+        "            even = even + i;\n"
+        "        } else {\n"
+        "            odd = odd + i * i;\n"
+        "        }\n"
+        "        i = i + 1;\n"
+        "    }\n"
+        "    out[0] = even;\n"
+        "    out[1] = odd;\n"
+        "}\n"
+    )
+
+
+def matmul_source(n):
+    return (
+        f"kernel matmul(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}], n: uint) {{\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        "            var acc: uint = 0;\n"
+        "            for k in range(0, n):\n"
+        "                acc = acc + a[i][k] * b[k][j];\n"
+        "            c[i][j] = acc;\n"
+        "}\n"
+    )
+
+
+WORKLOADS = {"sums": sums_source, "matmul": matmul_source}
+
+
+def compile_program(src, mem2reg, max_unroll=None):
+    ast = parser.Parser(lexer.iter_tokens(src)).parse()
+    ast = fold_program(minisil_ast.expand_program(ast, max_unroll))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    return generator.Generator(max_unroll=max_unroll, mem2reg=mem2reg).generate(kernels), kernels
+
+
+def census(spirv):
+    """Returns (function instructions, OpVariable, OpLoad, OpStore, OpPhi) counts."""
+    counts = {"all": 0, "OpVariable": 0, "OpLoad": 0, "OpStore": 0, "OpPhi": 0}
+    inside = False
+    for line in spirv.splitlines():
+        if " = OpFunction " in line:
+            inside = True
+        if not inside:
+            continue
+        counts["all"] += 1
+        parts = line.split()
+        op = parts[2] if len(parts) > 2 and parts[1] == "=" else parts[0]
+        if op in counts:
+            counts[op] += 1
+        if line == "OpFunctionEnd":
+            inside = False
+    return counts
+
+
+def device_time(spirv, kernel, repeat):
+    """Best wall time of one launch of `kernel`; array buffers are zeroed, scalars are 1."""
+    import numpy as np
+    from runtime.host import HostRuntime
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asm_path = os.path.join(tmp, "bench.spvasm")
+        spv_path = os.path.join(tmp, "bench.spv")
+        with open(asm_path, "w") as f:
+            f.write(spirv)
+        subprocess.run(["spirv-as", asm_path, "-o", spv_path], check=True)
+        rt = HostRuntime()
+        rt.load_spirv(spv_path)
+
+    buffers = []
+    for p in kernel.params:
+        dtype = np.float32 if p.param_type == "float" else np.uint32
+        if p.dims:
+            size = 1
+            for d in p.dims:
+                size *= d
+            buffers.append(rt.upload_array(np.zeros(size), dtype))
+        else:
+            buffers.append(rt.upload_array(np.ones(1), dtype))
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rt.run(kernel.name, *buffers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[4, 16])
+    ap.add_argument("--run", action="store_true", help="also time the workloads on the device")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(root, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.basename(path), f.read(), False))
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            programs.append((f"{workload} N={n}", source(n), True))
+
+    columns = ("all", "OpVariable", "OpLoad", "OpStore", "OpPhi")
+    header = f"{'program':<16}" + "".join(f" {c:>16}" for c in columns)
+    if args.run:
+        header += f" {'memory':>10} {'ssa':>10}"
+    print(header)
+
+    for name, src, timed in programs:
+        memory, kernels = compile_program(src, False)
+        ssa, _ = compile_program(src, True)
+        before, after = census(memory), census(ssa)
+        line = f"{name:<16}" + "".join(f" {f'{before[c]} -> {after[c]}':>16}" for c in columns)
+        if args.run and timed:
+            line += (f" {device_time(memory, kernels[0], args.repeat) * 1e3:8.3f}ms"
+                     f" {device_time(ssa, kernels[0], args.repeat) * 1e3:8.3f}ms")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: MiniSIL array-use substitution, one re.sub per array element
+(original) vs. the single-pass lookup in minisil.substitute_array_uses.
+
+The kernel takes three N x N array parameters, declares one local N x N
+array and indexes every element with literal indices, which is the text
+substitute_array_uses receives after the declarations are expanded.
+
+Usage:
+    python benchmarks/bench_minisil_arrays.py [--sizes 16 32 64 128 256] [--legacy-max 32]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import minisil  # noqa: E402
+
+
+def legacy_substitute_array_uses(code, mapping):
+    """Percorre o mapeamento (mais índices → primeiro) evitando colisões."""
+    for base, idxs, sc in sorted(mapping, key=lambda t: -len(t[1])):
+        idx_pat = ''.join(fr"\[\s*{i}\s*]" for i in idxs)
+        code = re.sub(fr"\b{base}{idx_pat}", sc, code)
+    return code
+
+
+def array_kernel(n):
+    body = [f"    var t: uint = array[{n}][{n}];"]
+    for i in range(n):
+        for j in range(n):
+            body.append(f"    t[{i}][{j}] = a[{i}][{j}] * b[{i}][{j}];")
+            body.append(f"    c[{i}][{j}] = t[{i}][{j}] + a[{i}][{n - 1 - j}];")
+    return (
+        f"kernel arrays_{n}(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n" + "\n".join(body) + "\n}\n"
+    )
+
+
+def prepare(src):
+    """Runs the MiniSIL steps that precede the substitution."""
+    code, mapping = minisil.expand_kernel_parameters(src)
+    lines = []
+    for ln in code.splitlines():
+        repl, mp = minisil.expand_array_declaration(ln)
+        lines.append(ln if repl is None else repl)
+        mapping.extend(mp)
+    return "\n".join(lines), mapping
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[16, 32, 64, 128, 256])
+    ap.add_argument("--legacy-max", type=int, default=32,
+                    help="largest N to run the original implementation on")
+    args = ap.parse_args()
+
+    print(f"{'size':>9} {'elements':>9} {'code':>9} {'original':>10} {'single-pass':>12} {'speedup':>8}")
+    for n in args.sizes:
+        code, mapping = prepare(array_kernel(n))
+        new, t_new = timed(minisil.substitute_array_uses, code, mapping)
+
+        if n <= args.legacy_max:
+            old, t_old = timed(legacy_substitute_array_uses, code, mapping)
+            if old != new:
+                raise SystemExit(f"outputs differ at {n}x{n}")
+            legacy = f"{t_old:9.2f}s"
+            speedup = f"{t_old / t_new:7.0f}x"
+        else:
+            legacy, speedup = f"{'-':>10}", f"{'-':>8}"
+
+        print(f"{n:>4}x{n:<4} {len(mapping):>9} {len(code) / 2**20:7.1f}MB "
+              f"{legacy} {t_new:11.3f}s {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark: the full compile pipeline with the original text-based Mini-SIL
+(minisil.transform, then lexing and parsing the expanded source) vs. the
+AST pass (parsing the source once, then minisil_ast.expand_program).
+
+Both pipelines end in Generator.generate and must produce identical SPIR-V,
+so the AST pass also expands array parameters into scalars here
+(scalar_params=True), as the text pass does.
+Workloads:
+- matmul: three nested for-loops over N x N array parameters
+- elementwise: N x N array parameters and a local array, indexed with
+  literal indices (no loops)
+
+Each pipeline runs in a fresh interpreter; time and peak memory are
+measured in separate runs, since tracing allocations slows Python down.
+
+Usage:
+    python benchmarks/bench_minisil_pipeline.py [--sizes 8 16 32]
+"""
+
+import argparse
+import gc
+import hashlib
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def matmul_source(n):
+    return (
+        f"kernel matmul(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        f"            for k in range(0, {n}):\n"
+        "                c[i][j] = c[i][j] + a[i][k] * b[k][j];\n"
+        "}\n"
+    )
+
+
+def elementwise_source(n):
+    body = [f"    var t: uint = array[{n}][{n}];"]
+    for i in range(n):
+        for j in range(n):
+            body.append(f"    t[{i}][{j}] = a[{i}][{j}] * b[{i}][{j}];")
+            body.append(f"    c[{i}][{j}] = t[{i}][{j}] + a[{i}][{n - 1 - j}];")
+    return (
+        f"kernel elementwise(a: uint = array[{n}][{n}], b: uint = array[{n}][{n}], "
+        f"c: uint = array[{n}][{n}]) {{\n" + "\n".join(body) + "\n}\n"
+    )
+
+
+WORKLOADS = {"matmul": matmul_source, "elementwise": elementwise_source}
+
+
+def text_pipeline(src):
+    ast = parser.Parser(lexer.iter_tokens(minisil.transform(src))).parse()
+    return generator.Generator().generate([n for n in ast if not isinstance(n, sil_ast.CpuBlock)])
+
+
+def ast_pipeline(src):
+    ast = minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse(), scalar_params=True)
+    return generator.Generator().generate([n for n in ast if not isinstance(n, sil_ast.CpuBlock)])
+
+
+PIPELINES = {"text": text_pipeline, "ast": ast_pipeline}
+
+
+def measure(pipeline, src, runs):
+    """Prints "<seconds> <peak bytes> <digest>" for one pipeline."""
+    run = PIPELINES[pipeline]
+    best = float("inf")
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        spirv = run(src)
+        best = min(best, time.perf_counter() - start)
+    del spirv
+
+    gc.collect()
+    tracemalloc.start()
+    spirv = run(src)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(best, peak, hashlib.sha256(spirv.encode()).hexdigest())
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--measure", nargs=3, metavar=("WORKLOAD", "N", "PIPELINE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.measure:
+        workload, n, pipeline = args.measure
+        measure(pipeline, WORKLOADS[workload](int(n)), args.runs)
+        return
+
+    print(f"{'workload':<12} {'N':>4} {'text':>9} {'ast':>9} {'speedup':>8} "
+          f"{'text peak':>11} {'ast peak':>10}")
+    for workload in WORKLOADS:
+        for n in args.sizes:
+            results = {}
+            for pipeline in PIPELINES:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--runs", str(args.runs),
+                     "--measure", workload, str(n), pipeline],
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()
+                results[pipeline] = (float(out[0]), int(out[1]), out[2])
+
+            (t_text, m_text, d_text), (t_ast, m_ast, d_ast) = results["text"], results["ast"]
+            if d_text != d_ast:
+                raise SystemExit(f"pipelines generated different SPIR-V for {workload} N={n}")
+            print(f"{workload:<12} {n:>4} {t_text:8.2f}s {t_ast:8.2f}s {t_text / t_ast:7.1f}x "
+                  f"{m_text / 2**20:8.1f} MB {m_ast / 2**20:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: MiniSIL for-loop unrolling, the original recursive expansion
+vs. the template-based minisil.unroll_for_loops, on 3-deep loop nests.
+
+The nest is a matrix multiply over N x N arrays:
+
+    for i in range(0, N):
+        for j in range(0, N):
+            for k in range(0, N):
+                c[i][j] = c[i][j] + a[i][k] * b[k][j];
+
+Usage:
+    python benchmarks/bench_minisil_unroll.py [--trips 8 16 32 64]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import minisil  # noqa: E402
+
+
+def legacy_unroll_for_loops(code: str) -> str:
+    import textwrap
+
+    def replace_indexed_vars(line: str) -> str:
+        # Converte a[0][1] para a_0_1
+        pattern = re.compile(r'(\w+)((?:\[\d+\])+)')
+        def repl(m):
+            name = m.group(1)
+            indices = re.findall(r'\[(\d+)\]', m.group(2))
+            return f"{name}_{'_'.join(indices)}"
+        return pattern.sub(repl, line)
+
+    def process_block(lines: list, loop_vars: dict) -> list:
+        """Substitui as variáveis do loop por valores fixos e converte índices."""
+        output = []
+        for line in lines:
+            for var, val in loop_vars.items():
+                line = re.sub(rf'\b{var}\b', str(val), line)
+            output.append(replace_indexed_vars(line))
+        return output
+
+    def collect_block(lines: list, start_idx: int, base_indent: int) -> tuple[list, int]:
+        block = []
+        i = start_idx
+        while i < len(lines):
+            line = lines[i]
+            if line.strip() == "":
+                block.append(line)
+                i += 1
+                continue
+            indent = len(line) - len(line.lstrip())
+            if indent <= base_indent:
+                break
+            block.append(line)
+            i += 1
+        return block, i
+
+    lines = code.splitlines()
+    result = []
+    i = 0
+
+    stack = []
+
+    while i < len(lines):
+        line = lines[i]
+        match = re.match(r'^(\s*)for\s+(\w+)\s+in\s+range\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*:', line)
+        if match:
+            indent, var, start, end = match.group(1), match.group(2), int(match.group(3)), int(match.group(4))
+            base_indent = len(indent)
+            body, next_i = collect_block(lines, i + 1, base_indent)
+            new_result = []
+
+            for val in range(start, end):
+                loop_vars = {var: val}
+                # Checar se a linha de loop seguinte também é um for
+                body_unrolled = legacy_unroll_for_loops(textwrap.dedent("\n".join(body)))
+                body_lines = body_unrolled.splitlines()
+                body_replaced = process_block(body_lines, loop_vars)
+                new_result.extend(body_replaced)
+
+            result.extend(new_result)
+            i = next_i
+        else:
+            result.append(line)
+            i += 1
+
+    return "\n".join(result)
+
+
+def nest_source(n):
+    return (
+        "kernel matmul(a: uint, b: uint, c: uint) {\n"
+        f"    for i in range(0, {n}):\n"
+        f"        for j in range(0, {n}):\n"
+        f"            for k in range(0, {n}):\n"
+        "                c[i][j] = c[i][j] + a[i][k] * b[k][j];\n"
+        "}\n"
+    )
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--trips", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = ap.parse_args()
+
+    print(f"{'trips':>6} {'lines out':>10} {'original':>10} {'template':>10} {'speedup':>8}")
+    for n in args.trips:
+        src = nest_source(n)
+        old, t_old = timed(legacy_unroll_for_loops, src)
+        new, t_new = timed(minisil.unroll_for_loops, src)
+        if old != new:
+            raise SystemExit(f"outputs differ at trip count {n}")
+        print(f"{n:>6} {new.count(chr(10)) + 1:>10} {t_old:9.3f}s {t_new:9.3f}s {t_old / t_new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
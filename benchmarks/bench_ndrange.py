@@ -0,0 +1,99 @@
+"""
+Benchmark: a data-parallel kernel launched over an NDRange against the
+same work done by a single work-item.
+
+For each size N, times c = a + b over N floats on the OpenCL device:
+- serial: one work-item walks the arrays in a loop, as every kernel had
+  to before the work-item builtins
+- ndrange: N work-items, each adding the element at global_id(0), in
+  work-groups of --local-size (0 lets the driver choose)
+
+Set SIL_OPENCL_PLATFORM to pick the platform, e.g. "pocl" for POCL's CPU
+device. Needs pyopencl and numpy.
+
+Usage:
+    python benchmarks/bench_ndrange.py [--sizes 65536 1048576] [--local-size 256] [--repeat 10]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_binary import module_of  # noqa: E402
+from generator.binary import encode  # noqa: E402
+
+
+def serial_source(n):
+    return (
+        f"kernel serial_add(a: float = array[{n}], b: float = array[{n}], "
+        f"c: float = array[{n}], n: uint) {{\n"
+        "    var i: uint = 0;\n"
+        "    loop {\n"
+        "        if (i >= n) { break; }\n"
+        "        c[i] = a[i] + b[i];\n"
+        "        i = i + 1;\n"
+        "    }\n"
+        "}\n"
+    )
+
+
+def ndrange_source(n):
+    return (
+        f"kernel vector_add(a: float = array[{n}], b: float = array[{n}], "
+        f"c: float = array[{n}]) {{\n"
+        "    var i: uint = global_id(0);\n"
+        "    c[i] = a[i] + b[i];\n"
+        "}\n"
+    )
+
+
+def device_time(rt, kernel, args, repeat, **sizes):
+    """Best wall time of one launch, including the wait for it to finish."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rt.run(kernel, *args, **sizes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1 << 16, 1 << 20])
+    ap.add_argument("--local-size", type=int, default=256)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    import numpy as np
+    from runtime.host import HostRuntime
+
+    rt = HostRuntime()
+    print(f"device: {rt.device.name} ({rt.platform.name})\n")
+    print(f"{'N':>10} {'serial':>12} {'ndrange':>12} {'speedup':>8}")
+
+    for n in args.sizes:
+        a = np.arange(n, dtype=np.float32)
+        b = np.full(n, 0.5, dtype=np.float32)
+        buffers = [rt.upload_array(a, np.float32), rt.upload_array(b, np.float32),
+                   rt.upload_array(np.zeros(n), np.float32)]
+
+        rt.load_spirv_binary(encode(module_of(serial_source(n))).tobytes())
+        count = rt.upload_array([n], np.uint32)
+        serial = device_time(rt, "serial_add", buffers + [count], args.repeat)
+
+        rt.load_spirv_binary(encode(module_of(ndrange_source(n))).tobytes())
+        local_size = args.local_size or None
+        parallel = device_time(rt, "vector_add", buffers, args.repeat,
+                               global_size=n, local_size=local_size)
+
+        c = rt.read_buffer(buffers[2], np.float32, (n,))
+        if not np.array_equal(c, a + b):
+            raise Exception(f"vector_add N={n}: wrong result")
+        print(f"{n:>10} {serial * 1e3:10.3f}ms {parallel * 1e3:10.3f}ms {serial / parallel:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: token-stream memory of a list of strings vs. lexer.PackedTokens
+on the sil_tests/array matmul kernel scaled up to N x N.
+
+The kernel is generated directly in its MiniSIL-expanded form, i.e. the
+text that minisil.transform() hands to the lexer.
+
+Usage:
+    python benchmarks/bench_packed_tokens.py [--n 256]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+from parser import parser  # noqa: E402
+
+
+def scaled_array_kernel(n):
+    """The expanded sil_tests/array kernel with n x n arrays."""
+    idx = [(i, j) for i in range(n) for j in range(n)]
+    params = ", ".join(
+        f"{name}_{i}_{j}: uint" for name in ("a", "b", "c") for i, j in idx
+    )
+    body = "\n".join(f"c_{i}_{j} = a_{i}_{j} * b_{i}_{j};" for i, j in idx)
+    return f"kernel matmul_{n}x{n}({params}){{\n{body}\n}}\n"
+
+
+def retained(build, src):
+    """Returns (object, bytes still allocated after building it, seconds)."""
+    start = time.perf_counter()
+    build(src)
+    elapsed = time.perf_counter() - start  # timed without tracing overhead
+
+    gc.collect()
+    tracemalloc.start()
+    obj = build(src)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current, elapsed
+
+
+def timed_parse(tokens):
+    start = time.perf_counter()
+    ast = parser.Parser(tokens).parse()
+    return ast, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--n", type=int, default=256, help="array side length")
+    args = ap.parse_args()
+
+    src = scaled_array_kernel(args.n)
+    print(f"source: {len(src) / 2**20:.1f} MB")
+
+    tokens, list_bytes, list_lex = retained(lexer.tokenize, src)
+    packed, packed_bytes, packed_lex = retained(lexer.pack_tokens, src)
+    assert len(tokens) == len(packed)
+    print(f"tokens: {len(tokens)}")
+    print(f"{'':<14} {'memory MB':>10} {'B/token':>8} {'lex s':>7}")
+    print(f"{'list[str]':<14} {list_bytes / 2**20:10.1f} "
+          f"{list_bytes / len(tokens):8.1f} {list_lex:7.2f}")
+    print(f"{'PackedTokens':<14} {packed_bytes / 2**20:10.1f} "
+          f"{packed_bytes / len(packed):8.1f} {packed_lex:7.2f}")
+
+    ast_list, t_list = timed_parse(tokens)
+    del tokens
+    ast_packed, t_packed = timed_parse(packed)
+    print(f"parse: list {t_list:.2f} s, packed {t_packed:.2f} s, "
+          f"{len(packed._interned)} interned lexemes")
+    assert repr(ast_list) == repr(ast_packed), "list and packed parses differ"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: serial Parser.parse vs. parser.parallel.parse_parallel on a
+synthetic module of independent unrolled kernels.
+
+Each kernel is the expanded sil_tests/array kernel at N x N, so the module
+has the shape MiniSIL produces for array-heavy programs.
+
+Usage:
+    python benchmarks/bench_parallel_parse.py [--kernels 32] [--n 48] [--jobs 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from parser import parser  # noqa: E402
+from parser.parallel import parse_parallel, split_kernels  # noqa: E402
+
+
+def generate_module(kernels, n):
+    """`kernels` independent element-wise kernels over n x n arrays, plus a @cpu block."""
+    idx = [(i, j) for i in range(n) for j in range(n)]
+    out = []
+    for k in range(kernels):
+        params = ", ".join(
+            f"{name}_{i}_{j}: uint" for name in ("a", "b", "c") for i, j in idx
+        )
+        body = "\n".join(
+            f"    c_{i}_{j} = a_{i}_{j} * b_{i}_{j} + {k};" for i, j in idx
+        )
+        out.append(f"kernel elementwise_{k}({params}) {{\n{body}\n}}\n")
+    out.append("@cpu\nprint('done')\n")
+    return "\n".join(out)
+
+
+def spirv(ast):
+    return generator.Generator().generate(
+        [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    )
+
+
+def best_of(runs, fn):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--kernels", type=int, default=32)
+    ap.add_argument("--n", type=int, default=48, help="array side length per kernel")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count())
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    src = generate_module(args.kernels, args.n)
+    start = time.perf_counter()
+    chunks = split_kernels(src)
+    t_split = time.perf_counter() - start
+    print(f"{args.kernels} kernels, {len(src) / 2**20:.1f} MB, {len(chunks)} chunks, "
+          f"{os.cpu_count()} CPUs, {args.jobs} jobs")
+
+    serial, t_serial = best_of(
+        args.runs, lambda: parser.Parser(lexer.iter_tokens(src)).parse()
+    )
+    parallel, t_parallel = best_of(
+        args.runs, lambda: parse_parallel(src, args.jobs)
+    )
+    if spirv(serial) != spirv(parallel):
+        raise SystemExit("parallel parse built a different program")
+
+    print(f"pre-scan           {t_split:7.2f} s")
+    print(f"serial             {t_serial:7.2f} s")
+    print(f"parallel           {t_parallel:7.2f} s  (includes pre-scan and pool start-up)")
+    print(f"speedup            {t_serial / t_parallel:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
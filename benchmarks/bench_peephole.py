@@ -0,0 +1,120 @@
+"""
+Benchmark: peephole optimization and strength reduction
+(Generator(peephole=True)) against the generator without it. Both sides run
+every other optimization.
+
+Prints a table of the rewrites made, by rule, and the count of the
+instructions they touch, before and after, over every program under
+sil_tests/ and a workload of bit manipulation:
+- hash: N rounds mixing a state with *, // and % by powers of two, and
+  flags kept in uint variables that are negated and tested with && / ||
+
+Usage:
+    python benchmarks/bench_peephole.py [--rounds 16]
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import minisil_ast  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from optimizer.fold import fold_program  # noqa: E402
+from parser import parser  # noqa: E402
+
+OPCODES = (
+    "OpSelect", "OpISub", "OpIEqual", "OpINotEqual", "OpLogicalNot",
+    "OpIMul", "OpUDiv", "OpUMod", "OpShiftLeftLogical", "OpShiftRightLogical", "OpBitwiseAnd",
+)
+
+
+def hash_source(rounds):
+    lines = [
+        "kernel hash(data: uint = array[64], out: uint = array[2], seed: uint) {",
+        "    var h: uint = seed;",
+        "    var odd: uint = 0;",
+        "    var big: uint = 0;",
+    ]
+    for r in range(rounds):
+        lines += [
+            f"    h = h * 32 + data[{r % 64}] // 4 + h % 8;",
+            "    odd = h % 2 == 1;",
+            "    big = h > 65536;",
+            "    if (!odd && big || !big) {",
+            "        h = h // 2;",
+            "    }",
+        ]
+    lines += ["    out[0] = h;", "    out[1] = !odd;", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def compile_program(src, peephole):
+    ast = fold_program(minisil_ast.expand_program(parser.Parser(lexer.iter_tokens(src)).parse()))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    g = generator.Generator(peephole=peephole)
+    return g.generate(kernels), g.rewrite_counts
+
+
+def opcode_counts(spirv):
+    """Instructions inside functions, in total and per opcode of OPCODES."""
+    counts = dict.fromkeys(("all",) + OPCODES, 0)
+    inside = False
+    for line in spirv.splitlines():
+        if " = OpFunction " in line:
+            inside = True
+        if not inside:
+            continue
+        counts["all"] += 1
+        parts = line.split()
+        op = parts[2] if len(parts) > 2 and parts[1] == "=" else parts[0]
+        if op in counts:
+            counts[op] += 1
+        if line == "OpFunctionEnd":
+            inside = False
+    return counts
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rounds", type=int, default=16)
+    args = ap.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(root, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.basename(path), f.read()))
+    programs.append((f"hash rounds={args.rounds}", hash_source(args.rounds)))
+
+    rewrites = {}
+    before = dict.fromkeys(("all",) + OPCODES, 0)
+    after = dict(before)
+    print(f"{'program':<20} {'instructions':>16}")
+    for name, src in programs:
+        plain, _ = compile_program(src, False)
+        optimized, counts = compile_program(src, True)
+        b, a = opcode_counts(plain), opcode_counts(optimized)
+        for op in before:
+            before[op] += b[op]
+            after[op] += a[op]
+        for rule, n in counts.items():
+            rewrites[rule] = rewrites.get(rule, 0) + n
+        change = f"{b['all']} -> {a['all']}"
+        print(f"{name:<20} {change:>16}")
+
+    print(f"\n{'rewrite':<40} {'applied':>8}")
+    for rule, n in sorted(rewrites.items(), key=lambda item: -item[1]):
+        print(f"{rule:<40} {n:>8}")
+
+    print(f"\n{'instructions':<40} {'before':>8} {'after':>8}")
+    for op in before:
+        print(f"{op:<40} {before[op]:>8} {after[op]:>8}")
+
+
+if __name__ == "__main__":
+    main()
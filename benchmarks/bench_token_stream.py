@@ -0,0 +1,49 @@
+"""
+Benchmark: peak front-end memory when the parser reads a materialized token
+list vs. a lazily streamed lexer.iter_tokens() generator.
+
+Usage:
+    python benchmarks/bench_token_stream.py [--mb 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+from parser import parser  # noqa: E402
+from bench_lexer import generate_source  # noqa: E402
+
+
+def measure(label, make_tokens, src):
+    tracemalloc.start()
+    start = time.perf_counter()
+    p = parser.Parser(make_tokens(src))
+    ast = p.parse()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    buffered = getattr(p.stream, "buffered", len(getattr(p.stream, "tokens", ())))
+    print(f"{label:<8} {elapsed:8.2f} s  peak {peak / 2**20:8.1f} MB  "
+          f"tokens held after parse: {buffered}")
+    return ast
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--mb", type=float, default=4.0, help="source size in MB")
+    args = ap.parse_args()
+
+    src = generate_source(int(args.mb * (1 << 20)))
+    print(f"source: {len(src) / 2**20:.1f} MB")
+    a = measure("list", lexer.tokenize, src)
+    b = measure("stream", lexer.iter_tokens, src)
+    assert repr(a) == repr(b), "list and stream parses differ"
+
+
+if __name__ == "__main__":
+    main()
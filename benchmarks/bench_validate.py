@@ -0,0 +1,83 @@
+"""
+Benchmark: the built-in structural validator (generator.validate) against
+spirv-val.
+
+For every program under sil_tests/ and the unrolled workloads of
+bench_generator.py, reports the number of instructions in the module and
+the time to validate it:
+- fast: validate(module), in-process
+- spirv-val: the binary piped to a spirv-val process, as
+  `main.py --validate full` does on top of the fast checks (only if
+  spirv-val is on the PATH)
+
+Usage:
+    python benchmarks/bench_validate.py [--sizes 8 16] [--repeat 5]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_binary import module_of  # noqa: E402
+from bench_generator import WORKLOADS  # noqa: E402
+from generator.binary import encode  # noqa: E402
+from generator.validate import validate  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_time(run, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[8, 16])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    programs = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "sil_tests", "**", "*.sil"), recursive=True)):
+        with open(path, encoding="utf-8") as f:
+            programs.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+    for workload, source in WORKLOADS.items():
+        for n in args.sizes:
+            programs.append((f"{workload} N={n}", source(n)))
+
+    has_validator = shutil.which("spirv-val") is not None
+    if not has_validator:
+        print("spirv-val not found: timing the built-in validator only\n")
+
+    print(f"{'program':<24} {'insts':>8} {'fast':>10} {'spirv-val':>10}")
+    for name, source in programs:
+        module = module_of(source)
+        if module is None:
+            continue
+        seconds, errors = best_time(lambda: validate(module), args.repeat)
+        line = f"{name:<24} {sum(1 for _ in module.instructions()):>8} {seconds * 1e3:8.2f}ms"
+        if has_validator:
+            binary = encode(module).tobytes()
+            val_seconds, result = best_time(
+                lambda: subprocess.run(["spirv-val", "-"], input=binary, capture_output=True),
+                args.repeat)
+            line += f" {val_seconds * 1e3:8.2f}ms"
+            if result.returncode != 0:
+                line += "  (rejected by spirv-val)"
+        if errors:
+            line += f"  ({len(errors)} problems)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
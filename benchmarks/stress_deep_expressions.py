@@ -0,0 +1,116 @@
+"""
+Stress test: parse and generate SPIR-V for expressions nested 10k and 100k
+levels deep.
+
+Each shape is compiled with Python's recursion limit lowered to a few
+hundred frames, so any recursion on expression depth fails loudly instead
+of being absorbed by the default limit. The generated module is checked
+for the expected number of instructions.
+
+Usage:
+    python benchmarks/stress_deep_expressions.py [--depths 10000 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lexer  # noqa: E402
+import sil_ast  # noqa: E402
+from generator import generator  # noqa: E402
+from parser import parser  # noqa: E402
+
+RECURSION_LIMIT = 300
+
+
+# Each shape maps depth -> (expression source, SPIR-V opcode, expected count)
+SHAPES = {
+    # a + (a + (a + ... a))
+    "parenthesised": lambda n: (
+        "a + (" * n + "a" + ")" * n, "OpIAdd", n,
+    ),
+    # ~~~...~a
+    "prefix": lambda n: (
+        "~" * n + "a", "OpNot", n,
+    ),
+    # a - (~(a - (~(... a))))
+    "mixed": lambda n: (
+        "a - (~(" * (n // 2) + "a" + "))" * (n // 2), "OpISub", n // 2,
+    ),
+    # bitwise { (a | (a | ... a)) }
+    "bitwise block": lambda n: (
+        "bitwise { " + "(a | " * n + "a" + ")" * n + " }", "OpBitwiseOr", n,
+    ),
+    # cast { cast { ... a as float } as uint } ...
+    "cast blocks": lambda n: (
+        "cast { " * n + "a" + "".join(
+            " as float }" if i % 2 == 0 else " as uint }" for i in range(n)
+        ),
+        "OpConvertUToF", (n + 1) // 2,
+    ),
+    # a + a + ... + a (left-nested; never needed recursion)
+    "flat chain": lambda n: (
+        " + ".join(["a"] * (n + 1)), "OpIAdd", n,
+    ),
+}
+
+
+def kernel_source(expr):
+    return (
+        "kernel deep(a: uint, out: ptr_uint) {\n"
+        f"    var r: uint = cast {{ {expr} as uint }};\n"
+        "    out = r;\n"
+        "}\n"
+    )
+
+
+def compile_source(src):
+    ast = parser.Parser(lexer.iter_tokens(src)).parse()
+    g = generator.Generator()
+    return g.generate([n for n in ast if not isinstance(n, sil_ast.CpuBlock)])
+
+
+def run(shape, depth):
+    expr, opcode, expected = SHAPES[shape](depth)
+    src = kernel_source(expr)
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(RECURSION_LIMIT)
+    try:
+        start = time.perf_counter()
+        spirv = compile_source(src)
+        elapsed = time.perf_counter() - start
+
+        # Second run for peak memory, since tracemalloc distorts timings
+        tracemalloc.start()
+        compile_source(src)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        sys.setrecursionlimit(limit)
+
+    count = spirv.count(f"= {opcode} ")
+    status = "ok" if count >= expected else f"FAIL ({count} {opcode}, expected {expected})"
+    print(f"{shape:<15} depth {depth:>7}  {elapsed:7.2f} s  peak {peak / 2**20:7.1f} MB  {status}")
+    return count >= expected
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--depths", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+    args = ap.parse_args()
+
+    ok = True
+    for depth in args.depths:
+        for shape in args.shapes:
+            ok &= run(shape, depth)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "sil",
+)
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+# Everything that influences the compiled output. Any change to these files
+# changes the compiler version and therefore every cache key.
+_COMPILER_SOURCES = [
+    "lexer.py",
+    "minisil.py",
+    "minisil_ast.py",
+    "optimizer/*.py",
+    "sil_ast.py",
+    "parser/*.py",
+    "generator/*.py",
+]
+
+_compiler_version = None
+
+
+def compiler_version():
+    """
+    Returns a fingerprint of the compiler: a hash over its own source files.
+
+    Returns:
+        str: Hex digest, computed once per process.
+    """
+    global _compiler_version
+    if _compiler_version is None:
+        root = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for pattern in _COMPILER_SOURCES:
+            for path in sorted(glob.glob(os.path.join(root, pattern))):
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+        _compiler_version = digest.hexdigest()
+    return _compiler_version
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class CompileCache:
+    """
+    Content-addressed on-disk cache of compiled SIL programs.
+
+    Entries are keyed by a hash of the source, the compiler version and the
+    compiler options. Each entry is three files in the cache directory:
+    - <key>.ast: the pickled AST
+    - <key>.spv: the validated SPIR-V binary
+    - <key>.json: metadata with a checksum of both files, written last
+
+    Entries whose files are missing or fail their checksum are treated as
+    misses and removed. The metadata file's mtime records the last use;
+    when the cache grows beyond max_bytes, least recently used entries are
+    evicted first.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.environ.get("SIL_CACHE_DIR") or DEFAULT_CACHE_DIR
+        self.max_bytes = DEFAULT_MAX_BYTES if max_bytes is None else max_bytes
+
+    def key(self, source_code, options=None):
+        """
+        Computes the cache key of a program.
+
+        Args:
+            source_code (str): The original SIL source (before Mini-SIL).
+            options (dict): Compiler options that affect the output.
+
+        Returns:
+            str: Hex digest identifying the compiled program.
+        """
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        digest.update(source_code.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def load(self, key):
+        """
+        Looks up a compiled program.
+
+        Args:
+            key (str): A key returned by key().
+
+        Returns:
+            tuple: (ast, spv_data) on a hit, or None on a miss; spv_data
+            is the SPIR-V binary (bytes).
+        """
+        meta_path = self._path(key, "json")
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(self._path(key, "ast"), "rb") as f:
+                ast_data = f.read()
+            with open(self._path(key, "spv"), "rb") as f:
+                spv_data = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if (
+            meta.get("version") != compiler_version()
+            or meta.get("ast_sha256") != _sha256(ast_data)
+            or meta.get("spv_sha256") != _sha256(spv_data)
+        ):
+            self.remove(key)
+            return None
+
+        try:
+            ast = pickle.loads(ast_data)
+        except Exception:
+            self.remove(key)
+            return None
+
+        try:
+            os.utime(meta_path)  # mark as recently used (best-effort)
+        except OSError:
+            pass
+        return ast, spv_data
+
+    def store(self, key, ast, spv_data):
+        """
+        Adds a compiled program to the cache, then evicts old entries if the
+        cache is over its size limit.
+
+        Args:
+            key (str): A key returned by key().
+            ast (list): The parsed top-level AST nodes.
+            spv_data (bytes): The validated SPIR-V binary.
+
+        Returns:
+            bool: False if the AST could not be pickled (e.g. too deeply
+            nested) and nothing was stored.
+        """
+        try:
+            ast_data = pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            return False
+
+        meta = {
+            "version": compiler_version(),
+            "ast_sha256": _sha256(ast_data),
+            "spv_sha256": _sha256(spv_data),
+            "size": len(ast_data) + len(spv_data),
+        }
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path(key, "ast"), ast_data)
+        self._write(self._path(key, "spv"), spv_data)
+        self._write(self._path(key, "json"), json.dumps(meta).encode())
+
+        self.evict()
+        return True
+
+    def _write(self, path, data):
+        # Write to a temporary file first, so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def remove(self, key):
+        """Deletes all files of an entry."""
+        for ext in ("json", "ast", "spv"):
+            try:
+                os.remove(self._path(key, ext))
+            except OSError:
+                pass
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits max_bytes.
+        """
+        entries = []
+        for meta_path in glob.glob(os.path.join(self.directory, "*.json")):
+            key = os.path.basename(meta_path)[:-len(".json")]
+            try:
+                last_used = os.path.getmtime(meta_path)
+                size = sum(
+                    os.path.getsize(self._path(key, ext)) for ext in ("json", "ast", "spv")
+                )
+            except OSError:
+                self.remove(key)  # incomplete entry
+                continue
+            entries.append((last_used, size, key))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(key)
+            total -= size
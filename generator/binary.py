@@ -0,0 +1,108 @@
+"""
+Binary encoding of a SPIR-V module, done in-process.
+
+encode() writes the physical layout of the SPIR-V specification (section
+2.3) straight from an ir.Module, without going through assembly text:
+- a header of five words: magic number, version 1.0, generator (0, an
+  unregistered tool), ID bound and schema (0)
+- each instruction as a word holding its word count (high 16 bits) and
+  opcode (low 16 bits), followed by its result type ID, its result ID and
+  its operands
+
+Literal operands are encoded by kind:
+- quoted strings: UTF-8 bytes, nul-terminated, zero-padded to a whole word
+- numbers: one word; the value of an OpConstant of a float type is its
+  IEEE 754 binary32 bit pattern
+- enumerants (Kernel, Function, DontUnroll, ...): their value, from
+  _ENUMERANTS
+
+Words are in the host's byte order, which consumers detect from the magic
+number.
+"""
+
+import struct
+from array import array
+
+from .ir import Op
+
+MAGIC = 0x07230203
+VERSION = 0x00010000    # SPIR-V 1.0
+GENERATOR = 0
+SCHEMA = 0
+
+_WORD = "I" if array("I").itemsize == 4 else "L"
+_MASK = 0xFFFFFFFF
+
+# Enumerants the generator writes, by name. A name that belongs to more
+# than one operand kind (Kernel is a capability and an execution model,
+# None a function, selection and loop control) has the same value in each.
+_ENUMERANTS = {
+    # Capability
+    "Addresses": 4, "Kernel": 6, "Int64": 11,
+    # AddressingModel
+    "Logical": 0, "Physical32": 1, "Physical64": 2,
+    # MemoryModel
+    "OpenCL": 2,
+    # StorageClass
+    "UniformConstant": 0, "Input": 1, "Workgroup": 4, "CrossWorkgroup": 5,
+    "Private": 6, "Function": 7,
+    # FunctionControl, SelectionControl, LoopControl
+    "None": 0, "Unroll": 1, "DontUnroll": 2,
+    # Decoration
+    "BuiltIn": 11,
+    # BuiltIn
+    "NumWorkgroups": 24, "WorkgroupSize": 25, "WorkgroupId": 26, "LocalInvocationId": 27,
+    "GlobalInvocationId": 28, "GlobalSize": 31,
+}
+
+
+def _string_words(text):
+    """Encodes a literal string: UTF-8, nul-terminated, padded to whole words."""
+    data = text.encode("utf-8") + b"\0"
+    data += b"\0" * (-len(data) % 4)
+    return array(_WORD, data)
+
+
+def _float_word(text):
+    """Returns the IEEE 754 binary32 bit pattern of a float literal."""
+    return struct.unpack("<I", struct.pack("<f", float(text)))[0]
+
+
+def encode(module):
+    """
+    Encodes a module as SPIR-V binary.
+
+    Args:
+        module (ir.Module): The module.
+
+    Returns:
+        array: The module's 32-bit words (array('I')); .tobytes() gives
+        what cl.Program and spirv-val take.
+    """
+    float_types = {inst.result for inst in module.declarations if inst.op is Op.TypeFloat}
+    words = array(_WORD, (MAGIC, VERSION, GENERATOR, module.bound, SCHEMA))
+
+    for inst in module.instructions():
+        operands = []
+        if inst.type is not None:
+            operands.append(inst.type)
+        if inst.result is not None:
+            operands.append(inst.result)
+        for operand in inst.operands:
+            if operand.__class__ is int:
+                operands.append(operand)
+            elif operand in _ENUMERANTS:
+                operands.append(_ENUMERANTS[operand])
+            elif operand.startswith('"'):
+                operands.extend(_string_words(operand[1:-1]))
+            elif inst.op is Op.Constant and inst.type in float_types:
+                operands.append(_float_word(operand))
+            else:
+                try:
+                    operands.append(int(operand) & _MASK)
+                except ValueError:
+                    raise Exception(f"Cannot encode operand {operand!r} of {inst.text()}")
+        words.append((len(operands) + 1) << 16 | inst.op)
+        words.extend(operands)
+
+    return words
@@ -0,0 +1,249 @@
+"""
+Dead code and dead store elimination for generated functions.
+
+Two passes, run by generate_kernel around mem2reg and value numbering:
+
+remove_unreachable_code() cleans up the control flow the generator emits
+statement by statement (code following a `break` or `return` in the same
+block is already gone: ir.Function.from_instructions drops it):
+- blocks that cannot be reached from the entry block are dropped; if a
+  reachable loop or selection still names one as its merge block or
+  continue target, it is kept, reduced to OpUnreachable (merge) or to its
+  branch back into the loop (continue)
+- a block entered only by the OpBranch ending the block right before it,
+  as generate_kernel starts one for every statement, is merged into that
+  block
+
+remove_dead_instructions() then removes what computes nothing anybody
+reads:
+- a store overwritten by a store to the same pointer later in its block,
+  with no load that may alias it in between
+- all stores to a Function variable that is never loaded from, and the
+  variable itself
+- pure instructions, loads and phis whose results are not used (marking
+  from the instructions with effects, so unused loop-carried phis go too)
+
+remove_unused_constants() drops module-level constants no instruction
+refers to any more.
+"""
+
+from .ir import Block, Instruction, Op
+from .value_numbering import PURE_OPS, label_references
+
+_MERGES = (Op.SelectionMerge, Op.LoopMerge)
+_ACCESS_CHAINS = (Op.AccessChain, Op.InBoundsPtrAccessChain)
+_REMOVABLE = PURE_OPS | {Op.Load, Op.Phi, Op.Undef, Op.CopyObject}
+_GLOBAL = "global"
+
+
+def _resolve(value, replace):
+    while value in replace:
+        value = replace[value]
+    return value
+
+
+def remove_unreachable_code(function, new_id):
+    """
+    Removes unreachable blocks from a function and merges fall-through blocks.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+        new_id (callable): Returns a fresh SPIR-V ID.
+    """
+    blocks = function.blocks
+    body = {block.label: block for block in blocks}
+
+    # Reachable blocks, and the merge blocks and continue targets they name
+    reachable = {blocks[0].label}
+    pending = [blocks[0].label]
+    while pending:
+        for succ in body[pending.pop()].successors():
+            if succ not in reachable:
+                reachable.add(succ)
+                pending.append(succ)
+    merges, continues = set(), set()
+    for label in reachable:
+        instructions = body[label].instructions
+        if len(instructions) > 1:
+            merge = instructions[-2]
+            if merge.op in _MERGES:
+                merges.add(merge.operands[0])
+            if merge.op is Op.LoopMerge:
+                continues.add(merge.operands[1])
+
+    kept = []
+    for block in blocks:
+        if block.label in reachable:
+            kept.append(block)
+        elif block.label in merges:
+            kept.append(Block(block.label, [Instruction(Op.Unreachable)]))
+        elif block.label in continues and block.instructions[-1].op is Op.Branch:
+            kept.append(Block(block.label, block.instructions[-1:]))
+    kept_labels = {block.label for block in kept}
+
+    # Phis only keep the edges that still exist; edges from blocks that
+    # stay unreachable carry an undefined value
+    undefs = {}
+    replace = {}
+    preds = {label: set() for label in kept_labels}
+    for block in kept:
+        for succ in block.successors():
+            preds[succ].add(block.label)
+    for block in kept:
+        if not any(inst.op is Op.Phi for inst in block.instructions):
+            continue
+        out = []
+        for inst in block.instructions:
+            if inst.op is not Op.Phi:
+                out.append(inst)
+                continue
+            operands = inst.operands
+            pairs = []
+            for value, pred in zip(operands[0::2], operands[1::2]):
+                if pred not in preds[block.label]:
+                    continue
+                if pred not in reachable:
+                    if inst.type not in undefs:
+                        undefs[inst.type] = new_id()
+                    value = undefs[inst.type]
+                pairs.append((value, pred))
+            values = {value for value, _ in pairs} - {inst.result}
+            if len(values) == 1:
+                replace[inst.result] = values.pop()
+            else:
+                inst.operands = tuple(x for pair in pairs for x in pair)
+                out.append(inst)
+        block.instructions = out
+
+    # Merge each block into the block before it if that one only falls
+    # through to it (a loop header stays a block of its own)
+    refs = label_references(inst for block in kept for inst in block.instructions)
+    merged_into = {}
+    merged = [kept[0]]
+    for block in kept[1:]:
+        prev = merged[-1].instructions
+        last = prev[-1]
+        falls_through = (
+            last.op is Op.Branch and last.operands[0] == block.label
+            and refs.get(block.label) == 1
+            and not (len(prev) > 1 and prev[-2].op in _MERGES)
+            and not any(inst.op is Op.LoopMerge for inst in block.instructions)
+        )
+        if not falls_through:
+            merged.append(block)
+            continue
+        for inst in block.instructions:
+            if inst.op is Op.Phi:
+                replace[inst.result] = inst.operands[0]     # single predecessor
+        prev[-1:] = [inst for inst in block.instructions if inst.op is not Op.Phi]
+        merged_into[block.label] = merged[-1].label     # phis naming it as predecessor
+
+    for block in merged:
+        if replace or merged_into:
+            for inst in block.instructions:
+                if inst.op is Op.Phi:
+                    # Values and predecessors are never the same IDs
+                    inst.operands = tuple(
+                        _resolve(_resolve(x, replace), merged_into) for x in inst.operands)
+                elif replace:
+                    inst.operands = tuple([_resolve(x, replace) for x in inst.operands])
+    if undefs:
+        # OpUndef after the OpVariables, which must come first
+        instructions = merged[0].instructions
+        count = sum(1 for inst in instructions if inst.op is Op.Variable)
+        instructions[count:count] = [Instruction(Op.Undef, undef_id, type_id)
+                                     for type_id, undef_id in undefs.items()]
+    function.blocks = merged
+
+
+def remove_dead_instructions(function):
+    """
+    Removes dead stores and unused instructions from a function.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+    """
+    code = []       # (block number, instruction)
+    for number, block in enumerate(function.blocks):
+        code.extend((number, inst) for inst in block.instructions)
+    dead = set()    # indices into code
+
+    # Roots of pointers, for aliasing (as in value_numbering)
+    roots = {}
+    for _, inst in code:
+        if inst.op is Op.Variable:
+            roots[inst.result] = inst.result
+        elif inst.op in _ACCESS_CHAINS:
+            roots[inst.result] = roots.get(inst.operands[0], _GLOBAL)
+
+    # Stores overwritten in the same block before anything may read them
+    pending = {}    # pointer → index of its last store
+    current = None
+    for i, (number, inst) in enumerate(code):
+        if number != current:
+            pending.clear()
+            current = number
+        if inst.op is Op.Load:
+            root = roots.get(inst.operands[0], _GLOBAL)
+            for pointer in [p for p in pending if roots.get(p, _GLOBAL) == root]:
+                del pending[pointer]
+        elif inst.op is Op.Store:
+            pointer = inst.operands[0]
+            if pointer in pending:
+                dead.add(pending[pointer])
+            pending[pointer] = i
+
+    # Function variables that are written but never read
+    read_roots = set()
+    for _, inst in code:
+        for position, operand in enumerate(inst.operands):
+            root = roots.get(operand)
+            if root is None or root == _GLOBAL:
+                continue
+            is_address = position == 0 and (inst.op is Op.Store or inst.op in _ACCESS_CHAINS)
+            if not is_address:
+                read_roots.add(root)
+    for i, (_, inst) in enumerate(code):
+        if inst.op is Op.Store and roots.get(inst.operands[0], _GLOBAL) not in read_roots | {_GLOBAL}:
+            dead.add(i)
+        elif inst.op is Op.Variable and inst.result not in read_roots:
+            dead.add(i)
+
+    # Everything else is live only if something live uses it
+    definitions = {inst.result: i for i, (_, inst) in enumerate(code) if inst.result is not None}
+    live = set()
+    pending = []
+    for i, (_, inst) in enumerate(code):
+        if i not in dead and inst.op not in _REMOVABLE:
+            live.add(i)
+            pending.append(i)
+    while pending:
+        for operand in code[pending.pop()][1].operands:
+            j = definitions.get(operand)
+            if j is not None and j not in live and j not in dead:
+                live.add(j)
+                pending.append(j)
+
+    for block in function.blocks:
+        block.instructions = []
+    for i, (number, inst) in enumerate(code):
+        if i in live:
+            function.blocks[number].instructions.append(inst)
+
+
+def remove_unused_constants(constants, *users):
+    """
+    Drops the constant declarations nothing refers to.
+
+    Args:
+        constants (list[Instruction]): OpConstant... declarations.
+        *users (iterable[Instruction]): Every other instruction of the module.
+
+    Returns:
+        list[Instruction]: The constants still in use, in their original order.
+    """
+    used = set()
+    for instructions in users:
+        for inst in instructions:
+            used.update(inst.operands)
+    return [inst for inst in constants if inst.result in used]
@@ -1,34 +1,73 @@
 import sil_ast
+from .ir import Instruction, Op
 
 
 def generate_expr(self, expr):
     """
-    Dispatches expression generation based on AST node type.
+    Generates code for an expression tree.
+
+    The tree is walked in post-order with an explicit stack rather than by
+    recursion, so arbitrarily deep expressions neither hit Python's
+    recursion limit nor copy their code lists at every level: all
+    instructions are appended to a single list in evaluation order.
 
     Args:
         expr (AST node): A sil_ast expression node.
 
     Returns:
-        tuple: (code: list[str], result_id: str, result_type: str)
+        tuple: (code: list[Instruction], result_id: int, result_type: str)
     """
-    if isinstance(expr, sil_ast.Literal):
-        return _generate_literal(self, expr)
-    elif isinstance(expr, sil_ast.Ident):
-        return _generate_ident(self, expr)
-    elif isinstance(expr, sil_ast.UnaryOp):
-        return _generate_unary(self, expr)
-    elif isinstance(expr, sil_ast.BinaryOp):
-        return _generate_binary(self, expr)
-    elif isinstance(expr, sil_ast.BitwiseExpr):
-        return self.generate_expr(expr.expr)
-    elif isinstance(expr, sil_ast.CastExpr):
-        return _generate_cast(self, expr)
-    elif isinstance(expr, sil_ast.Dereference):
-        return _generate_dereference(self, expr)
-    elif isinstance(expr, sil_ast.AddressOf):
-        return _generate_addressof(self, expr)
-    else:
-        raise Exception(f"Unsupported expression type: {type(expr)}")
+    code = []
+    values = []                 # (result_id, result_type) of finished sub-expressions
+    stack = [(expr, False)]     # (node, children already generated?)
+
+    while stack:
+        node, ready = stack.pop()
+
+        if ready:
+            if isinstance(node, sil_ast.BinaryOp):
+                right = values.pop()
+                values.append(_generate_binary(self, node, values.pop(), right, code))
+            elif isinstance(node, sil_ast.UnaryOp):
+                values.append(_generate_unary(self, node, values.pop(), code))
+            elif isinstance(node, sil_ast.CastExpr):
+                values.append(_generate_cast(self, node, values.pop(), code))
+            elif isinstance(node, sil_ast.Dereference):
+                values.append(_generate_dereference(self, node, values.pop(), code))
+            elif isinstance(node, sil_ast.Index):
+                count = len(_index_chain(node)[1])
+                indices = values[-count:]
+                del values[-count:]
+                values.append(_generate_index(self, node, indices, code))
+            # BitwiseExpr: the value of the inner expression is the result
+            continue
+
+        if isinstance(node, sil_ast.Literal):
+            values.append(_generate_literal(self, node))
+        elif isinstance(node, sil_ast.Ident):
+            values.append(_generate_ident(self, node, code))
+        elif isinstance(node, sil_ast.Builtin):
+            values.append(_generate_builtin(self, node, code))
+        elif isinstance(node, sil_ast.BinaryOp):
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+        elif isinstance(node, (sil_ast.UnaryOp, sil_ast.BitwiseExpr,
+                               sil_ast.CastExpr, sil_ast.Dereference)):
+            stack.append((node, True))
+            stack.append((node.expr, False))
+        elif isinstance(node, sil_ast.Index):
+            # All indices of a[i][j] are evaluated, left to right, before
+            # one access chain addresses the element
+            stack.append((node, True))
+            stack.extend((index, False) for index in reversed(_index_chain(node)[1]))
+        elif isinstance(node, sil_ast.AddressOf):
+            values.append(_generate_addressof(self, node))
+        else:
+            raise Exception(f"Unsupported expression type: {type(node)}")
+
+    result_id, result_type = values.pop()
+    return code, result_id, result_type
 
 
 # === Individual expression handlers ===
@@ -38,22 +77,47 @@ def _generate_literal(self, expr):
     Generates a constant literal.
 
     Returns:
-        ([], %id, 'uint' | 'float')
+        (%id, 'uint' | 'float')
     """
     const_id = self.get_constant(expr.value)
     if isinstance(expr.value, int):
-        return [], const_id, 'uint'
+        return const_id, 'uint'
     elif isinstance(expr.value, float):
-        return [], const_id, 'float'
+        return const_id, 'float'
     else:
         raise Exception(f"Unsupported literal type: {type(expr.value)}")
 
 
-def _generate_ident(self, expr):
+def _generate_builtin(self, expr, result):
+    """
+    Reads one dimension of a work-item value such as global_id(0),
+    appending the instructions to `result`.
+
+    The builtin's vector is loaded once per kernel, in the entry block
+    (see functions.generate_kernel), so every use is a pure extract and
+    conversion of that value, which value numbering and licm treat like
+    any other arithmetic.
+
+    Returns:
+        (%id, 'uint')
+    """
+    var_id = self.get_builtin_variable(expr.name)
+    vector = self.kernel_builtins.get(var_id)
+    if vector is None:
+        vector = self.kernel_builtins[var_id] = self.new_id()
+
+    component = self.new_id()
+    result.append(Instruction(Op.CompositeExtract, component, self.type_ids['ulong'], (vector, str(expr.dim))))
+    value = self.new_id()
+    result.append(Instruction(Op.UConvert, value, self.type_ids['uint'], (component,)))
+    return value, 'uint'
+
+
+def _generate_ident(self, expr, result):
     """
-    Loads the value of a variable, parameter, or constant.
+    Loads the value of a variable, parameter, or constant, appending any
+    instructions to `result`.
     """
-    result = []
 
     # Constant declaration
     if expr.name in self.constants:
@@ -63,37 +127,154 @@ def _generate_ident(self, expr):
             if expr.name in self.var_ids:
                 var_ptr, var_type = self.var_ids[expr.name]
                 result_id = self.new_id()
-                result.append(f"{result_id} = OpLoad {self.type_ids[var_type]} {var_ptr}")
+                result.append(Instruction(Op.Load, result_id, self.type_ids[var_type], (var_ptr,)))
                 self.constants[expr.name] = result_id
                 self.constant_types[expr.name] = var_type
-                return result, result_id, var_type
+                return result_id, var_type
             else:
                 raise Exception(f"Constant used before being initialized: {expr.name}")
 
         const_type = self.constant_types.get(expr.name, 'uint')
-        return result, const_id, const_type
+        return const_id, const_type
+
+    # Arrays have no value of their own
+    elif expr.name in self.array_ids:
+        raise Exception(f"Array '{expr.name}' used without an index")
 
     # Variable
     elif expr.name in self.var_ids:
         var_ptr, var_type = self.var_ids[expr.name]
         if var_type.startswith('ptr_'):
-            return result, var_ptr, var_type
+            return var_ptr, var_type
         result_id = self.new_id()
-        result.append(f"{result_id} = OpLoad {self.type_ids[var_type]} {var_ptr}")
-        return result, result_id, var_type
+        result.append(Instruction(Op.Load, result_id, self.type_ids[var_type], (var_ptr,)))
+        return result_id, var_type
 
     # Parameter
     elif expr.name in self.param_ids:
         param_ptr, param_type = self.param_ids[expr.name]
         if param_type.startswith('ptr_'):
-            return result, param_ptr, param_type
+            return param_ptr, param_type
         result_id = self.new_id()
-        result.append(f"{result_id} = OpLoad {self.type_ids[param_type]} {param_ptr}")
-        return result, result_id, param_type
+        result.append(Instruction(Op.Load, result_id, self.type_ids[param_type], (param_ptr,)))
+        return result_id, param_type
 
     raise Exception(f"Unknown identifier: {expr.name}")
 
 
+def _index_chain(expr):
+    """
+    Splits a[i][j] into the array name and its index expressions.
+
+    Returns:
+        tuple: (name: str, indices: list of AST nodes, outermost first)
+    """
+    indices = []
+    while isinstance(expr, sil_ast.Index):
+        indices.append(expr.index)
+        expr = expr.base
+    if not isinstance(expr, sil_ast.Ident):
+        raise Exception("Only named arrays can be indexed")
+    indices.reverse()
+    return expr.name, indices
+
+
+def _access_chain(self, expr, indices, result):
+    """
+    Emits the address computation of the element addressed by already
+    generated index values. Indices are not bounds-checked.
+
+    Local arrays are addressed with an OpAccessChain. Array parameters are
+    buffers of elements in row-major order: the indices are flattened into
+    one element offset for an OpInBoundsPtrAccessChain.
+
+    Returns:
+        (%pointer, element type)
+    """
+    name, index_nodes = _index_chain(expr)
+    info = self.array_ids.get(name)
+    if info is None:
+        raise Exception(f"Indexing a non-array: {name}")
+    array_ptr, element_type, dims, storage = info
+
+    if len(indices) != len(dims):
+        raise Exception(
+            f"Array '{name}' has {len(dims)} dimension(s) but is indexed with {len(indices)}"
+        )
+    for index_id, index_type in indices:
+        if index_type not in ('uint', 'int'):
+            raise Exception(f"Array index must be an integer, got {index_type}")
+
+    ptr_id = self.new_id()
+    if storage == 'buffer':
+        offset_id = _flat_offset(self, dims, index_nodes, indices, result)
+        result.append(Instruction(
+            Op.InBoundsPtrAccessChain, ptr_id, self.type_ids[f'ptr_cross_{element_type}'],
+            (array_ptr, offset_id)
+        ))
+    else:
+        index_ids = tuple(index_id for index_id, _ in indices)
+        result.append(Instruction(
+            Op.AccessChain, ptr_id, self.type_ids[f'ptr_{storage}_{element_type}'],
+            (array_ptr,) + index_ids
+        ))
+    return ptr_id, element_type
+
+
+def _flat_offset(self, dims, index_nodes, indices, result):
+    """
+    Computes the row-major element offset of a[i][j]...: ((i * d1) + j) * d2 + ...
+    Literal indices give a constant offset and no instructions.
+
+    Returns:
+        int: ID of the offset (uint).
+    """
+    if all(isinstance(node, sil_ast.Literal) for node in index_nodes):
+        offset = 0
+        for node, size in zip(index_nodes, dims):
+            offset = offset * size + node.value
+        return self.get_constant(offset)
+
+    uint_type = self.type_ids['uint']
+    offset_id = indices[0][0]
+    for (index_id, _), size in zip(indices[1:], dims[1:]):
+        scaled_id = self.new_id()
+        result.append(Instruction(Op.IMul, scaled_id, uint_type, (offset_id, self.get_constant(size))))
+        offset_id = self.new_id()
+        result.append(Instruction(Op.IAdd, offset_id, uint_type, (scaled_id, index_id)))
+    return offset_id
+
+
+def generate_element_pointer(self, expr, result):
+    """
+    Computes the address of an array element, e.g. the target of
+    a[i][j] = value, evaluating its indices first.
+
+    Args:
+        expr (sil_ast.Index): The indexing expression.
+        result (list[Instruction]): Instructions are appended here.
+
+    Returns:
+        tuple: (pointer_id: int, element_type: str)
+    """
+    indices = []
+    for index in _index_chain(expr)[1]:
+        code, index_id, index_type = self.generate_expr(index)
+        result.extend(code)
+        indices.append((index_id, index_type))
+    return _access_chain(self, expr, indices, result)
+
+
+def _generate_index(self, expr, indices, result):
+    """
+    Loads an array element: a[i][j].
+    """
+    ptr_id, element_type = _access_chain(self, expr, indices, result)
+    result_id = self.new_id()
+    result.append(Instruction(Op.Load, result_id, self.type_ids[element_type], (ptr_id,)))
+    return result_id, element_type
+
+
 def _generate_addressof(self, expr):
     """
     Gets the address of a variable.
@@ -109,86 +290,96 @@ def _generate_addressof(self, expr):
             raise Exception("SPIR-V kernels do not support pointer-to-pointer.")
 
         ptr_type = f"ptr_{var_type}"
-        return [], var_id, ptr_type
+        return var_id, ptr_type
 
     raise Exception("AddressOf is only valid on identifiers.")
 
 
-def _generate_dereference(self, expr):
+def _generate_dereference(self, expr, operand, result):
     """
     Loads the value pointed to by a pointer.
     """
-    result = []
-    code, ptr_id, ptr_type = self.generate_expr(expr.expr)
-    result.extend(code)
+    ptr_id, ptr_type = operand
 
     if not ptr_type.startswith("ptr_"):
         raise Exception(f"Dereferencing non-pointer type: {ptr_type}")
 
     val_type = ptr_type[len("ptr_"):]
     result_id = self.new_id()
-    result.append(f"{result_id} = OpLoad {self.type_ids[val_type]} {ptr_id}")
-    return result, result_id, val_type
+    result.append(Instruction(Op.Load, result_id, self.type_ids[val_type], (ptr_id,)))
+    return result_id, val_type
 
 
-def _generate_unary(self, expr):
+def _generate_unary(self, expr, operand, result):
     """
     Handles unary operations: !, -, ~
     """
-    result = []
-    code, operand_id, operand_type = self.generate_expr(expr.expr)
-    result.extend(code)
+    operand_id, operand_type = operand
 
     if expr.op == '!':
         if operand_type == 'bool':
             conv_id = self.new_id()
-            result.append(
-                f"{conv_id} = OpSelect {self.type_ids['uint']} {operand_id} "
-                f"{self.get_constant(1)} {self.get_constant(0)}"
-            )
+            result.append(Instruction(
+                Op.Select, conv_id, self.type_ids['uint'],
+                (operand_id, self.get_constant(1), self.get_constant(0))
+            ))
             operand_id = conv_id
             operand_type = 'uint'
 
         one_const = self.get_constant(1)
         sub_id = self.new_id()
-        result.append(f"{sub_id} = OpISub {self.type_ids['uint']} {one_const} {operand_id}")
+        result.append(Instruction(Op.ISub, sub_id, self.type_ids['uint'], (one_const, operand_id)))
         result_id = self.new_id()
-        result.append(f"{result_id} = OpINotEqual {self.type_ids['bool']} {sub_id} {self.get_constant(0)}")
-        return result, result_id, 'bool'
+        result.append(Instruction(Op.INotEqual, result_id, self.type_ids['bool'], (sub_id, self.get_constant(0))))
+        return result_id, 'bool'
 
     elif expr.op == '-':
         result_id = self.new_id()
-        result.append(f"{result_id} = OpSNegate {self.type_ids[operand_type]} {operand_id}")
-        return result, result_id, operand_type
+        result.append(Instruction(Op.SNegate, result_id, self.type_ids[operand_type], (operand_id,)))
+        return result_id, operand_type
 
     elif expr.op == '~':
         result_id = self.new_id()
-        result.append(f"{result_id} = OpNot {self.type_ids[operand_type]} {operand_id}")
-        return result, result_id, operand_type
+        result.append(Instruction(Op.Not, result_id, self.type_ids[operand_type], (operand_id,)))
+        return result_id, operand_type
 
     raise Exception(f"Unsupported unary operator: {expr.op}")
 
 
-def _generate_binary(self, expr):
+# Operator mappings
+_OP_MAP_INT = {
+    '+': Op.IAdd, '-': Op.ISub, '*': Op.IMul, '/': Op.SDiv,
+    '//': Op.UDiv, '%': Op.UMod, '==': Op.IEqual, '!=': Op.INotEqual,
+    '<': Op.ULessThan, '>': Op.UGreaterThan, '<=': Op.ULessThanEqual,
+    '>=': Op.UGreaterThanEqual, '&&': Op.LogicalAnd, '||': Op.LogicalOr,
+    '&': Op.BitwiseAnd, '|': Op.BitwiseOr, '^': Op.BitwiseXor,
+    '<<': Op.ShiftLeftLogical, '>>': Op.ShiftRightLogical
+}
+
+_OP_MAP_FLOAT = {
+    '+': Op.FAdd, '-': Op.FSub, '*': Op.FMul, '/': Op.FDiv,
+    '==': Op.FOrdEqual, '!=': Op.FOrdNotEqual, '<': Op.FOrdLessThan,
+    '>': Op.FOrdGreaterThan, '<=': Op.FOrdLessThanEqual, '>=': Op.FOrdGreaterThanEqual
+}
+
+
+def _generate_binary(self, expr, left, right, result):
     """
     Handles all binary operations: arithmetic, logical, comparison, bitwise.
     """
-    result = []
-    left_code, left_id, left_type = self.generate_expr(expr.left)
-    right_code, right_id, right_type = self.generate_expr(expr.right)
-    result.extend(left_code)
-    result.extend(right_code)
+    left_id, left_type = left
+    right_id, right_type = right
 
     # Convert uint to bool for logical ops
     if expr.op in ['&&', '||']:
         if left_type == 'uint':
             conv_id = self.new_id()
-            result.append(f"{conv_id} = OpINotEqual {self.type_ids['bool']} {left_id} {self.get_constant(0)}")
+            result.append(Instruction(Op.INotEqual, conv_id, self.type_ids['bool'], (left_id, self.get_constant(0))))
             left_id = conv_id
             left_type = 'bool'
         if right_type == 'uint':
             conv_id = self.new_id()
-            result.append(f"{conv_id} = OpINotEqual {self.type_ids['bool']} {right_id} {self.get_constant(0)}")
+            result.append(Instruction(Op.INotEqual, conv_id, self.type_ids['bool'], (right_id, self.get_constant(0))))
             right_id = conv_id
             right_type = 'bool'
 
@@ -198,30 +389,15 @@ def _generate_binary(self, expr):
     result_id = self.new_id()
 
     # Operator mappings
-    op_map_int = {
-        '+': 'OpIAdd', '-': 'OpISub', '*': 'OpIMul', '/': 'OpSDiv',
-        '//': 'OpUDiv', '%': 'OpUMod', '==': 'OpIEqual', '!=': 'OpINotEqual',
-        '<': 'OpULessThan', '>': 'OpUGreaterThan', '<=': 'OpULessThanEqual',
-        '>=': 'OpUGreaterThanEqual', '&&': 'OpLogicalAnd', '||': 'OpLogicalOr',
-        '&': 'OpBitwiseAnd', '|': 'OpBitwiseOr', '^': 'OpBitwiseXor',
-        '<<': 'OpShiftLeftLogical', '>>': 'OpShiftRightLogical'
-    }
-
-    op_map_float = {
-        '+': 'OpFAdd', '-': 'OpFSub', '*': 'OpFMul', '/': 'OpFDiv',
-        '==': 'OpFOrdEqual', '!=': 'OpFOrdNotEqual', '<': 'OpFOrdLessThan',
-        '>': 'OpFOrdGreaterThan', '<=': 'OpFOrdLessThanEqual', '>=': 'OpFOrdGreaterThanEqual'
-    }
-
     comparison_ops = ['==', '!=', '<', '>', '<=', '>=']
 
     if left_type == 'float':
-        instr = op_map_float.get(expr.op)
+        instr = _OP_MAP_FLOAT.get(expr.op)
         if not instr:
             raise Exception(f"Unsupported float binary operator: {expr.op}")
         result_type = self.type_ids['bool'] if expr.op in comparison_ops else self.type_ids['float']
     else:
-        instr = op_map_int.get(expr.op)
+        instr = _OP_MAP_INT.get(expr.op)
         if not instr:
             raise Exception(f"Unsupported int binary operator: {expr.op}")
         result_type = (
@@ -229,38 +405,36 @@ def _generate_binary(self, expr):
             else self.type_ids['uint']
         )
 
-    result.append(f"{result_id} = {instr} {result_type} {left_id} {right_id}")
-    return result, result_id, 'bool' if expr.op in comparison_ops else left_type
+    result.append(Instruction(instr, result_id, result_type, (left_id, right_id)))
+    return result_id, 'bool' if expr.op in comparison_ops else left_type
 
 
-def _generate_cast(self, expr):
+def _generate_cast(self, expr, operand, result):
     """
     Generates cast instructions between uint, float, and int.
     """
-    result = []
-    code, value_id, value_type = self.generate_expr(expr.expr)
-    result.extend(code)
+    value_id, value_type = operand
 
     target_type = expr.target_type
     target_type_id = self.type_ids[target_type]
 
     if value_type == target_type:
-        return result, value_id, value_type
+        return value_id, value_type
 
     result_id = self.new_id()
 
     if value_type == 'uint' and target_type == 'float':
-        op = 'OpConvertUToF'
+        op = Op.ConvertUToF
     elif value_type == 'float' and target_type == 'uint':
-        op = 'OpConvertFToU'
+        op = Op.ConvertFToU
     elif value_type == 'float' and target_type == 'int':
-        op = 'OpConvertFToU'  # enforced simplification
+        op = Op.ConvertFToU  # enforced simplification
     elif value_type == 'int' and target_type == 'float':
-        op = 'OpConvertUToF'  # enforced simplification
+        op = Op.ConvertUToF  # enforced simplification
     elif value_type in ['int', 'uint'] and target_type in ['int', 'uint']:
-        op = 'OpBitcast'
+        op = Op.Bitcast
     else:
         raise Exception(f"Unsupported cast from {value_type} to {target_type}")
 
-    result.append(f"{result_id} = {op} {target_type_id} {value_id}")
-    return result, result_id, target_type
+    result.append(Instruction(op, result_id, target_type_id, (value_id,)))
+    return result_id, target_type
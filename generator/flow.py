@@ -1,4 +1,6 @@
-from .utils import ends_with_branch
+import sil_ast
+from .ir import Instruction, Op
+from .utils import append_statement, ends_with_branch
 
 
 def generate_if(self, stmt):
@@ -21,7 +23,7 @@ def generate_if(self, stmt):
         stmt (sil_ast.If): The parsed AST node representing the if-statement.
 
     Returns:
-        list[str]: SPIR-V instructions for the conditional block.
+        list[Instruction]: SPIR-V instructions for the conditional block.
     """
     result = []
 
@@ -34,30 +36,30 @@ def generate_if(self, stmt):
     result.extend(cond_code)
 
     # Selection merge instruction
-    result.append(f"OpSelectionMerge {merge_label} None")
+    result.append(Instruction(Op.SelectionMerge, operands=(merge_label, "None")))
     if else_label:
-        result.append(f"OpBranchConditional {cond_id} {then_label} {else_label}")
+        result.append(Instruction(Op.BranchConditional, operands=(cond_id, then_label, else_label)))
     else:
-        result.append(f"OpBranchConditional {cond_id} {then_label} {merge_label}")
+        result.append(Instruction(Op.BranchConditional, operands=(cond_id, then_label, merge_label)))
 
     # Then block
-    result.append(f"{then_label} = OpLabel")
+    result.append(Instruction(Op.Label, then_label))
     for s in stmt.then_body:
-        result.extend(self.generate_stmt(s))
+        append_statement(result, self.generate_stmt(s))
 
     if not ends_with_branch(result):
-        result.append(f"OpBranch {merge_label}")
+        result.append(Instruction(Op.Branch, operands=(merge_label,)))
 
     # Else block (optional)
     if stmt.else_body:
-        result.append(f"{else_label} = OpLabel")
+        result.append(Instruction(Op.Label, else_label))
         for s in stmt.else_body:
-            result.extend(self.generate_stmt(s))
+            append_statement(result, self.generate_stmt(s))
         if not ends_with_branch(result):
-            result.append(f"OpBranch {merge_label}")
+            result.append(Instruction(Op.Branch, operands=(merge_label,)))
 
     # Merge block
-    result.append(f"{merge_label} = OpLabel")
+    result.append(Instruction(Op.Label, merge_label))
     return result
 
 
@@ -79,7 +81,7 @@ def generate_loop(self, stmt):
         stmt (sil_ast.Loop): The parsed loop block.
 
     Returns:
-        list[str]: SPIR-V instructions for the loop structure.
+        list[Instruction]: SPIR-V instructions for the loop structure.
     """
     merge = self.new_id()
     continue_ = self.new_id()
@@ -94,32 +96,196 @@ def generate_loop(self, stmt):
     result = []
 
     # Header block
-    result.append(f"{header} = OpLabel")
-    result.append(f"OpLoopMerge {merge} {continue_} None")
-    result.append(f"OpBranch {cond}")
+    result.append(Instruction(Op.Label, header))
+    result.append(Instruction(Op.LoopMerge, operands=(merge, continue_, "None")))
+    result.append(Instruction(Op.Branch, operands=(cond,)))
 
     # Condition block (currently unconditional)
-    result.append(f"{cond} = OpLabel")
-    result.append(f"OpBranch {body}")
+    result.append(Instruction(Op.Label, cond))
+    result.append(Instruction(Op.Branch, operands=(body,)))
 
     # Body block
-    result.append(f"{body} = OpLabel")
-    loop_body = []
+    result.append(Instruction(Op.Label, body))
     for s in stmt.body:
-        loop_body.extend(self.generate_stmt(s))
+        append_statement(result, self.generate_stmt(s))
 
-    if not ends_with_branch(loop_body):
-        loop_body.append(f"OpBranch {continue_}")
-    result.extend(loop_body)
+    if not ends_with_branch(result):
+        result.append(Instruction(Op.Branch, operands=(continue_,)))
 
-    # Continue block
-    result.append(f"{continue_} = OpLabel")
-    result.append(f"OpBranch {cond}")
+    # Continue block: the back edge, which must target the loop header
+    result.append(Instruction(Op.Label, continue_))
+    result.append(Instruction(Op.Branch, operands=(header,)))
 
     # Merge block (loop exit)
-    result.append(f"{merge} = OpLabel")
+    result.append(Instruction(Op.Label, merge))
 
     # Restore previous break target
     self.break_target = prev_break_target
 
     return result
+
+
+def generate_for(self, stmt):
+    """
+    Generates SPIR-V code for a counted loop: for var in range(start, end).
+
+    With self.max_unroll set, loops whose bounds are literals are unrolled
+    at compile time:
+    - up to max_unroll iterations: fully, into straight-line code
+    - more: partially, repeating the body by the largest factor that
+      divides the trip count and does not exceed max_unroll
+    Loops containing a break are never unrolled here. The OpLoopMerge of
+    the remaining loops tells the driver whether to unroll them further:
+    DontUnroll once the compiler has unrolled as far as allowed, Unroll
+    for short loops it could not unroll itself.
+
+    Args:
+        stmt (sil_ast.For): The parsed for-loop.
+
+    Returns:
+        list[Instruction]: SPIR-V instructions for the loop.
+    """
+    if self.max_unroll is None:
+        return _generate_for_loop(self, stmt, 1, "None")
+
+    trips = _trip_count(stmt)
+    if trips is None:
+        return _generate_for_loop(self, stmt, 1, "DontUnroll" if self.max_unroll == 0 else "None")
+
+    if _breaks_out(stmt.body):
+        return _generate_for_loop(self, stmt, 1, "Unroll" if trips <= self.max_unroll else "DontUnroll")
+
+    if trips <= self.max_unroll:
+        return _generate_unrolled_for(self, stmt)
+
+    factor = max((f for f in range(1, self.max_unroll + 1) if trips % f == 0), default=1)
+    return _generate_for_loop(self, stmt, factor, "DontUnroll")
+
+
+def _trip_count(stmt):
+    """Returns the number of iterations of a for-loop with literal bounds, else None."""
+    start, end = stmt.start, stmt.end
+    if not (isinstance(start, sil_ast.Literal) and isinstance(end, sil_ast.Literal)):
+        return None
+    if not (isinstance(start.value, int) and isinstance(end.value, int)):
+        return None
+    return max(0, end.value - start.value)
+
+
+def _breaks_out(body):
+    """Checks whether a loop body contains a break that leaves this loop."""
+    pending = list(body)
+    while pending:
+        stmt = pending.pop()
+        if isinstance(stmt, sil_ast.Break):
+            return True
+        if isinstance(stmt, sil_ast.If):
+            pending.extend(stmt.then_body)
+            pending.extend(stmt.else_body or ())
+        # Breaks inside nested loops leave those loops only
+    return False
+
+
+def _generate_body(self, stmt, result):
+    """Appends one copy of a for-loop body to `result`."""
+    for s in stmt.body:
+        append_statement(result, self.generate_stmt(s))
+
+
+def _generate_unrolled_for(self, stmt):
+    """
+    Fully unrolls a for-loop with literal bounds: before each copy of the
+    body, the induction variable is set to that iteration's value.
+    """
+    result = []
+    var_ptr, _ = self.var_ids[stmt.var]
+    for value in range(stmt.start.value, stmt.end.value):
+        result.append(Instruction(Op.Store, operands=(var_ptr, self.get_constant(value))))
+        _generate_body(self, stmt, result)
+    return result
+
+
+def _generate_for_loop(self, stmt, factor, control):
+    """
+    Generates a for-loop as a SPIR-V loop whose body holds `factor` copies
+    of the loop body. The trip count must be a multiple of `factor`.
+
+    Both bounds are evaluated once, before the loop. The induction variable
+    lives in the Function variable allocated for it in the entry block.
+
+    Structure:
+        var = start
+        header:   var < end ? body : merge   (OpLoopMerge <control>)
+        body:     body, var = var + 1, body, ... (factor copies)
+        continue: var = var + 1, back to header
+        merge:
+
+    Args:
+        stmt (sil_ast.For): The parsed for-loop.
+        factor (int): Copies of the body per iteration.
+        control (str): Loop control operand of OpLoopMerge.
+
+    Returns:
+        list[Instruction]: SPIR-V instructions for the loop structure.
+    """
+    result = []
+
+    var_ptr, _ = self.var_ids[stmt.var]
+    uint = self.type_ids['uint']
+
+    start_code, start_id, start_type = self.generate_expr(stmt.start)
+    end_code, end_id, end_type = self.generate_expr(stmt.end)
+    for bound_type in (start_type, end_type):
+        if bound_type not in ('uint', 'int'):
+            raise Exception(f"Loop bounds must be integers, got {bound_type}")
+    result.extend(start_code)
+    result.extend(end_code)
+    result.append(Instruction(Op.Store, operands=(var_ptr, start_id)))
+
+    header = self.new_id()
+    body = self.new_id()
+    continue_ = self.new_id()
+    merge = self.new_id()
+
+    prev_break_target = getattr(self, 'break_target', None)
+    self.break_target = merge
+
+    # Header block: the exit test
+    result.append(Instruction(Op.Branch, operands=(header,)))
+    result.append(Instruction(Op.Label, header))
+    current = self.new_id()
+    cond = self.new_id()
+    result.append(Instruction(Op.Load, current, uint, (var_ptr,)))
+    result.append(Instruction(Op.ULessThan, cond, self.type_ids['bool'], (current, end_id)))
+    result.append(Instruction(Op.LoopMerge, operands=(merge, continue_, control)))
+    result.append(Instruction(Op.BranchConditional, operands=(cond, body, merge)))
+
+    # Body block
+    result.append(Instruction(Op.Label, body))
+    _generate_body(self, stmt, result)
+    for _ in range(factor - 1):
+        _increment(self, var_ptr, result)
+        _generate_body(self, stmt, result)
+    if not ends_with_branch(result):
+        result.append(Instruction(Op.Branch, operands=(continue_,)))
+
+    # Continue block: step the induction variable
+    result.append(Instruction(Op.Label, continue_))
+    _increment(self, var_ptr, result)
+    result.append(Instruction(Op.Branch, operands=(header,)))
+
+    # Merge block (loop exit)
+    result.append(Instruction(Op.Label, merge))
+
+    self.break_target = prev_break_target
+    return result
+
+
+def _increment(self, var_ptr, result):
+    """Appends var = var + 1 for the induction variable at var_ptr."""
+    uint = self.type_ids['uint']
+    current = self.new_id()
+    step = self.new_id()
+    result.append(Instruction(Op.Load, current, uint, (var_ptr,)))
+    result.append(Instruction(Op.IAdd, step, uint, (current, self.get_constant(1))))
+    result.append(Instruction(Op.Store, operands=(var_ptr, step)))
@@ -1,5 +1,11 @@
 import sil_ast
 from .utils import ends_with_branch
+from .dce import remove_dead_instructions, remove_unreachable_code
+from .ir import Function, Instruction, Op
+from .licm import hoist_invariants
+from .mem2reg import promote_locals
+from .peephole import rewrite
+from .value_numbering import number_values
 
 
 def collect_entry_points_and_function_types(self, ast_tree):
@@ -11,8 +17,8 @@ def collect_entry_points_and_function_types(self, ast_tree):
 
     Returns:
         tuple:
-            - entry_points (list[str]): OpEntryPoint declarations.
-            - func_types (list[str]): OpTypeFunction declarations.
+            - entry_points (list[Instruction]): OpEntryPoint declarations.
+            - func_types (list[Instruction]): OpTypeFunction declarations.
     """
     entry_points = []
     func_types = []
@@ -32,10 +38,11 @@ def collect_entry_points_and_function_types(self, ast_tree):
 
             fn_type = self.new_id()
             self.func_type_ids[node.name] = fn_type
-            param_str = ' '.join(param_types)
 
-            func_types.append(f"{fn_type} = OpTypeFunction {self.type_ids['void']} {param_str}")
-            entry_points.append(f"OpEntryPoint Kernel {fid} \"{node.name}\"")
+            func_types.append(Instruction(Op.TypeFunction, fn_type, operands=(self.type_ids['void'], *param_types)))
+            entry_point = Instruction(Op.EntryPoint, operands=("Kernel", fid, f'"{node.name}"'))
+            self.entry_points[node.name] = entry_point
+            entry_points.append(entry_point)
 
     return entry_points, func_types
 
@@ -48,19 +55,23 @@ def generate_kernel(self, node):
         node (sil_ast.Kernel): Kernel AST node.
 
     Returns:
-        list[str]: SPIR-V instructions for the kernel.
+        Function: The kernel, optimized by the passes enabled on the
+        generator.
     """
     result = []
 
     fid = self.kernel_func_ids[node.name]
     fn_type = self.func_type_ids[node.name]
 
-    result.append(f"{fid} = OpFunction {self.type_ids['void']} None {fn_type}")
+    result.append(Instruction(Op.Function, fid, self.type_ids['void'], ("None", fn_type)))
 
     self.param_ids.clear()
     self.var_ids.clear()
+    self.array_ids.clear()
+    self.kernel_builtins.clear()
 
-    # Generate OpFunctionParameter instructions for each kernel parameter
+    # Generate OpFunctionParameter instructions for each kernel parameter.
+    # An array parameter is one buffer: a pointer to its first element
     for p in node.params:
         if p.param_type.startswith("ptr_"):
             ptr_type = self.type_ids[p.param_type]
@@ -71,12 +82,16 @@ def generate_kernel(self, node):
             raise Exception(f"Unknown pointer type for {p.param_type}")
 
         pid = self.new_id()
-        result.append(f"{pid} = OpFunctionParameter {ptr_type}")
-        self.param_ids[p.name] = (pid, p.param_type)
+        result.append(Instruction(Op.FunctionParameter, pid, ptr_type))
+        if p.dims:
+            self.array_ids[p.name] = (pid, p.param_type, p.dims, 'buffer')
+            self.physical_addressing = True
+        else:
+            self.param_ids[p.name] = (pid, p.param_type)
 
     # Entry label
-    label = self.new_id()
-    result.append(f"{label} = OpLabel")
+    entry_label = Instruction(Op.Label, self.new_id())
+    result.append(entry_label)
 
     # Organize statements
     var_decls = []
@@ -98,20 +113,26 @@ def generate_kernel(self, node):
             if const_code:
                 result.extend(const_code)
 
-    # 2. Emit local variable declarations (without initialization)
-    for var in var_decls:
+    # 2. Emit local variable declarations (without initialization), including
+    #    those nested in blocks and for-loop induction variables: every
+    #    OpVariable must be in the entry block
+    nested_decls, loop_vars = _nested_locals(other_stmts)
+    for var in var_decls + nested_decls:
         result.extend(self.generate_var_only(var))
+    for name in loop_vars:
+        if name not in self.var_ids:
+            result.extend(self.generate_var_only(sil_ast.VarDecl(name, 'uint', None)))
 
     # 3. Emit initialization code for variables
     for var in var_decls:
-        if var.value:
+        if var.value and not isinstance(var.value, sil_ast.Array):
             assign = sil_ast.Assign(sil_ast.Ident(var.name), var.value)
             result.extend(self.generate_stmt(assign))
 
     # 4. Emit initialization for constants referencing expressions or variables
     for const in const_decls:
         if not isinstance(const.value, sil_ast.Literal):
-            assign = sil_ast.Assign(name=const.name, value=const.value)
+            assign = sil_ast.Assign(sil_ast.Ident(const.name), const.value)
             assign_code = self.generate_stmt(assign)
             if assign_code:
                 result.extend(assign_code)
@@ -121,22 +142,96 @@ def generate_kernel(self, node):
         stmt_code = self.generate_stmt(stmt)
         if stmt_code is None:
             raise Exception(f"generate_stmt returned None for statement: {stmt}")
+        if not stmt_code:
+            continue  # e.g. a loop over an empty range
 
         # Ensure previous block ends with branch or return
         if not ends_with_branch(result):
-            if stmt_code[0].strip().endswith("= OpLabel"):
-                label_id = stmt_code[0].split('=')[0].strip()
-                result.append(f"OpBranch {label_id}")
+            if stmt_code[0].op is Op.Label:
+                result.append(Instruction(Op.Branch, operands=(stmt_code[0].result,)))
             else:
                 label_id = self.new_id()
-                result.append(f"OpBranch {label_id}")
-                result.append(f"{label_id} = OpLabel")
+                result.append(Instruction(Op.Branch, operands=(label_id,)))
+                result.append(Instruction(Op.Label, label_id))
 
         result.extend(stmt_code)
 
     # Ensure function ends with return
     if not (node.body and isinstance(node.body[-1], sil_ast.Return)):
-        result.append("OpReturn")
+        result.append(Instruction(Op.Return))
+
+    # Load the work-item values the kernel reads once, after the variables
+    # of the entry block, and list their variables in its entry point
+    if self.kernel_builtins:
+        position = result.index(entry_label) + 1
+        while result[position].op is Op.Variable:
+            position += 1
+        vector_type = self.type_ids['v3ulong']
+        result[position:position] = [
+            Instruction(Op.Load, vector, vector_type, (var_id,))
+            for var_id, vector in self.kernel_builtins.items()
+        ]
+        entry_point = self.entry_points[node.name]
+        entry_point.operands += tuple(self.kernel_builtins)
+
+    function = Function.from_instructions(result)
+
+    if self.dce:
+        remove_unreachable_code(function, self.new_id)
+    if self.mem2reg:
+        pointee_types = {
+            type_id: self.type_ids[name[len('ptr_func_'):]]
+            for name, type_id in self.type_ids.items() if name.startswith('ptr_func_')
+        }
+        promote_locals(function, pointee_types, self.new_id)
+    if self.peephole:
+        uint = self.type_ids['uint']
+        constants = {
+            inst.result: int(inst.operands[0]) for inst in self.constant_instructions
+            if inst.op is Op.Constant and inst.type == uint
+        }
+        rewrite(function, uint, constants, self.get_constant, self.rewrite_counts)
+    if self.cse:
+        number_values(function)
+    if self.licm:
+        scalar_params = {pid for pid, param_type in self.param_ids.values() if not param_type.startswith('ptr_')}
+        if hoist_invariants(function, scalar_params) and self.cse:
+            # Invariants of sibling loops meet in the same block now
+            number_values(function)
+    if self.dce:
+        remove_dead_instructions(function)
+    return function
+
+
+def _nested_locals(statements):
+    """
+    Finds the variables declared inside blocks and the induction variables
+    of for-loops, in source order of their enclosing blocks.
+
+    Args:
+        statements (list): Statements of a kernel body, without its
+            top-level declarations.
 
-    result.append("OpFunctionEnd")
-    return result
+    Returns:
+        tuple:
+            - decls (list[sil_ast.VarDecl]): Nested variable declarations.
+            - loop_vars (list[str]): Names of for-loop induction variables.
+    """
+    decls = []
+    loop_vars = []
+    pending = list(statements)
+    i = 0
+    while i < len(pending):
+        stmt = pending[i]
+        i += 1
+        if isinstance(stmt, sil_ast.VarDecl):
+            decls.append(stmt)
+        elif isinstance(stmt, sil_ast.For):
+            loop_vars.append(stmt.var)
+            pending.extend(stmt.body)
+        elif isinstance(stmt, sil_ast.Loop):
+            pending.extend(stmt.body)
+        elif isinstance(stmt, sil_ast.If):
+            pending.extend(stmt.then_body)
+            pending.extend(stmt.else_body or ())
+    return decls, loop_vars
@@ -1,7 +1,9 @@
 import sil_ast
 from . import types as t
 from . import expressions
+from .dce import remove_unused_constants
 from .functions import collect_entry_points_and_function_types, generate_kernel
+from .ir import Instruction, Module, Op
 from . import flow
 from . import statements
 
@@ -17,18 +19,51 @@ class Generator:
     - Expression and statement compilation
     """
 
-    def __init__(self):
+    def __init__(self, max_unroll=None, cse=True, mem2reg=True, dce=True, licm=True,
+                 peephole=True):
+        """
+        Args:
+            max_unroll (int): Unroll for-loops with literal bounds of up to
+                this many iterations fully, and longer ones partially (see
+                flow.generate_for). None leaves every for-loop a loop.
+            cse (bool): Remove repeated computations and loads from each
+                kernel (see value_numbering).
+            mem2reg (bool): Keep local variables in SSA values instead of
+                Function memory where possible (see mem2reg).
+            dce (bool): Remove unreachable blocks, dead stores, unused
+                instructions and unused constants (see dce).
+            licm (bool): Hoist loop-invariant computations and loads out of
+                loops (see licm).
+            peephole (bool): Replace wasteful instruction sequences and
+                operations by powers of two with cheaper ones (see peephole).
+        """
         self.next_id = 1  # ID counter for SPIR-V %IDs
+        self.max_unroll = max_unroll
+        self.cse = cse
+        self.mem2reg = mem2reg
+        self.dce = dce
+        self.licm = licm
+        self.peephole = peephole
 
         self.type_ids = {}          # Maps type names to SPIR-V IDs
         self.var_ids = {}           # Maps variable names to (ID, type)
         self.param_ids = {}         # Maps parameter names to (ID, type)
+        self.array_ids = {}         # Maps array names to (ID, element type, dims, storage)
         self.kernel_func_ids = {}   # Maps kernel names to function IDs
         self.func_type_ids = {}     # Maps kernel names to function type IDs
+        self.entry_points = {}      # Maps kernel names to their OpEntryPoint
 
-        self.constants = {}         # Maps literal values or const names to SPIR-V code
+        self.constants = {}         # Maps const names to SPIR-V IDs (None until initialized)
         self.constant_types = {}    # Maps const names to types
-        self.module_types = []      # Additional custom types if needed
+        self.constant_ids = {}      # Maps literal values to constant IDs
+        self.constant_instructions = []  # OpConstant... declarations, in order of first use
+        self.module_types = []      # Array types, constants that depend on other constants, builtin variables
+        self.null_ids = {}          # Maps type names to OpConstantNull IDs
+        self.builtin_ids = {}       # Maps BuiltIn decorations to their Input variable IDs
+        self.kernel_builtins = {}   # Builtin variable IDs the current kernel reads → its load of each
+        self.annotations = []       # OpDecorate instructions
+        self.physical_addressing = False  # Set when array buffers are indexed with pointer arithmetic, or builtins read
+        self.rewrite_counts = {}    # Peephole rewrites made, by rule
 
     def new_id(self):
         """
@@ -36,7 +71,7 @@ class Generator:
         """
         id = self.next_id
         self.next_id += 1
-        return f"%{id}"
+        return id
 
     def generate(self, ast_tree):
         """
@@ -48,13 +83,22 @@ class Generator:
         Returns:
             str: The full SPIR-V code as a single string.
         """
-        header = ["; SPIR-V", "; Version: 1.0"]
-        capabilities = ["OpCapability Kernel"]
-        extensions = []
-        memory_model = ["OpMemoryModel Logical OpenCL"]
-        execution_modes = []
-        debug = []
-        annotations = []
+        return self.generate_module(ast_tree).text()
+
+    def generate_module(self, ast_tree):
+        """
+        Converts the full AST into a SPIR-V module, before it is written
+        out as text (see generate).
+
+        Args:
+            ast_tree (list): List of top-level AST nodes.
+
+        Returns:
+            ir.Module: The module.
+        """
+        module = Module()
+        module.capabilities.append(Instruction(Op.Capability, operands=("Kernel",)))
+        module.memory_model = Instruction(Op.MemoryModel, operands=("Logical", "OpenCL"))
 
         # 1. Register built-in types
         types = t.generate_builtin_types(self)
@@ -71,26 +115,29 @@ class Generator:
         functions = []
         for node in ast_tree:
             if isinstance(node, sil_ast.Kernel):
-                functions.extend(self.generate_kernel(node))
+                functions.append(self.generate_kernel(node))
+
+        # OpInBoundsPtrAccessChain into array buffers needs real addresses,
+        # and work-item values are 64-bit size_t
+        if self.physical_addressing:
+            module.capabilities.append(Instruction(Op.Capability, operands=("Addresses",)))
+            module.memory_model = Instruction(Op.MemoryModel, operands=("Physical64", "OpenCL"))
+        if self.builtin_ids:
+            module.capabilities.append(Instruction(Op.Capability, operands=("Int64",)))
+
+        constants = self.constant_instructions
+        if self.dce:
+            constants = remove_unused_constants(
+                constants, entry_points, types, self.module_types, func_types,
+                *(function.instructions() for function in functions))
 
         # 5. Combine all pieces of the module
-        result = (
-            header
-            + capabilities
-            + extensions
-            + memory_model
-            + entry_points
-            + execution_modes
-            + debug
-            + annotations
-            + types
-            + func_types
-            + self.module_types
-            + self._const_instructions()
-            + functions
-        )
-
-        return "\n".join(result)
+        module.entry_points = entry_points
+        module.annotations = self.annotations
+        module.declarations = types + constants + self.module_types + func_types
+        module.functions = functions
+        module.bound = self.next_id
+        return module
 
     def _process_constants(self, statements):
         """
@@ -119,21 +166,6 @@ class Generator:
                     self.constants[stmt.name] = None
                     self.constant_types[stmt.name] = getattr(stmt, 'var_type', 'uint')
 
-    def _const_instructions(self):
-        """
-        Returns only finalized SPIR-V constant declarations.
-
-        Returns:
-            list[str]: SPIR-V OpConstant or OpConstantFalse lines.
-        """
-        out = []
-        seen = set()
-        for v in self.constants.values():
-            if '=' in v and v not in seen:
-                out.append(v)
-                seen.add(v)
-        return out
-
     # --- Delegates ---
 
     def generate_kernel(self, node):
@@ -154,8 +186,23 @@ class Generator:
     def generate_loop(self, stmt):
         return flow.generate_loop(self, stmt)
 
+    def generate_for(self, stmt):
+        return flow.generate_for(self, stmt)
+
+    def generate_element_pointer(self, expr, result):
+        return expressions.generate_element_pointer(self, expr, result)
+
     def get_constant(self, value):
         return t.get_constant(self, value)
 
     def get_constant_false(self):
         return t.get_constant_false(self)
+
+    def get_array_type(self, base, dims):
+        return t.get_array_type(self, base, dims)
+
+    def get_constant_null(self, type_name):
+        return t.get_constant_null(self, type_name)
+
+    def get_builtin_variable(self, name):
+        return t.get_builtin_variable(self, name)
@@ -0,0 +1,294 @@
+"""
+In-memory SPIR-V, as built by the generator and rewritten by its passes.
+
+Instructions are objects, not text:
+- IDs are ints; %N is only how the text form spells them
+- Op names the opcodes, numbered as in the SPIR-V specification
+- an Instruction keeps its result ID, result type ID and operands apart;
+  each operand is an ID (int) or a literal (str) written as is: a number,
+  an enumerant such as Function or DontUnroll, or a quoted string
+- a Function is its OpFunction and parameters followed by basic blocks,
+  each a label and instructions that end with a terminator
+- a Module holds the sections of a module in the order SPIR-V requires
+
+Text is produced once, by Module.text(), after every pass has run.
+"""
+
+import enum
+
+
+class Op(enum.IntEnum):
+    """SPIR-V opcodes used by the generator, by their number in the specification."""
+
+    Undef = 1
+    Name = 5
+    Extension = 10
+    ExtInstImport = 11
+    MemoryModel = 14
+    EntryPoint = 15
+    ExecutionMode = 16
+    Capability = 17
+    TypeVoid = 19
+    TypeBool = 20
+    TypeInt = 21
+    TypeFloat = 22
+    TypeVector = 23
+    TypeArray = 28
+    TypePointer = 32
+    TypeFunction = 33
+    ConstantTrue = 41
+    ConstantFalse = 42
+    Constant = 43
+    ConstantNull = 46
+    Function = 54
+    FunctionParameter = 55
+    FunctionEnd = 56
+    Variable = 59
+    Load = 61
+    Store = 62
+    AccessChain = 65
+    InBoundsPtrAccessChain = 70
+    Decorate = 71
+    CompositeExtract = 81
+    CopyObject = 83
+    ConvertFToU = 109
+    ConvertUToF = 112
+    UConvert = 113
+    Bitcast = 124
+    SNegate = 126
+    FNegate = 127
+    IAdd = 128
+    FAdd = 129
+    ISub = 130
+    FSub = 131
+    IMul = 132
+    FMul = 133
+    UDiv = 134
+    SDiv = 135
+    FDiv = 136
+    UMod = 137
+    LogicalOr = 166
+    LogicalAnd = 167
+    LogicalNot = 168
+    Select = 169
+    IEqual = 170
+    INotEqual = 171
+    UGreaterThan = 172
+    UGreaterThanEqual = 174
+    ULessThan = 176
+    ULessThanEqual = 178
+    FOrdEqual = 180
+    FOrdNotEqual = 182
+    FOrdLessThan = 184
+    FOrdGreaterThan = 186
+    FOrdLessThanEqual = 188
+    FOrdGreaterThanEqual = 190
+    ShiftRightLogical = 194
+    ShiftLeftLogical = 196
+    BitwiseOr = 197
+    BitwiseXor = 198
+    BitwiseAnd = 199
+    Not = 200
+    Phi = 245
+    LoopMerge = 246
+    SelectionMerge = 247
+    Label = 248
+    Branch = 249
+    BranchConditional = 250
+    Kill = 252
+    Return = 253
+    ReturnValue = 254
+    Unreachable = 255
+
+
+# Opcode → its name in the text form
+_NAMES = {op: "Op" + op.name for op in Op}
+
+# Instructions that end a basic block
+TERMINATORS = frozenset({Op.Branch, Op.BranchConditional, Op.Return, Op.ReturnValue,
+                         Op.Kill, Op.Unreachable})
+
+
+class Instruction:
+    """
+    One SPIR-V instruction.
+
+    Attributes:
+        op (Op): The opcode.
+        result (int): Result ID, or None.
+        type (int): Result type ID, or None.
+        operands (tuple): The remaining operands: IDs (int) and literals (str).
+    """
+
+    __slots__ = ("op", "result", "type", "operands")
+
+    def __init__(self, op, result=None, type=None, operands=()):
+        self.op = op
+        self.result = result
+        self.type = type
+        self.operands = operands
+
+    def text(self):
+        """
+        Returns the instruction in SPIR-V assembly, e.g. '%7 = OpIAdd %3 %5 %6'.
+        """
+        text = _NAMES[self.op]
+        if self.type is not None:
+            text = f"{text} %{self.type}"
+        for operand in self.operands:
+            text = f"{text} {operand}" if operand.__class__ is str else f"{text} %{operand}"
+        return f"%{self.result} = {text}" if self.result is not None else text
+
+    def __repr__(self):
+        return f"Instruction({self.text()!r})"
+
+
+class Block:
+    """
+    A basic block: its label ID and its instructions, the last of which is
+    a terminator (OpLabel itself is implied by the label).
+    """
+
+    __slots__ = ("label", "instructions")
+
+    def __init__(self, label, instructions):
+        self.label = label
+        self.instructions = instructions
+
+    def successors(self):
+        """
+        Returns:
+            tuple[int, ...]: Labels of the blocks the terminator may branch to.
+        """
+        last = self.instructions[-1]
+        if last.op is Op.Branch:
+            return last.operands[:1]
+        if last.op is Op.BranchConditional:
+            return last.operands[1:3]
+        return ()
+
+
+class Function:
+    """
+    A function: its header (OpFunction and the OpFunctionParameters) and
+    its basic blocks, the entry block first. OpFunctionEnd is implied.
+    """
+
+    __slots__ = ("header", "blocks")
+
+    def __init__(self, header, blocks):
+        self.header = header
+        self.blocks = blocks
+
+    @classmethod
+    def from_instructions(cls, code):
+        """
+        Builds a function from instructions in layout order, OpLabels
+        included, as the generator emits them.
+
+        Instructions that follow a terminator in the same block (code after
+        a `break` or `return`) can never run and are dropped: no block can
+        hold them.
+
+        Args:
+            code (list[Instruction]): From OpFunction to the terminator of
+                the last block.
+
+        Returns:
+            Function: The function.
+        """
+        header, blocks = [], []
+        current = None
+        for inst in code:
+            if inst.op is Op.Label:
+                if current is not None:
+                    raise Exception(f"Block %{blocks[-1].label} is not terminated")
+                current = []
+                blocks.append(Block(inst.result, current))
+            elif current is not None:
+                current.append(inst)
+                if inst.op in TERMINATORS:
+                    current = None
+            elif not blocks:
+                header.append(inst)
+        if current is not None:
+            raise Exception(f"Block %{blocks[-1].label} is not terminated")
+        if not blocks:
+            raise Exception("Function has no blocks")
+        return cls(header, blocks)
+
+    def instructions(self):
+        """
+        Yields every instruction of the function in layout order, OpLabels
+        and OpFunctionEnd included.
+        """
+        yield from self.header
+        for block in self.blocks:
+            yield Instruction(Op.Label, block.label)
+            yield from block.instructions
+        yield Instruction(Op.FunctionEnd)
+
+
+class Module:
+    """
+    A SPIR-V module, section by section in their required order.
+
+    Attributes:
+        capabilities, extensions, ext_imports (list[Instruction])
+        memory_model (Instruction)
+        entry_points, execution_modes, debug, annotations (list[Instruction])
+        declarations (list[Instruction]): Types, constants and global
+            variables, each after what it refers to.
+        functions (list[Function])
+        bound (int): One more than the largest ID in the module.
+    """
+
+    __slots__ = ("capabilities", "extensions", "ext_imports", "memory_model", "entry_points",
+                 "execution_modes", "debug", "annotations", "declarations", "functions", "bound")
+
+    def __init__(self):
+        self.capabilities = []
+        self.extensions = []
+        self.ext_imports = []
+        self.memory_model = None
+        self.entry_points = []
+        self.execution_modes = []
+        self.debug = []
+        self.annotations = []
+        self.declarations = []
+        self.functions = []
+        self.bound = 1
+
+    def instructions(self):
+        """
+        Yields every instruction of the module in layout order.
+        """
+        yield from self.capabilities
+        yield from self.extensions
+        yield from self.ext_imports
+        yield self.memory_model
+        yield from self.entry_points
+        yield from self.execution_modes
+        yield from self.debug
+        yield from self.annotations
+        yield from self.declarations
+        for function in self.functions:
+            yield from function.instructions()
+
+    def text(self):
+        """
+        Returns:
+            str: The module in SPIR-V assembly, one instruction per line.
+        """
+        lines = ["; SPIR-V", "; Version: 1.0"]
+        for section in (self.capabilities, self.extensions, self.ext_imports, [self.memory_model],
+                        self.entry_points, self.execution_modes, self.debug, self.annotations,
+                        self.declarations):
+            lines.extend([inst.text() for inst in section])
+        for function in self.functions:
+            lines.extend([inst.text() for inst in function.header])
+            for block in function.blocks:
+                lines.append(f"%{block.label} = OpLabel")
+                lines.extend([inst.text() for inst in block.instructions])
+            lines.append("OpFunctionEnd")
+        return "\n".join(lines)
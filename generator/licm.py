@@ -0,0 +1,173 @@
+"""
+Loop-invariant code motion for generated functions.
+
+The body of a loop is compiled once and run on every iteration, so an
+expression in it that does not change between iterations (a scalar
+parameter read, `a * 2.0` on such a value, the address of `x[k]` for a
+fixed k) is computed again each trip. hoist_invariants() moves these
+instructions into the loop's preheader, the block that enters the loop
+once by branching to its header.
+
+An instruction is invariant if none of its operands is computed inside
+the loop. Pure instructions are hoisted as they are. A load is hoisted
+only if no store in the loop may write what it reads, and, like an
+integer division (which may trap when speculated), only if it runs on
+every iteration up to any exit, unless it reads a scalar parameter or a
+whole local variable, which is always safe.
+
+Aliasing is decided per class of pointers:
+- each Function variable whose address is only loaded, stored or indexed
+  (through an access chain) is its own class
+- all kernel parameters, scalar, array or pointer (which `*p` writes
+  through), and local variables whose address is taken as a value, share
+  one class: the host may pass the same buffer twice, as in
+  value_numbering
+"""
+
+from .ir import Op
+from .mem2reg import _dominators
+from .value_numbering import PURE_OPS
+
+_ACCESS_CHAINS = (Op.AccessChain, Op.InBoundsPtrAccessChain)
+_TRAPPING_OPS = frozenset({Op.UDiv, Op.SDiv, Op.UMod})
+_GLOBAL = "global"
+
+
+def _pointer_classes(blocks):
+    """
+    Returns a function mapping a pointer ID to its aliasing class.
+    """
+    roots = {}
+    for block in blocks:
+        for inst in block.instructions:
+            if inst.op is Op.Variable:
+                roots[inst.result] = inst.result
+            elif inst.op in _ACCESS_CHAINS:
+                roots[inst.result] = roots.get(inst.operands[0], _GLOBAL)
+
+    escaped = set()
+    for block in blocks:
+        for inst in block.instructions:
+            op = inst.op
+            for position, operand in enumerate(inst.operands):
+                if roots.get(operand, _GLOBAL) == _GLOBAL:
+                    continue
+                is_address = position == 0 and (op is Op.Load or op is Op.Store or op in _ACCESS_CHAINS)
+                if not is_address:
+                    escaped.add(roots[operand])
+
+    def pointer_class(pointer):
+        root = roots.get(pointer, _GLOBAL)
+        return _GLOBAL if root in escaped else root
+
+    return pointer_class
+
+
+def hoist_invariants(function, scalar_params=()):
+    """
+    Hoists loop-invariant instructions of a function out of its loops.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+        scalar_params (set[int]): IDs of the parameters that hold a single
+            value (not an array or a pointer): loading one cannot fault,
+            so it may be hoisted from a block not run on every iteration.
+
+    Returns:
+        bool: Whether anything was hoisted.
+    """
+    blocks = function.blocks
+    scalar_params = set(scalar_params)
+
+    labels = [block.label for block in blocks]
+    body = {block.label: block.instructions for block in blocks}
+    succs = {block.label: block.successors() for block in blocks}
+    preds = {label: [] for label in labels}
+    for label in labels:
+        for succ in succs[label]:
+            preds[succ].append(label)
+    idom, rpo = _dominators(labels, succs, preds)
+
+    def dominates(a, b):
+        while b != a:
+            if idom[b] == b:
+                return False
+            b = idom[b]
+        return True
+
+    # Each loop: its blocks (the natural loop of the continue block's back
+    # edge) and its preheader
+    loops = []
+    for label in rpo:
+        instructions = body[label]
+        if len(instructions) < 2 or instructions[-2].op is not Op.LoopMerge:
+            continue
+        continue_ = instructions[-2].operands[1]
+        if continue_ not in idom or len(succs[continue_]) != 1:
+            continue
+        target = succs[continue_][0]
+        if not dominates(target, continue_):
+            continue
+        inside = {target, continue_}
+        pending = [continue_] if continue_ != target else []
+        while pending:
+            for pred in preds[pending.pop()]:
+                if pred in idom and pred not in inside:
+                    inside.add(pred)
+                    pending.append(pred)
+        entries = [pred for pred in preds[target] if pred in idom and pred not in inside]
+        if len(entries) == 1:
+            last = body[entries[0]][-1]
+            if last.op is Op.Branch and last.operands[0] == target:
+                loops.append((inside, entries[0]))
+
+    pointer_class = _pointer_classes(blocks)
+    variables = {inst.result for block in blocks for inst in block.instructions if inst.op is Op.Variable}
+
+    # Inner loops first, so that what leaves them can leave the outer ones too
+    loops.sort(key=lambda loop: len(loop[0]))
+    changed = False
+    for inside, preheader in loops:
+        defined = set()
+        stored = set()
+        for label in inside:
+            for inst in body[label]:
+                if inst.result is not None:
+                    defined.add(inst.result)
+                if inst.op is Op.Store:
+                    stored.add(pointer_class(inst.operands[0]))
+        exits = [label for label in inside if any(succ not in inside for succ in succs[label])]
+
+        hoisted = []
+        for label in rpo:
+            if label not in inside:
+                continue
+            every_iteration = all(dominates(label, exit_) for exit_ in exits)
+            kept = []
+            for inst in body[label]:
+                op = inst.op
+                if op is Op.Load:
+                    pointer = inst.operands[0]
+                    invariant = (pointer not in defined and pointer_class(pointer) not in stored
+                                 and (every_iteration or pointer in scalar_params or pointer in variables))
+                elif op in PURE_OPS:
+                    invariant = (not any(operand in defined for operand in inst.operands)
+                                 and (every_iteration or op not in _TRAPPING_OPS))
+                else:
+                    invariant = False
+                if invariant:
+                    hoisted.append(inst)
+                    defined.discard(inst.result)
+                else:
+                    kept.append(inst)
+            body[label][:] = kept
+
+        if hoisted:
+            instructions = body[preheader]
+            position = len(instructions) - 1
+            if position > 0 and instructions[position - 1].op is Op.LoopMerge:
+                position -= 1
+            instructions[position:position] = hoisted
+            changed = True
+
+    return changed
@@ -0,0 +1,251 @@
+"""
+Promotion of Function-storage locals to SSA values (mem2reg).
+
+Every SIL variable is an OpVariable in the kernel's entry block, and every
+read and write of it an OpLoad or OpStore. promote_locals() rewrites a
+generated function so that variables used only that way (never indexed,
+never passed on as a pointer) disappear:
+- each OpLoad is replaced by the value the variable holds at that point
+- each OpStore just makes its value the variable's current one
+- where control flow joins with different values (the merge block of an
+  if, the header of a loop), an OpPhi selects the value by predecessor
+
+This is the classic construction: phis are placed at the iterated
+dominance frontier of the blocks that store to a variable, then values
+are renamed walking the dominator tree. A variable read before any store
+reads an OpUndef (or its OpVariable initializer). Phis that turn out to
+be unused, or to select the same value on every edge, are removed again.
+"""
+
+from .ir import Block, Instruction, Op
+
+
+def _dominators(labels, succs, preds):
+    """
+    Immediate dominators of the blocks reachable from labels[0]
+    (Cooper, Harvey and Kennedy's iterative algorithm).
+
+    Returns:
+        tuple: (idom: dict label → label, rpo: reachable labels in reverse postorder)
+    """
+    entry = labels[0]
+    order, seen = [], {entry}
+    stack = [(entry, iter(succs[entry]))]
+    while stack:
+        label, children = stack[-1]
+        for child in children:
+            if child not in seen:
+                seen.add(child)
+                stack.append((child, iter(succs[child])))
+                break
+        else:
+            stack.pop()
+            order.append(label)
+    rpo = order[::-1]
+    index = {label: i for i, label in enumerate(rpo)}
+
+    idom = {entry: entry}
+    changed = True
+    while changed:
+        changed = False
+        for label in rpo[1:]:
+            new = None
+            for pred in preds[label]:
+                if pred not in idom:
+                    continue
+                if new is None:
+                    new = pred
+                    continue
+                a, b = pred, new
+                while a != b:
+                    while index[a] > index[b]:
+                        a = idom[a]
+                    while index[b] > index[a]:
+                        b = idom[b]
+                new = a
+            if idom.get(label) != new:
+                idom[label] = new
+                changed = True
+    return idom, rpo
+
+
+def promote_locals(function, pointee_types, new_id):
+    """
+    Promotes the loaded-and-stored-only Function variables of a function.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+        pointee_types (dict): Function pointer type ID → pointee type ID.
+        new_id (callable): Returns a fresh SPIR-V ID.
+    """
+    blocks = function.blocks
+    entry_label, entry = blocks[0].label, blocks[0].instructions
+
+    # Candidates: variables of the entry block whose ID is only a load or
+    # store address
+    variables = {}  # variable ID → (type ID, initial value or None)
+    for inst in entry:
+        if inst.op is Op.Variable and inst.type in pointee_types:
+            init = inst.operands[1] if len(inst.operands) > 1 else None
+            variables[inst.result] = (pointee_types[inst.type], init)
+    for block in blocks:
+        for inst in block.instructions:
+            for position, operand in enumerate(inst.operands):
+                if operand in variables and not (
+                        position == 0 and (inst.op is Op.Load or inst.op is Op.Store)):
+                    del variables[operand]
+    if not variables:
+        return
+
+    labels = [block.label for block in blocks]
+    body = {block.label: block.instructions for block in blocks}
+    succs = {block.label: block.successors() for block in blocks}
+    preds = {label: [] for label in labels}
+    for label in labels:
+        for succ in succs[label]:
+            preds[succ].append(label)
+    idom, rpo = _dominators(labels, succs, preds)
+
+    # Dominance frontiers
+    frontier = {label: set() for label in rpo}
+    for label in rpo:
+        reachable_preds = [p for p in preds[label] if p in idom]
+        if len(reachable_preds) < 2:
+            continue
+        for pred in reachable_preds:
+            runner = pred
+            while runner != idom[label]:
+                frontier[runner].add(label)
+                runner = idom[runner]
+
+    # Place phis at the iterated dominance frontier of the stores
+    stores = {var: set() for var in variables}     # variable → labels of the blocks storing to it
+    for label in labels:
+        for inst in body[label]:
+            if inst.op is Op.Store and inst.operands[0] in stores:
+                stores[inst.operands[0]].add(label)
+    phis = {label: {} for label in labels}     # label → {variable: phi ID}
+    for var in variables:
+        pending = [label for label in rpo if label in stores[var]]
+        placed = set()
+        while pending:
+            for label in frontier[pending.pop()]:
+                if label not in placed:
+                    placed.add(label)
+                    phis[label][var] = new_id()
+                    pending.append(label)
+    incoming = {label: {var: [] for var in phis[label]} for label in labels}
+
+    undefs = {}     # type ID → OpUndef ID
+
+    def initial(var):
+        type_id, init = variables[var]
+        if init is not None:
+            return init
+        if type_id not in undefs:
+            undefs[type_id] = new_id()
+        return undefs[type_id]
+
+    replace = {}    # removed load ID → value
+    rewritten = {}
+
+    def rename(label, current):
+        """Rewrites one block; `current` holds the variables' values on entry, and on exit."""
+        out = []
+        for inst in body[label]:
+            op = inst.op
+            if op is Op.Load and inst.operands[0] in variables:
+                replace[inst.result] = current[inst.operands[0]]
+            elif op is Op.Store and inst.operands[0] in variables:
+                current[inst.operands[0]] = inst.operands[1]
+            elif not (op is Op.Variable and inst.result in variables):
+                out.append(inst)
+        rewritten[label] = out
+        for succ in succs[label]:
+            for var, values in incoming[succ].items():
+                values.append((current[var], label))
+
+    # Walk the dominator tree: a block starts with the values its
+    # immediate dominator ends with, updated by its own phis
+    children = {label: [] for label in rpo}
+    for label in rpo[1:]:
+        children[idom[label]].append(label)
+    stack = [(entry_label, {var: initial(var) for var in variables})]
+    while stack:
+        label, current = stack.pop()
+        current.update(phis[label])
+        rename(label, current)
+        for child in children[label]:
+            stack.append((child, dict(current)))
+
+    # Unreachable blocks still need values for the phis they feed
+    for label in labels:
+        if label not in idom:
+            rename(label, {var: initial(var) for var in variables})
+
+    # Drop phis that select one value (besides themselves) on every edge
+    phi_values = {}
+    for label in labels:
+        for var, phi_id in phis[label].items():
+            phi_values[phi_id] = (label, var)
+
+    def resolve(value):
+        while value in replace:
+            value = replace[value]
+        return value
+
+    changed = True
+    while changed:
+        changed = False
+        for phi_id, (label, var) in list(phi_values.items()):
+            sources = {resolve(v) for v, _ in incoming[label][var]} - {phi_id}
+            if len(sources) == 1:
+                replace[phi_id] = sources.pop()
+                del phi_values[phi_id]
+                del phis[label][var]
+                changed = True
+
+    # Drop phis nothing but dead phis uses
+    live = set()
+    for label in labels:
+        for inst in rewritten[label]:
+            live.update(resolve(x) for x in inst.operands)
+    pending = [phi_id for phi_id in phi_values if phi_id in live]
+    while pending:
+        label, var = phi_values[pending.pop()]
+        for value, _ in incoming[label][var]:
+            value = resolve(value)
+            if value in phi_values and value not in live:
+                live.add(value)
+                pending.append(value)
+
+    # Reassemble the function
+    used = set()
+    new_blocks = []
+    for label in labels:
+        out = []
+        instructions = rewritten[label]
+        for var, phi_id in phis[label].items():
+            if phi_id in live:
+                pairs = tuple(x for v, pred in incoming[label][var] for x in (resolve(v), pred))
+                out.append(Instruction(Op.Phi, phi_id, variables[var][0], pairs))
+        if label == entry_label:
+            # OpUndef after the remaining OpVariables, which must come first
+            variable_count = sum(1 for inst in instructions if inst.op is Op.Variable)
+            out.extend(instructions[:variable_count])
+            out.extend(Instruction(Op.Undef, undef_id, type_id) for type_id, undef_id in undefs.items())
+            instructions = instructions[variable_count:]
+        for inst in instructions:
+            inst.operands = tuple([resolve(x) for x in inst.operands])
+            out.append(inst)
+        for inst in out:
+            used.update(inst.operands)
+        new_blocks.append(Block(label, out))
+
+    # Keep the OpUndefs something still reads
+    undef_ids = set(undefs.values()) - used
+    if undef_ids:
+        entry = new_blocks[0]
+        entry.instructions = [inst for inst in entry.instructions
+                              if not (inst.op is Op.Undef and inst.result in undef_ids)]
+    function.blocks = new_blocks
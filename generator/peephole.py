@@ -0,0 +1,175 @@
+"""
+Peephole optimization and strength reduction over a generated function.
+
+The generator translates each operator on its own, so some values take
+the long way:
+- `!b` on a bool is OpSelect b 1 0, OpISub 1 - that, OpINotEqual with 0
+- a bool stored into a uint variable becomes OpSelect b 1 0, and turns
+  back into a bool with OpINotEqual 0 where it is tested (`&&`, `||`)
+- uint multiplication, division (`//`) and remainder by a power of two
+  are OpIMul, OpUDiv and OpUMod
+
+rewrite() walks the function once, in layout order (definitions come
+before their uses, except for phis), and replaces such instructions by
+their cheapest equivalent:
+
+    x == K, x != K on OpSelect c T F (T, F, K constants)
+                                    → c, or OpLogicalNot c
+    (C - x) == K, (C - x) != K      → x == C - K, x != C - K
+    !!c                             → c
+    !(a == b), !(a < b), ...        → a != b, a >= b, ...
+    x * 2^k, 2^k * x                → x << k
+    x // 2^k                        → x >> k
+    x % 2^k                         → x & (2^k - 1)
+    x * 1, x // 1, x / 1            → x
+
+An OpISub of a constant and such an OpSelect is matched as the select of
+the two differences, which is how `!b` reduces to OpLogicalNot b. The
+instructions a rewrite bypasses are left for dce to remove.
+
+Signed division (`/`, OpSDiv) by other powers of two is left alone: it
+rounds towards zero, so it needs a correction for negative operands, and
+the driver's compiler emits that itself.
+"""
+
+from .ir import Op
+
+_MASK = 0xFFFFFFFF
+
+# Comparison → the comparison that is true exactly when it is false
+_INVERSE = {
+    Op.IEqual: Op.INotEqual, Op.INotEqual: Op.IEqual,
+    Op.ULessThan: Op.UGreaterThanEqual, Op.UGreaterThanEqual: Op.ULessThan,
+    Op.UGreaterThan: Op.ULessThanEqual, Op.ULessThanEqual: Op.UGreaterThan,
+}
+
+_STRENGTH_REDUCED = (Op.IMul, Op.UDiv, Op.UMod, Op.SDiv)
+
+
+def _log2(value):
+    """Returns k if value == 2**k, else None."""
+    if value is None or value <= 0 or value & (value - 1):
+        return None
+    return value.bit_length() - 1
+
+
+def rewrite(function, uint_type, constants, get_constant, stats=None):
+    """
+    Rewrites the wasteful instruction sequences of a function.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+        uint_type (int): ID of the uint type.
+        constants (dict): uint constant ID → value.
+        get_constant (callable): Returns the ID of a uint constant,
+            declaring it if needed.
+        stats (dict): If given, counts the rewrites made, by rule.
+    """
+    replace = {}    # bypassed result ID → ID of the value it equals
+    defs = {}       # result ID → instruction, after rewriting
+    selects = {}    # result ID → (condition, value if true, value if false)
+
+    def constant(value):
+        value &= _MASK
+        const_id = get_constant(value)
+        constants[const_id] = value
+        return const_id
+
+    def count(rule):
+        if stats is not None:
+            stats[rule] = stats.get(rule, 0) + 1
+
+    for block in function.blocks:
+        out = []
+        for inst in block.instructions:
+            if replace:
+                renamed = tuple([replace.get(x, x) for x in inst.operands])
+                if renamed != inst.operands:
+                    inst.operands = renamed
+
+            op, operands = inst.op, inst.operands
+            same = None     # ID of an existing value equal to the result
+            while True:
+                new = None  # (opcode, operands) replacing the instruction
+
+                if op is Op.IEqual or op is Op.INotEqual:
+                    a, b = operands
+                    if a in constants and b not in constants:
+                        a, b = b, a
+                    k = constants.get(b)
+                    if k is not None and a in selects:
+                        condition, if_true, if_false = selects[a]
+                        when_true, when_false = (if_true == k), (if_false == k)
+                        if op is Op.INotEqual:
+                            when_true, when_false = not when_true, not when_false
+                        if when_true and not when_false:
+                            same = condition
+                            count("bool round trip → bool")
+                        elif when_false and not when_true:
+                            new = (Op.LogicalNot, (condition,))
+                            count("bool round trip → OpLogicalNot")
+                    elif k is not None and a in defs and defs[a].op is Op.ISub:
+                        left, right = defs[a].operands
+                        if left in constants:
+                            new = (op, (right, constant(constants[left] - k)))
+                            count("(C - x) == K → x == C - K")
+                        elif right in constants:
+                            new = (op, (left, constant(k + constants[right])))
+                            count("(x - C) == K → x == K + C")
+
+                elif op is Op.LogicalNot:
+                    inner = defs.get(operands[0])
+                    inner_op = inner.op if inner is not None else None
+                    if inner_op is Op.LogicalNot:
+                        same = inner.operands[0]
+                        count("!!c → c")
+                    elif inner_op in _INVERSE:
+                        new = (_INVERSE[inner_op], inner.operands)
+                        count("!(a < b) → a >= b")
+
+                elif op in _STRENGTH_REDUCED and inst.type == uint_type:
+                    x, c = operands
+                    if op is Op.IMul and x in constants and c not in constants:
+                        x, c = c, x
+                    shift = _log2(constants.get(c))
+                    if shift == 0 and op is not Op.UMod:
+                        same = x
+                        count(f"Op{op.name} by 1 → x")
+                    elif shift is not None and op is Op.IMul:
+                        new = (Op.ShiftLeftLogical, (x, constant(shift)))
+                        count("OpIMul by 2^k → OpShiftLeftLogical")
+                    elif shift is not None and op is Op.UDiv:
+                        new = (Op.ShiftRightLogical, (x, constant(shift)))
+                        count("OpUDiv by 2^k → OpShiftRightLogical")
+                    elif shift is not None and op is Op.UMod:
+                        new = (Op.BitwiseAnd, (x, constant(constants[c] - 1)))
+                        count("OpUMod by 2^k → OpBitwiseAnd")
+
+                # A rewritten instruction may match another rule
+                if new is None:
+                    break
+                op, operands = new
+                inst.op, inst.operands = new
+
+            if same is not None:
+                replace[inst.result] = same
+                continue
+
+            result = inst.result
+            if result is not None:
+                defs[result] = inst
+            if op is Op.Select and operands[1] in constants and operands[2] in constants:
+                selects[result] = (operands[0], constants[operands[1]], constants[operands[2]])
+            elif op is Op.ISub and operands[0] in constants and operands[1] in selects:
+                c = constants[operands[0]]
+                condition, if_true, if_false = selects[operands[1]]
+                selects[result] = (condition, (c - if_true) & _MASK, (c - if_false) & _MASK)
+            out.append(inst)
+        block.instructions = out
+
+    # Phis may name values defined (and bypassed) further down
+    if replace:
+        for block in function.blocks:
+            for inst in block.instructions:
+                if inst.op is Op.Phi:
+                    inst.operands = tuple([replace.get(x, x) for x in inst.operands])
@@ -1,18 +1,30 @@
 import sil_ast
+from .ir import Instruction, Op
 
 
 def generate_var_only(self, stmt):
     """
     Allocates space for a local (function-scope) variable.
+    Arrays start out zeroed.
 
     Args:
         stmt (sil_ast.VarDecl): Variable declaration node.
 
     Returns:
-        list[str]: SPIR-V instructions to declare the variable.
+        list[Instruction]: SPIR-V instructions to declare the variable.
     """
     result = []
 
+    if isinstance(stmt.value, sil_ast.Array):
+        array_type = self.get_array_type(stmt.var_type, stmt.value.dims)
+        var_id = self.new_id()
+        result.append(Instruction(
+            Op.Variable, var_id, self.type_ids['ptr_func_' + array_type],
+            ("Function", self.get_constant_null(array_type))
+        ))
+        self.array_ids[stmt.name] = (var_id, stmt.var_type, stmt.value.dims, 'func')
+        return result
+
     # Normalize type to avoid nested pointers like ptr_func_ptr_uint
     base_type = stmt.var_type
     if base_type.startswith("ptr_"):
@@ -23,7 +35,7 @@ def generate_var_only(self, stmt):
         raise Exception(f"Unknown pointer type for {stmt.var_type}")
 
     var_id = self.new_id()
-    result.append(f"{var_id} = OpVariable {ptr_type} Function")
+    result.append(Instruction(Op.Variable, var_id, ptr_type, ("Function",)))
     self.var_ids[stmt.name] = (var_id, stmt.var_type)
     return result
 
@@ -36,7 +48,7 @@ def generate_stmt(self, stmt):
         stmt (AST node): A statement node from sil_ast.
 
     Returns:
-        list[str]: Generated SPIR-V instructions.
+        list[Instruction]: Generated SPIR-V instructions.
     """
     if isinstance(stmt, sil_ast.Return):
         return _generate_return(self, stmt)
@@ -46,6 +58,10 @@ def generate_stmt(self, stmt):
         return self.generate_if(stmt)
     elif isinstance(stmt, sil_ast.Loop):
         return self.generate_loop(stmt)
+    elif isinstance(stmt, sil_ast.For):
+        return self.generate_for(stmt)
+    elif isinstance(stmt, sil_ast.VarDecl):
+        return _generate_nested_var_init(self, stmt)
     elif isinstance(stmt, sil_ast.Break):
         return _generate_break(self, stmt)
     elif isinstance(stmt, sil_ast.ConstDecl):
@@ -63,8 +79,21 @@ def _generate_return(self, stmt):
         result = []
         value_code, value_id, value_type = self.generate_expr(stmt.value)
         result.extend(value_code)
-        return result + ["OpReturn"]
-    return ["OpReturn"]
+        return result + [Instruction(Op.Return)]
+    return [Instruction(Op.Return)]
+
+
+def _generate_nested_var_init(self, stmt):
+    """
+    Initializes a variable declared inside a block. Its storage was
+    allocated in the kernel's entry block; the value is (re)assigned each
+    time the declaration runs.
+    """
+    if isinstance(stmt.value, sil_ast.Array):
+        var_id = self.array_ids[stmt.name][0]
+        array_type = self.get_array_type(stmt.var_type, stmt.value.dims)
+        return [Instruction(Op.Store, operands=(var_id, self.get_constant_null(array_type)))]
+    return _generate_assign(self, sil_ast.Assign(sil_ast.Ident(stmt.name), stmt.value))
 
 
 def _generate_assign(self, stmt):
@@ -74,6 +103,7 @@ def _generate_assign(self, stmt):
     Handles:
     - Assignments to declared variables
     - Assignments to dereferenced pointers
+    - Assignments to array elements
     - Constant initialization
     - Type coercion (e.g., bool → uint)
     """
@@ -105,6 +135,9 @@ def _generate_assign(self, stmt):
         # Strip 'ptr_' prefix to get actual value type
         target_type = target_type[len("ptr_"):]
 
+    elif isinstance(stmt.target, sil_ast.Index):
+        target_ptr, target_type = self.generate_element_pointer(stmt.target, result)
+
     else:
         raise Exception(f"Unsupported assignment target type: {type(stmt.target)}")
 
@@ -115,14 +148,14 @@ def _generate_assign(self, stmt):
     # Handle bool → uint coercion (e.g., storing a bool into a uint slot)
     if value_type == 'bool' and (target_type == 'ptr_uint' or target_type == 'uint'):
         conv_id = self.new_id()
-        result.append(
-            f"{conv_id} = OpSelect {self.type_ids['uint']} {value_id} "
-            f"{self.get_constant(1)} {self.get_constant(0)}"
-        )
+        result.append(Instruction(
+            Op.Select, conv_id, self.type_ids['uint'],
+            (value_id, self.get_constant(1), self.get_constant(0))
+        ))
         value_id = conv_id
         value_type = 'uint'
 
-    result.append(f"OpStore {target_ptr} {value_id}")
+    result.append(Instruction(Op.Store, operands=(target_ptr, value_id)))
     return result
 
 
@@ -134,7 +167,7 @@ def _generate_break(self, stmt):
     if not hasattr(self, 'break_target') or self.break_target is None:
         raise Exception("Break used outside of a loop")
 
-    return [f"OpBranch {self.break_target}"]
+    return [Instruction(Op.Branch, operands=(self.break_target,))]
 
 
 def generate_const_decl(self, stmt):
@@ -148,7 +181,7 @@ def generate_const_decl(self, stmt):
         stmt (sil_ast.ConstDecl): The constant declaration node.
 
     Returns:
-        list[str]: SPIR-V code (usually empty, unless literal).
+        list[Instruction]: SPIR-V code (usually empty, unless literal).
     """
     if isinstance(stmt.value, sil_ast.Literal):
         value = stmt.value.value
@@ -1,3 +1,6 @@
+from .ir import Instruction, Op
+
+
 def generate_builtin_types(self):
     """
     Generates all core SPIR-V types required by Sil:
@@ -5,10 +8,10 @@ def generate_builtin_types(self):
     - pointers for Function and CrossWorkgroup storage classes
 
     Stores their SPIR-V IDs in self.type_ids and returns the corresponding
-    SPIR-V type declarations as a list of strings.
+    SPIR-V type declarations.
 
     Returns:
-        list[str]: SPIR-V type declarations.
+        list[Instruction]: SPIR-V type declarations.
     """
     types = []
 
@@ -26,23 +29,23 @@ def generate_builtin_types(self):
     self.type_ids['float'] = float_type
 
     # SPIR-V type definitions
-    types.append(f"{void_type} = OpTypeVoid")
-    types.append(f"{bool_type} = OpTypeBool")
-    types.append(f"{uint_type} = OpTypeInt 32 0")  # unsigned 32-bit int
-    types.append(f"{float_type} = OpTypeFloat 32")  # 32-bit float
+    types.append(Instruction(Op.TypeVoid, void_type))
+    types.append(Instruction(Op.TypeBool, bool_type))
+    types.append(Instruction(Op.TypeInt, uint_type, operands=("32", "0")))  # unsigned 32-bit int
+    types.append(Instruction(Op.TypeFloat, float_type, operands=("32",)))  # 32-bit float
 
     # CrossWorkgroup pointers (used for kernel inputs/outputs)
     for base in ["int", "uint", "float", "bool"]:
         ptr_id = self.new_id()
         self.type_ids[f'ptr_cross_{base}'] = ptr_id
-        types.append(f"{ptr_id} = OpTypePointer CrossWorkgroup {self.type_ids[base]}")
+        types.append(Instruction(Op.TypePointer, ptr_id, operands=("CrossWorkgroup", self.type_ids[base])))
         self.type_ids[f'ptr_{base}'] = ptr_id  # alias for convenience
 
     # Function-local pointers
     for base in ["int", "uint", "float", "bool"]:
         ptr_id = self.new_id()
         self.type_ids[f'ptr_func_{base}'] = ptr_id
-        types.append(f"{ptr_id} = OpTypePointer Function {self.type_ids[base]}")
+        types.append(Instruction(Op.TypePointer, ptr_id, operands=("Function", self.type_ids[base])))
 
     return types
 
@@ -56,17 +59,19 @@ def get_constant(self, value):
         value (int or float): The constant value.
 
     Returns:
-        str: SPIR-V ID of the constant.
+        int: SPIR-V ID of the constant.
     """
     value_str = str(value)
 
-    if value_str in self.constants:
-        return self.constants[value_str].split('=')[0].strip()
+    const_id = self.constant_ids.get(value_str)
+    if const_id is not None:
+        return const_id
 
     const_id = self.new_id()
     base_type = self.type_ids['uint'] if isinstance(value, int) else self.type_ids['float']
 
-    self.constants[value_str] = f"{const_id} = OpConstant {base_type} {value}"
+    self.constant_ids[value_str] = const_id
+    self.constant_instructions.append(Instruction(Op.Constant, const_id, base_type, (value_str,)))
     return const_id
 
 
@@ -76,10 +81,115 @@ def get_constant_false(self):
     Only created once and cached.
 
     Returns:
-        str: SPIR-V ID for boolean false.
+        int: SPIR-V ID for boolean false.
     """
-    if "false" not in self.constants:
+    if "false" not in self.constant_ids:
         const_id = self.new_id()
-        self.constants["false"] = f"{const_id} = OpConstantFalse {self.type_ids['bool']}"
+        self.constant_ids["false"] = const_id
+        self.constant_instructions.append(Instruction(Op.ConstantFalse, const_id, self.type_ids['bool']))
+
+    return self.constant_ids["false"]
+
+
+def get_array_type(self, base, dims):
+    """
+    Returns the type name of an array of `base` values, declaring its
+    OpTypeArray types on first use: one per dimension, innermost first,
+    so uint[2][3] is an array of 2 arrays of 3 uints. Its Function pointer
+    type is declared with it (array parameters are element pointers).
+
+    Array types are appended to self.module_types, which is emitted after
+    the constants their lengths refer to.
+
+    Args:
+        base (str): Element type, e.g. 'uint'.
+        dims (tuple[int, ...]): Dimensions, outermost first.
+
+    Returns:
+        str: The type name, e.g. 'uint[2][3]'. It is a key of
+        self.type_ids, as is 'ptr_func_<name>'.
+    """
+    element = base
+    for k in range(len(dims) - 1, -1, -1):
+        name = base + "".join(f"[{size}]" for size in dims[k:])
+        if name not in self.type_ids:
+            type_id = self.new_id()
+            self.type_ids[name] = type_id
+            self.module_types.append(Instruction(
+                Op.TypeArray, type_id, operands=(self.type_ids[element], self.get_constant(dims[k]))
+            ))
+        element = name
+
+    if f"ptr_func_{name}" not in self.type_ids:
+        ptr_id = self.new_id()
+        self.type_ids[f"ptr_func_{name}"] = ptr_id
+        self.module_types.append(Instruction(Op.TypePointer, ptr_id, operands=("Function", self.type_ids[name])))
+
+    return name
+
+
+def get_constant_null(self, type_name):
+    """
+    Returns the ID of the all-zero value of a type (OpConstantNull),
+    declaring it on first use after the type itself.
 
-    return self.constants["false"].split('=')[0].strip()
+    Args:
+        type_name (str): A key of self.type_ids, e.g. 'uint[2][3]'.
+
+    Returns:
+        int: SPIR-V ID of the null constant.
+    """
+    if type_name not in self.null_ids:
+        const_id = self.new_id()
+        self.null_ids[type_name] = const_id
+        self.module_types.append(Instruction(Op.ConstantNull, const_id, self.type_ids[type_name]))
+    return self.null_ids[type_name]
+
+
+# SPIR-V BuiltIn decoration of the variable behind each work-item function
+BUILTIN_VARIABLES = {
+    "global_id": "GlobalInvocationId",
+    "local_id": "LocalInvocationId",
+    "group_id": "WorkgroupId",
+    "global_size": "GlobalSize",
+    "local_size": "WorkgroupSize",
+    "num_groups": "NumWorkgroups",
+}
+
+
+def get_builtin_variable(self, name):
+    """
+    Returns the ID of the Input variable behind a work-item function,
+    declaring it on first use: a vector of three 64-bit size_t values
+    (one per dimension), decorated with its BuiltIn.
+
+    Like OpenCL's size_t, the values are 64-bit, so modules that use them
+    need the Int64 capability and Physical64 addressing.
+
+    Args:
+        name (str): One of sil_ast.BUILTINS, e.g. 'global_id'.
+
+    Returns:
+        int: SPIR-V ID of the variable. Its pointer type is
+        self.type_ids['ptr_input_v3ulong'].
+    """
+    builtin = BUILTIN_VARIABLES[name]
+    var_id = self.builtin_ids.get(builtin)
+    if var_id is not None:
+        return var_id
+
+    if 'v3ulong' not in self.type_ids:
+        ulong, vector, pointer = self.new_id(), self.new_id(), self.new_id()
+        self.type_ids['ulong'] = ulong
+        self.type_ids['v3ulong'] = vector
+        self.type_ids['ptr_input_v3ulong'] = pointer
+        self.module_types.append(Instruction(Op.TypeInt, ulong, operands=("64", "0")))
+        self.module_types.append(Instruction(Op.TypeVector, vector, operands=(ulong, "3")))
+        self.module_types.append(Instruction(Op.TypePointer, pointer, operands=("Input", vector)))
+
+    var_id = self.new_id()
+    self.builtin_ids[builtin] = var_id
+    self.module_types.append(Instruction(Op.Variable, var_id, self.type_ids['ptr_input_v3ulong'], ("Input",)))
+    self.annotations.append(Instruction(Op.Decorate, operands=(var_id, "BuiltIn", builtin)))
+    self.physical_addressing = True
+    return var_id
@@ -1,20 +1,33 @@
+from .ir import TERMINATORS, Instruction, Op
+
+
 def ends_with_branch(code):
     """
-    Checks whether a list of SPIR-V instruction lines ends with a branching instruction.
+    Checks whether a list of SPIR-V instructions ends with a branching instruction.
 
     Used to ensure that blocks are properly terminated before inserting a new label.
 
     Args:
-        code (list of str): A list of SPIR-V instruction lines.
+        code (list[Instruction]): A list of SPIR-V instructions.
 
     Returns:
-        bool: True if the last line is a branch or return instruction, False otherwise.
+        bool: True if the last instruction is a branch or return instruction, False otherwise.
+    """
+    return bool(code) and code[-1].op in TERMINATORS
+
+
+def append_statement(code, stmt_code):
+    """
+    Appends the code of a statement to a block.
+
+    Statements like loops start with a label of their own; the current
+    block is then closed with a branch to it first, unless it already ends
+    with a branch.
+
+    Args:
+        code (list[Instruction]): The instructions of the enclosing block.
+        stmt_code (list[Instruction]): The instructions of the statement.
     """
-    if not code:
-        return False
-
-    return (
-        code[-1].startswith("OpBranch")
-        or code[-1].startswith("OpReturn")
-        or code[-1].startswith("OpBranchConditional")
-    )
+    if stmt_code and stmt_code[0].op is Op.Label and not ends_with_branch(code):
+        code.append(Instruction(Op.Branch, operands=(stmt_code[0].result,)))
+    code.extend(stmt_code)
@@ -0,0 +1,566 @@
+"""
+Structural validation of generated modules, in-process.
+
+validate() checks the rules of the SPIR-V specification that the
+generator and its passes can get wrong, on the subset of SPIR-V they
+emit, without starting a spirv-val process:
+- IDs: every result ID is below the bound and defined once; every ID an
+  instruction uses is defined, module-level ones earlier in the module,
+  function-level ones in a block that dominates the use (for an OpPhi,
+  the end of the parent block); labels are only used as branch, merge and
+  phi parent operands, and only within their function
+- blocks: each ends with its one terminator; OpPhi comes first and names
+  each predecessor exactly once; OpVariable only starts the entry block,
+  which nothing branches to
+- structured control flow: OpSelectionMerge comes right before an
+  OpBranchConditional, OpLoopMerge right before a branch; a block is the
+  merge block of at most one header, and is dominated by it, as is a
+  loop's continue target; a loop header is the target of exactly one back
+  edge, from a block its continue target dominates, and no other block is
+  the target of a back edge; a conditional branch with distinct targets
+  either has a merge instruction or breaks to the merge block or
+  continues to the continue target of a loop it is in
+- types: operands agree with each other and with the result type
+  (arithmetic, comparisons, logical operations, conversions, OpSelect,
+  OpPhi), loads and stores with the pointee type (nothing stores to an
+  Input variable), access chains and extracts with the composite they
+  index, conditions are bool, parameters and returned values match the
+  function type
+
+Everything else (capabilities, the execution environment, decorations,
+literal values) is left to spirv-val, which `--validate full` runs too.
+"""
+
+from .ir import TERMINATORS, Op
+from .mem2reg import _dominators
+
+_TYPE_OPS = frozenset({Op.TypeVoid, Op.TypeBool, Op.TypeInt, Op.TypeFloat, Op.TypeVector,
+                       Op.TypeArray, Op.TypePointer, Op.TypeFunction})
+
+# Instructions only allowed at the start or the end of a block, or outside blocks
+_LEADING_OPS = frozenset({Op.Phi, Op.Variable})
+_PLACED_OPS = TERMINATORS | _LEADING_OPS | {Op.Label, Op.Function, Op.FunctionEnd}
+
+# Operand positions that hold labels, by opcode (OpPhi: every odd position)
+_LABEL_OPERANDS = {
+    Op.Branch: (0,),
+    Op.BranchConditional: (1, 2),
+    Op.SelectionMerge: (0,),
+    Op.LoopMerge: (0, 1),
+}
+
+
+def validate(module):
+    """
+    Checks a module against the structural rules above.
+
+    Args:
+        module (ir.Module): The module.
+
+    Returns:
+        list[str]: One message per problem found; empty if the module is valid.
+    """
+    errors = []
+    types = {}       # type ID → its OpType* instruction
+    value_types = {}  # ID of a module-level value or function → its type ID
+    functions = {}   # function ID → ir.Function
+
+    # Result IDs: in bounds and defined once
+    defined = set()
+    for inst in module.instructions():
+        result = inst.result
+        if result is None:
+            continue
+        if not 0 < result < module.bound:
+            errors.append(f"ID %{result} is outside the bound {module.bound}")
+        if result in defined:
+            errors.append(f"ID %{result} is defined more than once")
+        defined.add(result)
+
+    if module.memory_model is None:
+        errors.append("Module has no OpMemoryModel")
+
+    # Module-level declarations, each after what it refers to
+    for inst in module.declarations:
+        for operand in inst.operands:
+            if operand.__class__ is int and operand not in types and operand not in value_types:
+                errors.append(f"{inst.text()}: %{operand} is not defined before it is used")
+        if inst.op in _TYPE_OPS:
+            types[inst.result] = inst
+            continue
+        if inst.type not in types:
+            errors.append(f"{inst.text()}: %{inst.type} is not a type")
+            continue
+        value_types[inst.result] = inst.type
+        _check_declaration(inst, types, errors)
+
+    for function in module.functions:
+        header = function.header[0]
+        functions[header.result] = function
+        value_types[header.result] = header.operands[1] if len(header.operands) > 1 else None
+
+    for inst in module.entry_points:
+        if len(inst.operands) < 3 or inst.operands[1] not in functions:
+            errors.append(f"{inst.text()}: entry point is not a function")
+            continue
+        for operand in inst.operands[3:]:
+            pointer = types.get(value_types.get(operand))
+            if pointer is None or pointer.op is not Op.TypePointer or operand in functions:
+                errors.append(f"{inst.text()}: interface %{operand} is not a module-level variable")
+
+    for inst in module.debug + module.annotations + module.execution_modes:
+        target = inst.operands[0] if inst.operands else None
+        if target.__class__ is int and target not in defined:
+            errors.append(f"{inst.text()}: %{target} is not defined")
+
+    for function in module.functions:
+        _check_function(function, types, value_types, errors)
+    return errors
+
+
+def _check_declaration(inst, types, errors):
+    """Type rules of the module-level constants and variables."""
+    type_op = types[inst.type].op
+    if inst.op is Op.Constant and type_op not in (Op.TypeInt, Op.TypeFloat):
+        errors.append(f"{inst.text()}: constant of a type that is not a number")
+    elif inst.op in (Op.ConstantTrue, Op.ConstantFalse) and type_op is not Op.TypeBool:
+        errors.append(f"{inst.text()}: bool constant of a type that is not bool")
+    elif inst.op is Op.Variable:
+        if type_op is not Op.TypePointer:
+            errors.append(f"{inst.text()}: variable of a type that is not a pointer")
+        elif inst.operands[0] != types[inst.type].operands[0]:
+            errors.append(f"{inst.text()}: storage class differs from its pointer type")
+        elif inst.operands[0] == "Function":
+            errors.append(f"{inst.text()}: Function variable outside a function")
+
+
+def _check_function(function, types, value_types, errors):
+    """Checks the IDs, blocks, control flow and types of one function."""
+    header = function.header[0]
+    name = f"function %{header.result}"
+    function_type = types.get(header.operands[1]) if len(header.operands) > 1 else None
+    if function_type is None or function_type.op is not Op.TypeFunction:
+        errors.append(f"{header.text()}: %{header.operands[-1]} is not a function type")
+        return
+    if function_type.operands[0] != header.type:
+        errors.append(f"{header.text()}: result type differs from its function type")
+
+    # Parameters, typed as the function type says
+    local_types = dict(value_types)
+    params = function.header[1:]
+    if len(params) != len(function_type.operands) - 1:
+        errors.append(f"{name}: {len(params)} parameters, its type has "
+                      f"{len(function_type.operands) - 1}")
+    for param, param_type in zip(params, function_type.operands[1:]):
+        if param.type != param_type:
+            errors.append(f"{param.text()}: type differs from its function type")
+        local_types[param.result] = param.type
+
+    blocks = function.blocks
+    labels = [block.label for block in blocks]
+    label_set = set(labels)
+    if len(label_set) != len(labels):
+        errors.append(f"{name}: a label is used by more than one block")
+        return
+
+    # Block shape: one terminator, last; OpPhi first; OpVariable first in the
+    # entry block. Also where each local value is defined.
+    definitions = {}
+    shaped = True
+    for index, block in enumerate(blocks):
+        instructions = block.instructions
+        if not instructions or instructions[-1].op not in TERMINATORS:
+            errors.append(f"Block %{block.label} is not terminated")
+            shaped = False
+            continue
+        leading = True
+        last = len(instructions) - 1
+        for position, inst in enumerate(instructions):
+            if inst.result is not None:
+                definitions[inst.result] = (block.label, position)
+                local_types[inst.result] = inst.type
+            op = inst.op
+            if op not in _PLACED_OPS:
+                leading = False
+            elif op in TERMINATORS:
+                if position != last:
+                    errors.append(f"Block %{block.label}: {inst.text()} is not the last "
+                                  "instruction")
+            elif op in _LEADING_OPS:
+                if not leading or (index == 0) != (op is Op.Variable):
+                    where = "the entry block" if op is Op.Variable else "a block with predecessors"
+                    errors.append(f"Block %{block.label}: {inst.text()} is not at the start "
+                                  f"of {where}")
+            else:
+                errors.append(f"Block %{block.label}: {inst.text()} inside a block")
+        for position in _LABEL_OPERANDS.get(instructions[-1].op, ()):
+            if instructions[-1].operands[position] not in label_set:
+                shaped = False
+    if not shaped:
+        _check_labels(blocks, label_set, errors)
+        return
+
+    succs = {block.label: block.successors() for block in blocks}
+    preds = {label: [] for label in labels}
+    for label in labels:
+        for succ in succs[label]:
+            preds[succ].append(label)
+    if preds[labels[0]]:
+        errors.append(f"{name}: entry block %{labels[0]} is the target of a branch")
+        return
+
+    idom, rpo = _dominators(labels, succs, preds)
+
+    # Dominator tree intervals: a dominates b iff enter[a] <= enter[b] <= leave[a]
+    children = {label: [] for label in rpo}
+    for label in rpo[1:]:
+        children[idom[label]].append(label)
+    enter, leave = {}, {}
+    counter = 0
+    stack = [(labels[0], False)]
+    while stack:
+        label, done = stack.pop()
+        if done:
+            leave[label] = counter - 1
+            continue
+        enter[label] = counter
+        counter += 1
+        stack.append((label, True))
+        stack.extend((child, False) for child in children[label])
+
+    def dominates(a, b):
+        return enter[a] <= enter[b] <= leave[a]
+
+    _check_labels(blocks, label_set, errors)
+    _check_control_flow(blocks, succs, preds, idom, dominates, errors)
+
+    body = {block.label: block.instructions for block in blocks}
+
+    def check_use(inst, value, label, position):
+        # A use at `position` in block `label`
+        site = definitions.get(value)
+        if site is None:
+            if value not in local_types:
+                errors.append(f"{inst.text()}: %{value} is not defined")
+        elif site[0] == label:
+            if site[1] >= position and label in idom:
+                errors.append(f"{inst.text()}: %{value} is used before it is defined")
+        elif label in idom and (site[0] not in idom or not dominates(site[0], label)):
+            # Uses in unreachable blocks are not ordered
+            errors.append(f"{inst.text()}: the definition of %{value} does not dominate this use")
+
+    for block in blocks:
+        label = block.label
+        for position, inst in enumerate(block.instructions):
+            op = inst.op
+            if op is Op.Phi:
+                operands = inst.operands
+                parents = operands[1::2]
+                if sorted(parents) != sorted(preds[label]):
+                    errors.append(f"{inst.text()}: parents differ from the predecessors of "
+                                  f"%{label}")
+                # Each value is used at the end of its parent block
+                for value, parent in zip(operands[::2], parents):
+                    if parent in body:
+                        check_use(inst, value, parent, len(body[parent]))
+            else:
+                skip = _LABEL_OPERANDS.get(op, ())
+                for index, operand in enumerate(inst.operands):
+                    if operand.__class__ is not int or index in skip:
+                        continue
+                    site = definitions.get(operand)
+                    if site is not None and site[0] == label and site[1] < position:
+                        continue    # defined earlier in the block
+                    if operand in label_set:
+                        errors.append(f"{inst.text()}: label %{operand} used as a value")
+                    else:
+                        check_use(inst, operand, label, position)
+            rule = _TYPE_RULES.get(op)
+            if rule is not None:
+                problem = rule(inst, types, local_types, header.type)
+                if problem:
+                    errors.append(f"{inst.text()}: {problem}")
+
+
+def _check_labels(blocks, label_set, errors):
+    """Branch targets, merge blocks, continue targets and phi parents are blocks of the function."""
+    for block in blocks:
+        for inst in block.instructions:
+            if inst.op is Op.Phi:
+                positions = range(1, len(inst.operands), 2)
+            else:
+                positions = _LABEL_OPERANDS.get(inst.op, ())
+            for position in positions:
+                if inst.operands[position] not in label_set:
+                    errors.append(f"{inst.text()}: %{inst.operands[position]} is not a block "
+                                  "of this function")
+
+
+def _check_control_flow(blocks, succs, preds, idom, dominates, errors):
+    """The structured control flow rules, on a function whose blocks are well formed."""
+    merge_of = {}   # merge block → its header
+    loops = {}      # loop header → (merge block, continue target)
+    for block in blocks:
+        instructions = block.instructions
+        last = instructions[-1]
+        for position, inst in enumerate(instructions[:-1]):
+            if inst.op is not Op.SelectionMerge and inst.op is not Op.LoopMerge:
+                continue
+            if position != len(instructions) - 2:
+                errors.append(f"Block %{block.label}: {inst.text()} is not right before "
+                              "the terminator")
+                continue
+            if inst.op is Op.SelectionMerge and last.op is not Op.BranchConditional:
+                errors.append(f"Block %{block.label}: {inst.text()} is not followed by "
+                              "OpBranchConditional")
+            elif inst.op is Op.LoopMerge and last.op not in (Op.Branch, Op.BranchConditional):
+                errors.append(f"Block %{block.label}: {inst.text()} is not followed by a branch")
+            merge = inst.operands[0]
+            if merge in merge_of:
+                errors.append(f"Block %{merge} is the merge block of both %{merge_of[merge]} "
+                              f"and %{block.label}")
+            merge_of[merge] = block.label
+            if block.label not in idom:
+                continue
+            if merge in idom and not dominates(block.label, merge):
+                errors.append(f"Header %{block.label} does not dominate its merge block %{merge}")
+            if inst.op is Op.LoopMerge:
+                continue_ = inst.operands[1]
+                loops[block.label] = (merge, continue_)
+                if continue_ in idom and not dominates(block.label, continue_):
+                    errors.append(f"Loop header %{block.label} does not dominate its continue "
+                                  f"target %{continue_}")
+
+    # Back edges: a branch to a block that dominates it (for a continue target
+    # nothing reaches, its branch back to its loop header)
+    back_edges = {header: 0 for header in loops}
+    for label, targets in succs.items():
+        for target in targets:
+            if label in idom:
+                if target not in idom or not dominates(target, label):
+                    continue
+            elif target not in loops or loops[target][1] != label:
+                continue
+            if target not in loops:
+                errors.append(f"Block %{label} branches back to %{target}, which is not a "
+                              "loop header")
+                continue
+            back_edges[target] += 1
+            continue_ = loops[target][1]
+            if label in idom and continue_ in idom and not dominates(continue_, label):
+                errors.append(f"Back edge from %{label} to loop header %{target} is not in "
+                              f"its continue construct (%{continue_})")
+    for header, count in back_edges.items():
+        if count != 1:
+            errors.append(f"Loop header %{header} is the target of {count} back edges, "
+                          "not exactly one")
+
+    # Conditional branches without a merge instruction break out of a loop
+    # or continue it
+    for block in blocks:
+        instructions = block.instructions
+        last = instructions[-1]
+        if last.op is not Op.BranchConditional or last.operands[1] == last.operands[2]:
+            continue
+        if len(instructions) >= 2 and instructions[-2].op in (Op.SelectionMerge, Op.LoopMerge):
+            continue
+        if block.label not in idom:
+            continue
+        targets = last.operands[1:3]
+        for header, exits in loops.items():
+            if dominates(header, block.label) and not (exits[0] in idom and
+                                                       dominates(exits[0], block.label)):
+                if targets[0] in exits or targets[1] in exits:
+                    break
+        else:
+            errors.append(f"Block %{block.label}: {last.text()} has no merge instruction and "
+                          "is not a break or continue")
+
+
+# Type rules of the instructions in function bodies: each takes the
+# instruction, the types by ID, the type of each value and the function's
+# return type, and returns what is wrong, or None
+
+def _kind(types, type_id):
+    type_inst = types.get(type_id)
+    return type_inst.op if type_inst is not None else None
+
+
+def _pointer(types, type_id):
+    type_inst = types.get(type_id)
+    return type_inst if type_inst is not None and type_inst.op is Op.TypePointer else None
+
+
+def _int_rule(inst, types, value_types, return_type):
+    if _kind(types, inst.type) is not Op.TypeInt:
+        return "result type is not an integer"
+    for operand in inst.operands:
+        if value_types.get(operand) != inst.type:
+            return "operand types differ from the result type"
+
+
+def _float_rule(inst, types, value_types, return_type):
+    if _kind(types, inst.type) is not Op.TypeFloat:
+        return "result type is not float"
+    for operand in inst.operands:
+        if value_types.get(operand) != inst.type:
+            return "operand types differ from the result type"
+
+
+def _bool_rule(inst, types, value_types, return_type):
+    if _kind(types, inst.type) is not Op.TypeBool:
+        return "result type is not bool"
+    for operand in inst.operands:
+        if value_types.get(operand) != inst.type:
+            return "operands are not bool"
+
+
+def _shift_rule(inst, types, value_types, return_type):
+    if _kind(types, inst.type) is not Op.TypeInt:
+        return "result type is not an integer"
+    for operand in inst.operands:
+        if _kind(types, value_types.get(operand)) is not Op.TypeInt:
+            return "operands are not integers"
+
+
+def _comparison_rule(operand_kind, name):
+    def rule(inst, types, value_types, return_type):
+        if _kind(types, inst.type) is not Op.TypeBool:
+            return "result type is not bool"
+        first, second = (value_types.get(operand) for operand in inst.operands)
+        if _kind(types, first) is not operand_kind or first != second:
+            return f"operands are not two {name} of the same type"
+    return rule
+
+
+def _conversion_rule(source, target):
+    def rule(inst, types, value_types, return_type):
+        if (_kind(types, value_types.get(inst.operands[0])) is not source
+                or _kind(types, inst.type) is not target):
+            return "operand or result type is not the one the conversion takes"
+    return rule
+
+
+def _same_type_rule(inst, types, value_types, return_type):
+    if value_types.get(inst.operands[0]) != inst.type:
+        return "operand type differs from the result type"
+
+
+def _select_rule(inst, types, value_types, return_type):
+    condition, first, second = inst.operands
+    if _kind(types, value_types.get(condition)) is not Op.TypeBool:
+        return "condition is not bool"
+    if value_types.get(first) != inst.type or value_types.get(second) != inst.type:
+        return "operand types differ from the result type"
+
+
+def _phi_rule(inst, types, value_types, return_type):
+    for value in inst.operands[::2]:
+        if value_types.get(value) != inst.type:
+            return f"%{value} has a type different from the result type"
+
+
+def _load_rule(inst, types, value_types, return_type):
+    pointer = _pointer(types, value_types.get(inst.operands[0]))
+    if pointer is None:
+        return "operand is not a pointer"
+    if pointer.operands[1] != inst.type:
+        return "result type differs from the pointee type"
+
+
+def _store_rule(inst, types, value_types, return_type):
+    pointer = _pointer(types, value_types.get(inst.operands[0]))
+    if pointer is None:
+        return "operand is not a pointer"
+    if pointer.operands[0] == "Input":
+        return "stores to an Input variable"
+    if pointer.operands[1] != value_types.get(inst.operands[1]):
+        return "the stored value's type differs from the pointee type"
+
+
+def _variable_rule(inst, types, value_types, return_type):
+    pointer = _pointer(types, inst.type)
+    if pointer is None:
+        return "result type is not a pointer"
+    if inst.operands[0] != pointer.operands[0]:
+        return "storage class differs from its pointer type"
+    if len(inst.operands) > 1 and value_types.get(inst.operands[1]) != pointer.operands[1]:
+        return "initializer type differs from the pointee type"
+
+
+def _access_chain_rule(inst, types, value_types, return_type):
+    operands = inst.operands
+    base = _pointer(types, value_types.get(operands[0]))
+    pointer = _pointer(types, inst.type)
+    if base is None:
+        return "base is not a pointer"
+    if pointer is None:
+        return "result type is not a pointer"
+    if pointer.operands[0] != base.operands[0]:
+        return "storage class differs from the base's"
+    for index in operands[1:]:
+        if _kind(types, value_types.get(index)) is not Op.TypeInt:
+            return "indexes are not integers"
+    # OpInBoundsPtrAccessChain's first index steps over whole elements
+    element = base.operands[1]
+    for _ in operands[2 if inst.op is Op.InBoundsPtrAccessChain else 1:]:
+        if _kind(types, element) is not Op.TypeArray:
+            return f"indexes into %{element}, which is not an array"
+        element = types[element].operands[0]
+    if element != pointer.operands[1]:
+        return "result type does not point to the indexed element"
+
+
+def _composite_extract_rule(inst, types, value_types, return_type):
+    vector = types.get(value_types.get(inst.operands[0]))
+    if vector is None or vector.op is not Op.TypeVector:
+        return "operand is not a vector"
+    if inst.type != vector.operands[0]:
+        return "result type differs from the component type"
+    if not 0 <= int(inst.operands[1]) < int(vector.operands[1]):
+        return "index is out of the vector's bounds"
+
+
+def _branch_conditional_rule(inst, types, value_types, return_type):
+    if _kind(types, value_types.get(inst.operands[0])) is not Op.TypeBool:
+        return "condition is not bool"
+
+
+def _return_value_rule(inst, types, value_types, return_type):
+    if value_types.get(inst.operands[0]) != return_type:
+        return "value type differs from the function's return type"
+
+
+def _return_rule(inst, types, value_types, return_type):
+    if _kind(types, return_type) is not Op.TypeVoid:
+        return "function does not return void"
+
+
+_TYPE_RULES = {
+    **dict.fromkeys((Op.IAdd, Op.ISub, Op.IMul, Op.UDiv, Op.SDiv, Op.UMod, Op.BitwiseOr,
+                     Op.BitwiseXor, Op.BitwiseAnd, Op.SNegate, Op.Not), _int_rule),
+    **dict.fromkeys((Op.FAdd, Op.FSub, Op.FMul, Op.FDiv, Op.FNegate), _float_rule),
+    **dict.fromkeys((Op.LogicalOr, Op.LogicalAnd, Op.LogicalNot), _bool_rule),
+    **dict.fromkeys((Op.ShiftRightLogical, Op.ShiftLeftLogical), _shift_rule),
+    **dict.fromkeys((Op.IEqual, Op.INotEqual, Op.UGreaterThan, Op.UGreaterThanEqual,
+                     Op.ULessThan, Op.ULessThanEqual),
+                    _comparison_rule(Op.TypeInt, "integers")),
+    **dict.fromkeys((Op.FOrdEqual, Op.FOrdNotEqual, Op.FOrdLessThan, Op.FOrdGreaterThan,
+                     Op.FOrdLessThanEqual, Op.FOrdGreaterThanEqual),
+                    _comparison_rule(Op.TypeFloat, "floats")),
+    Op.ConvertFToU: _conversion_rule(Op.TypeFloat, Op.TypeInt),
+    Op.ConvertUToF: _conversion_rule(Op.TypeInt, Op.TypeFloat),
+    Op.UConvert: _conversion_rule(Op.TypeInt, Op.TypeInt),
+    Op.CompositeExtract: _composite_extract_rule,
+    Op.CopyObject: _same_type_rule,
+    Op.Select: _select_rule,
+    Op.Phi: _phi_rule,
+    Op.Load: _load_rule,
+    Op.Store: _store_rule,
+    Op.Variable: _variable_rule,
+    Op.AccessChain: _access_chain_rule,
+    Op.InBoundsPtrAccessChain: _access_chain_rule,
+    Op.BranchConditional: _branch_conditional_rule,
+    Op.ReturnValue: _return_value_rule,
+    Op.Return: _return_rule,
+}
@@ -0,0 +1,146 @@
+"""
+Local value numbering over the instructions of a generated function.
+
+The generator compiles every expression node to a fresh instruction, so a
+sub-expression or variable read that repeats (as it does all over
+unrolled code) is computed again each time. number_values() walks the
+function once, keeping a table of the values available in the current
+basic block:
+- a pure instruction whose opcode, type and operands match an earlier one
+  is dropped, and its result ID replaced by the earlier result
+- an OpLoad from a pointer that was loaded from, or stored to, earlier is
+  dropped and replaced by the value read or written then, unless a store
+  that may alias the pointer came in between
+
+A block entered only by the OpBranch right before it (generate_kernel
+starts one for every statement) continues its predecessor's table: the
+predecessor dominates it. Any other label starts an empty table.
+
+Aliasing is decided per root object: each Function variable (and every
+access chain into it) is its own root, while all kernel parameters share
+one, since the host may pass the same buffer twice.
+"""
+
+from .ir import Op
+
+# Instructions without side effects whose result depends only on their operands
+PURE_OPS = frozenset({
+    Op.IAdd, Op.ISub, Op.IMul, Op.SDiv, Op.UDiv, Op.UMod, Op.SNegate,
+    Op.FAdd, Op.FSub, Op.FMul, Op.FDiv, Op.FNegate,
+    Op.IEqual, Op.INotEqual, Op.ULessThan, Op.UGreaterThan,
+    Op.ULessThanEqual, Op.UGreaterThanEqual,
+    Op.FOrdEqual, Op.FOrdNotEqual, Op.FOrdLessThan, Op.FOrdGreaterThan,
+    Op.FOrdLessThanEqual, Op.FOrdGreaterThanEqual,
+    Op.LogicalAnd, Op.LogicalOr, Op.LogicalNot, Op.Select,
+    Op.BitwiseAnd, Op.BitwiseOr, Op.BitwiseXor, Op.Not,
+    Op.ShiftLeftLogical, Op.ShiftRightLogical,
+    Op.ConvertUToF, Op.ConvertFToU, Op.UConvert, Op.Bitcast,
+    Op.AccessChain, Op.InBoundsPtrAccessChain, Op.CompositeExtract,
+})
+
+# Pure instructions whose two operands may be swapped
+COMMUTATIVE_OPS = frozenset({
+    Op.IAdd, Op.IMul, Op.FAdd, Op.FMul, Op.IEqual, Op.INotEqual,
+    Op.FOrdEqual, Op.FOrdNotEqual, Op.LogicalAnd, Op.LogicalOr,
+    Op.BitwiseAnd, Op.BitwiseOr, Op.BitwiseXor,
+})
+
+_ACCESS_CHAINS = (Op.AccessChain, Op.InBoundsPtrAccessChain)
+_GLOBAL = "global"
+
+
+def label_references(instructions):
+    """
+    Counts how often each label is named by a branch or merge instruction.
+
+    Args:
+        instructions (iterable[Instruction]): Instructions of a function.
+
+    Returns:
+        dict: label ID → number of references.
+    """
+    refs = {}
+    for inst in instructions:
+        op = inst.op
+        if op is Op.Branch or op is Op.SelectionMerge:
+            targets = inst.operands[:1]
+        elif op is Op.BranchConditional:
+            targets = inst.operands[1:3]
+        elif op is Op.LoopMerge:
+            targets = inst.operands[:2]
+        else:
+            continue
+        for label in targets:
+            refs[label] = refs.get(label, 0) + 1
+    return refs
+
+
+def number_values(function):
+    """
+    Removes redundant computations and loads from a function, renaming
+    the uses of their results.
+
+    Args:
+        function (ir.Function): The function, rewritten in place.
+    """
+    refs = label_references(inst for block in function.blocks for inst in block.instructions)
+    replace = {}    # removed result ID → ID of the value it duplicated
+    roots = {}      # pointer ID → root object it points into
+    values = {}     # (opcode, type, operands) → result ID
+    loads = {}      # pointer ID → ID of its current value
+    previous = None
+
+    for block in function.blocks:
+        label = block.label
+        last = previous.instructions[-1] if previous else None
+        if not (last is not None and last.op is Op.Branch and last.operands[0] == label
+                and refs.get(label) == 1):
+            values.clear()
+            loads.clear()
+        previous = block
+
+        out = []
+        for inst in block.instructions:
+            operands = inst.operands
+            if replace:
+                renamed = tuple([replace.get(x, x) for x in operands])
+                if renamed != operands:
+                    inst.operands = operands = renamed
+
+            op = inst.op
+            if op in PURE_OPS:
+                args = sorted(operands) if op in COMMUTATIVE_OPS else operands
+                key = (op, inst.type, tuple(args))
+                if key in values:
+                    replace[inst.result] = values[key]
+                    continue
+                values[key] = inst.result
+                if op in _ACCESS_CHAINS:
+                    roots[inst.result] = roots.get(operands[0], _GLOBAL)
+
+            elif op is Op.Variable:
+                roots[inst.result] = inst.result
+
+            elif op is Op.Load:
+                pointer = operands[0]
+                if pointer in loads:
+                    replace[inst.result] = loads[pointer]
+                    continue
+                loads[pointer] = inst.result
+
+            elif op is Op.Store:
+                pointer, value = operands[0], operands[1]
+                root = roots.get(pointer, _GLOBAL)
+                for other in [p for p in loads if roots.get(p, _GLOBAL) == root]:
+                    del loads[other]
+                loads[pointer] = value
+
+            out.append(inst)
+        block.instructions = out
+
+    # Phis may name values removed further down (loop back edges)
+    if replace:
+        for block in function.blocks:
+            for inst in block.instructions:
+                if inst.op is Op.Phi:
+                    inst.operands = tuple([replace.get(x, x) for x in inst.operands])
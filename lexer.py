@@ -1,18 +1,195 @@
-def tokenize(source_code):
+import re
+from array import array
+from bisect import bisect_right
+
+
+# Token kinds
+KEYWORD = "keyword"
+IDENT = "ident"
+NUMBER = "number"
+OP = "op"
+DIRECTIVE = "directive"
+RAW = "raw"
+WORD = "word"   # anything else the old lexer glued together (e.g. "x#1")
+
+KEYWORDS = frozenset({
+    "var", "const", "kernel", "return", "if", "else", "loop",
+    "break", "continue", "bitwise", "cast", "as", "for", "in",
+})
+
+OPERATORS = frozenset({
+    '->', '==', '!=', '<=', '>=', '&&', '||', '//', '>>', '<<',
+    '(', ')', '{', '}', '[', ']', ':', ',', ';', '=', '+', '-', '*',
+    '/', '%', '!', '<', '>', '&', '|', '~', '.',
+})
+
+# Characters that always form a token on their own
+_SPECIALS = "(){}\\[\\]:,;=+\\-*/%!<>&|~."
+
+# One master pattern. Every match is exactly one token: whitespace and
+# block comments are swallowed by the possessive non-capturing prefix, and group 1 is
+# the lexeme. Alternatives are tried in order:
+#   - "@cpu" followed by the raw trailing code (split apart afterwards)
+#   - other directives
+#   - multi-character operators, then single-character ones
+#   - floats written as "digits.digit..."
+#   - words: any maximal run of characters that are not whitespace,
+#     '@' or one of the specials above
+#   - end of input, so trailing whitespace/comments are consumed by the
+#     prefix instead of being rescanned character by character
+_LEXEME = (
+    r"(@cpu(?!\w)[\s\S]*"
+    r"|@\w*"
+    r"|->|==|!=|<=|>=|&&|\|\||//|>>|<<|[" + _SPECIALS + r"]"
+    r"|\d+\.\d[^\s@" + _SPECIALS + r"]*"
+    r"|[^\s@" + _SPECIALS + r"]+"
+    r"|\Z)"
+)
+_TOKEN_RE = re.compile(r"(?:\s+|/\*[\s\S]*?(?:\*/|\Z))*+" + _LEXEME)
+
+# Re-reads the lexeme starting at a known token offset
+_LEXEME_RE = re.compile(_LEXEME)
+
+_IDENT_RE = re.compile(r"[A-Za-z_]\w*")
+
+
+class Token:
+    """
+    A single lexical token together with its source position.
+
+    Attributes:
+        kind (str): One of KEYWORD, IDENT, NUMBER, OP, DIRECTIVE, RAW or WORD.
+        text (str): The exact lexeme.
+        line (int): 1-based line number of the first character.
+        column (int): 1-based column of the first character.
+    """
+
+    __slots__ = ("kind", "text", "line", "column")
+
+    def __init__(self, kind, text, line, column):
+        self.kind = kind
+        self.text = text
+        self.line = line
+        self.column = column
+
+    def __repr__(self):
+        return f"Token({self.kind}, {self.text!r}, {self.line}:{self.column})"
+
+
+def classify(text):
+    """
+    Returns the token kind of a lexeme produced by the tokenizer.
+
+    Args:
+        text (str): A single lexeme.
+
+    Returns:
+        str: The token kind.
+    """
+    if text in OPERATORS:
+        return OP
+    if text in KEYWORDS:
+        return KEYWORD
+    if text[0] == "@":
+        return DIRECTIVE
+    if text[0].isdigit():
+        return NUMBER
+    if _IDENT_RE.fullmatch(text):
+        return IDENT
+    return WORD
+
+
+def _is_cpu_block(text):
+    """Checks whether a directive lexeme is "@cpu" plus its raw block."""
+    return text.startswith("@cpu") and (len(text) == 4 or not (text[4].isalnum() or text[4] == "_"))
+
+
+def _split_cpu_block(text):
+    """
+    Splits an "@cpu<raw code>" match into the directive and the raw block.
+    Whitespace right after the directive is not part of the raw code.
+    """
+    raw = text[4:]
+    return "@cpu", raw.lstrip(), len(raw) - len(raw.lstrip())
+
+
+def iter_tokens(source_code):
     """
     Lexical analyzer for Mini-SIL source code.
 
-    Splits the input source into tokens, including:
-    - identifiers
-    - literals
-    - symbols/operators
-    - keywords like @cpu
+    Scans the source in a single pass with one compiled master regex and
+    lazily yields position-carrying Token records:
+    - identifiers and keywords
+    - literals (decimal, hex, and floats with dots)
+    - symbols/operators, including multi-character ones (==, !=, //, >>, ...)
+    - directives like @cpu, followed by the raw trailing block
+
+    Block comments (/* ... */) and whitespace are skipped. Only the token
+    being produced is held in memory, so the parser can consume a large
+    unrolled program without materializing its token list.
+
+    Args:
+        source_code (str): The SIL source code as a string.
+
+    Yields:
+        Token: The tokens in source order.
+    """
+    kinds = {}
+    count = source_code.count
+    line = 1
+    line_start = 0
+    prev = 0
+
+    for m in _TOKEN_RE.finditer(source_code):
+        text = m.group(1)
+        if not text:
+            break
+        start = m.start(1)
+
+        newlines = count("\n", prev, start)
+        if newlines:
+            line += newlines
+            line_start = source_code.rfind("\n", prev, start) + 1
+        prev = start
+
+        kind = kinds.get(text)
+        if kind is None:
+            kind = kinds[text] = classify(text)
+
+        if kind == DIRECTIVE and _is_cpu_block(text):
+            directive, raw, skipped = _split_cpu_block(text)
+            yield Token(DIRECTIVE, directive, line, start - line_start + 1)
+
+            raw_start = start + 4 + skipped
+            newlines = count("\n", start, raw_start)
+            if newlines:
+                line += newlines
+                line_start = source_code.rfind("\n", start, raw_start) + 1
+            yield Token(RAW, raw, line, raw_start - line_start + 1)
+            return
 
-    Supports:
-    - block comments (/* ... */)
-    - multi-character operators (==, !=, <=, >=, //, >>, etc.)
-    - float numbers with dots
-    - raw blocks after @cpu
+        yield Token(kind, text, line, start - line_start + 1)
+
+
+def tokenize_tokens(source_code):
+    """
+    Tokenizes the whole source at once.
+
+    Args:
+        source_code (str): The SIL source code as a string.
+
+    Returns:
+        list[Token]: The tokens in source order.
+    """
+    return list(iter_tokens(source_code))
+
+
+def tokenize(source_code):
+    """
+    Compatibility wrapper for callers that work on plain strings.
+
+    Produces exactly the lexemes of tokenize_tokens(), without building
+    Token records.
 
     Args:
         source_code (str): The SIL source code as a string.
@@ -20,112 +197,128 @@ def tokenize(source_code):
     Returns:
         list: A flat list of tokens as strings.
     """
-    tokens = []
-    current = ''
-
-    # Single-character special tokens
-    specials = {
-        '(', ')', '{', '}', ':', ',', ';', '=', '+', '-', '*',
-        '/', '%', '!', '<', '>', '&', '|', '~', '.'
-    }
-
-    # Multi-character operators
-    multi_char_specials = {
-        '->', '==', '!=', '<=', '>=', '&&', '||', '//', '>>', '<<'
-    }
-
-    i = 0
-    while i < len(source_code):
-        # Handle block comments: /* ... */
-        if (
-            i + 1 < len(source_code)
-            and source_code[i] == '/'
-            and source_code[i + 1] == '*'
-        ):
-            i += 2
-            while (
-                i + 1 < len(source_code)
-                and not (source_code[i] == '*' and source_code[i + 1] == '/')
-            ):
-                i += 1
-            i += 2 if i + 1 < len(source_code) else 1
-            continue
-
-        # Handle two-character operators (e.g., //, ==)
-        if i + 1 < len(source_code):
-            two_chars = source_code[i] + source_code[i + 1]
-            if two_chars in multi_char_specials:
-                if current:
-                    tokens.append(current)
-                    current = ''
-                tokens.append(two_chars)
-                i += 2
-                continue
-
-        char = source_code[i]
-
-        if char.isspace():
-            # End of identifier/literal
-            if current:
-                tokens.append(current)
-                current = ''
-            i += 1
-
-        elif char == '@':
-            # Handle @cpu and similar directives
-            if current:
-                tokens.append(current)
-                current = ''
-            word = '@'
-            i += 1
-            while i < len(source_code) and (
-                source_code[i].isalnum() or source_code[i] == '_'
-            ):
-                word += source_code[i]
-                i += 1
-            tokens.append(word)
-
-            # Handle @cpu block specially: capture raw trailing code
-            if word == "@cpu":
-                raw_code = ""
-
-                # Skip any whitespace after @cpu
-                while i < len(source_code) and source_code[i].isspace():
-                    i += 1
-
-                # Capture all remaining code as raw CPU block
-                while i < len(source_code):
-                    raw_code += source_code[i]
-                    i += 1
-                tokens.append(raw_code)
-                break  # @cpu always ends the SIL code
-            continue
-
-        elif char in specials:
-            # Check for float pattern like "2 . 5" (space-separated float)
-            if (
-                char == '.'
-                and current.isdigit()
-                and i + 1 < len(source_code)
-                and source_code[i + 1].isdigit()
-            ):
-                current += char
-                i += 1
-                continue
-
-            if current:
-                tokens.append(current)
-                current = ''
-            tokens.append(char)
-            i += 1
-
-        else:
-            # Accumulate identifier, number, etc.
-            current += char
-            i += 1
-
-    # Flush last accumulated token
-    if current:
-        tokens.append(current)
+    tokens = _TOKEN_RE.findall(source_code)
+    while tokens and not tokens[-1]:
+        tokens.pop()  # empty end-of-input matches
+
+    # "@cpu" swallowed the rest of the file; split off the raw block
+    if tokens and _is_cpu_block(tokens[-1]):
+        directive, raw, _ = _split_cpu_block(tokens.pop())
+        tokens.append(directive)
+        tokens.append(raw)
 
     return tokens
+
+
+# Numeric kind codes used by PackedTokens: one code per token category that
+# carries a variable lexeme, then one code per operator and keyword.
+_VARIABLE_KINDS = (IDENT, NUMBER, WORD, DIRECTIVE, RAW)
+_FIXED_LEXEMES = tuple(sorted(OPERATORS)) + tuple(sorted(KEYWORDS))
+KIND_CODES = {kind: code for code, kind in enumerate(_VARIABLE_KINDS)}
+LEXEME_CODES = {text: code for code, text in enumerate(_FIXED_LEXEMES, len(_VARIABLE_KINDS))}
+CODE_TEXTS = (None,) * len(_VARIABLE_KINDS) + _FIXED_LEXEMES
+
+
+class PackedTokens:
+    """
+    Compact token stream for very large sources.
+
+    Instead of one Python object per token, a token is stored as two
+    machine integers:
+    - kinds (array('H')): a code from LEXEME_CODES for operators and
+      keywords, or from KIND_CODES for identifiers, numbers and other
+      variable lexemes
+    - offsets (array('I')): where the token starts in the source
+
+    Operator and keyword text comes straight from CODE_TEXTS. Variable
+    lexemes are re-read from the source on demand and interned, so every
+    occurrence of the same identifier shares one string object.
+    """
+
+    __slots__ = ("source", "kinds", "offsets", "_interned", "_line_starts")
+
+    def __init__(self, source, kinds, offsets):
+        self.source = source
+        self.kinds = kinds
+        self.offsets = offsets
+        self._interned = {}
+        self._line_starts = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def text(self, index):
+        """Returns the lexeme of token `index`."""
+        code = self.kinds[index]
+        text = CODE_TEXTS[code]
+        if text is not None:
+            return text
+
+        offset = self.offsets[index]
+        if code == KIND_CODES[RAW]:
+            return self.source[offset:]
+        text = _LEXEME_RE.match(self.source, offset).group(1)
+        if code == KIND_CODES[DIRECTIVE] and _is_cpu_block(text):
+            text = "@cpu"
+        return self._interned.setdefault(text, text)
+
+    def location(self, index):
+        """Returns the 1-based (line, column) of token `index`."""
+        if self._line_starts is None:
+            starts = array("I", [0])
+            find = self.source.find
+            nl = find("\n")
+            while nl != -1:
+                starts.append(nl + 1)
+                nl = find("\n", nl + 1)
+            self._line_starts = starts
+        offset = self.offsets[index]
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def nbytes(self):
+        """Memory held by the packed arrays, in bytes."""
+        return (
+            self.kinds.itemsize * len(self.kinds)
+            + self.offsets.itemsize * len(self.offsets)
+        )
+
+
+def pack_tokens(source_code):
+    """
+    Tokenizes the source into a PackedTokens stream.
+
+    Args:
+        source_code (str): The SIL source code as a string.
+
+    Returns:
+        PackedTokens: The tokens in source order.
+    """
+    kinds = array("H")
+    offsets = array("I")
+    add_kind = kinds.append
+    add_offset = offsets.append
+    codes = dict(LEXEME_CODES)
+    raw_code = KIND_CODES[RAW]
+
+    for m in _TOKEN_RE.finditer(source_code):
+        text = m.group(1)
+        if not text:
+            break
+        start = m.start(1)
+
+        code = codes.get(text)
+        if code is None:
+            kind = classify(text)
+            code = codes[text] = KIND_CODES[kind]
+
+        add_kind(code)
+        add_offset(start)
+
+        if code == KIND_CODES[DIRECTIVE] and _is_cpu_block(text):
+            _, raw, skipped = _split_cpu_block(text)
+            add_kind(raw_code)
+            add_offset(start + 4 + skipped)
+            break
+
+    return PackedTokens(source_code, kinds, offsets)
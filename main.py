@@ -4,10 +4,63 @@ import subprocess
 import traceback
 import lexer
 from parser import parser
+from parser.parallel import parse_parallel
 from generator import generator
+from generator.binary import encode
+from generator.validate import validate
 import sil_ast
 from runtime.host import HostRuntime
-from minisil import transform
+from minisil_ast import expand_program
+from optimizer.fold import fold_program
+from cache import CompileCache
+
+
+USAGE = ("Usage: python main.py path/to/file.sil [--debug] [--emit-asm] [--validate fast|full|off] "
+         "[--jobs N] [--intern-ast] [--no-cache] [--arrays minisil|native] [--max-unroll N] "
+         "[--no-fold] [--no-cse] [--no-mem2reg] [--no-dce] [--no-licm] [--no-peephole]")
+
+
+def count(text):
+    """Parses a non-negative integer option value, e.g. for --jobs."""
+    value = int(text)
+    if value < 0:
+        raise ValueError(text)
+    return value
+
+
+def option_value(name, default, parse=str, choices=None):
+    """
+    Returns the value of a command-line option given as `--name value` or
+    `--name=value`, or `default` if it is absent. A missing or invalid
+    value prints the error and the usage line, and exits.
+
+    Args:
+        name (str): The option, e.g. '--jobs'.
+        default: Value when the option is not given.
+        parse (callable): Converts the text; raises ValueError if invalid.
+        choices (tuple): The allowed values, if limited.
+    """
+    value = default
+    for i, arg in enumerate(sys.argv):
+        if arg == name:
+            text = sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+        elif arg.startswith(name + "="):
+            text = arg[len(name) + 1:]
+        else:
+            continue
+        if text is None:
+            print(f"Missing value for {name}")
+            print(USAGE)
+            sys.exit(1)
+        try:
+            value = parse(text)
+        except ValueError:
+            value = None
+        if value is None or (choices and value not in choices):
+            print(f"Invalid value for {name}: {text}")
+            print(USAGE)
+            sys.exit(1)
+    return value
 
 
 def display_tokens(tokens, max_per_line=10):
@@ -26,14 +79,80 @@ def display_tokens(tokens, max_per_line=10):
     print()
 
 
+def run_cpu_blocks(cpu_nodes, binary):
+    """
+    Loads the compiled SPIR-V into an OpenCL runtime and executes the
+    @cpu blocks with it exposed as `rt` and `gpu`.
+
+    Args:
+        cpu_nodes (list): sil_ast.CpuBlock nodes, in source order.
+        binary (bytes): The validated SPIR-V binary.
+    """
+    print("Running CPU block(s)...")
+    rt = HostRuntime()
+    rt.load_spirv_binary(binary)
+
+    # Expose runtime to CPU code blocks
+    globals()["rt"] = rt
+    globals()["gpu"] = rt  # alias
+
+    for node in cpu_nodes:
+        exec(node.code, globals())
+
+    print("CPU block execution completed.")
+
+
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python main.py path/to/file.sil [--debug]")
+        print(USAGE)
         sys.exit(1)
 
     filename = sys.argv[1]
     debug_mode = "--debug" in sys.argv
 
+    # --emit-asm: also write the SPIR-V assembly to <name>.spvasm next to the source
+    emit_asm = "--emit-asm" in sys.argv
+
+    # --validate fast|full|off: check the module with the built-in validator
+    # (fast, see generator/validate.py), with it and spirv-val (full), or not at all
+    validate_mode = option_value("--validate", "fast", choices=("fast", "full", "off"))
+
+    # --jobs N: parse top-level kernels in N worker processes
+    jobs = option_value("--jobs", 1, count)
+
+    # --intern-ast: share identical expression nodes and subtrees
+    nodes = sil_ast.InterningNodeFactory(hash_cons=True) if "--intern-ast" in sys.argv else None
+
+    # --arrays native: compile arrays to OpTypeArray variables and for-loops
+    # to real loops, instead of expanding both into scalars (Mini-SIL)
+    arrays_mode = option_value("--arrays", "minisil", choices=("minisil", "native"))
+
+    # --max-unroll N: unroll for-loops with literal bounds of up to N
+    # iterations fully and longer ones partially; other loops stay loops
+    max_unroll = option_value("--max-unroll", None, count)
+
+    # --no-fold: compile expressions as written, without constant folding
+    fold = "--no-fold" not in sys.argv
+
+    # --no-cse: keep repeated computations and loads (see generator/value_numbering.py)
+    cse = "--no-cse" not in sys.argv
+
+    # --no-mem2reg: keep every local in Function memory (see generator/mem2reg.py)
+    mem2reg = "--no-mem2reg" not in sys.argv
+
+    # --no-dce: keep unreachable code, dead stores and unused instructions (see generator/dce.py)
+    dce = "--no-dce" not in sys.argv
+
+    # --no-licm: leave loop-invariant code inside loops (see generator/licm.py)
+    licm = "--no-licm" not in sys.argv
+
+    # --no-peephole: keep bool round trips and operations by powers of two (see generator/peephole.py)
+    peephole = "--no-peephole" not in sys.argv
+
+    # Compiled programs are cached by content unless --no-cache is given.
+    # Debug mode always runs every stage, since it prints their output.
+    cache = None if debug_mode or "--no-cache" in sys.argv else CompileCache()
+
     basename = os.path.splitext(os.path.basename(filename))[0]
     folder = os.path.dirname(filename) or "."
 
@@ -42,36 +161,67 @@ def main():
         with open(filename, "r", encoding="utf-8") as f:
             original_code = f.read()
 
-        print(f"Compiling {filename}...")
-        print("Preprocessing with Mini-SIL...")
-
-        # Transform code (handle array unrolling, loop rewriting, etc.)
-        source_code = transform(original_code)
+        # Unchanged source: skip straight to running the cached binary.
+        # The cache holds no assembly, so --emit-asm always compiles (and
+        # then refreshes the entry)
+        if cache:
+            options = {
+                "arrays": arrays_mode, "max_unroll": max_unroll,
+                "fold": fold, "cse": cse, "mem2reg": mem2reg, "dce": dce,
+                "licm": licm, "peephole": peephole, "validate": validate_mode,
+            }
+            cache_key = cache.key(original_code, options)
+            cached = None if emit_asm else cache.load(cache_key)
+            if cached:
+                ast_tree, binary = cached
+                print(f"Using cached build of {filename} ({len(binary)} bytes of SPIR-V)")
+                cpu_nodes = [n for n in ast_tree if isinstance(n, sil_ast.CpuBlock)]
+                if cpu_nodes:
+                    run_cpu_blocks(cpu_nodes, binary)
+                return
 
         print(f"Compiling {filename}...")
+        source_code = original_code
 
-        # Tokenize source
-        tokens = lexer.tokenize(source_code)
-
-        # Show tokens
+        # Tokenize source. Outside debug mode the parser pulls tokens lazily,
+        # so the full token list of a large program never exists.
         if debug_mode:
-            display_tokens(tokens)
-        else:
-            print("First 20 tokens:", tokens[:20])
+            # Token records carry the positions indented for-bodies need
+            tokens = lexer.tokenize_tokens(source_code)
+            texts = [t.text for t in tokens]
+            display_tokens(texts)
 
-        # Warnings for specific patterns
-        if '//' in tokens:
-            locations = [i for i, t in enumerate(tokens) if t == '//']
-            print(f"WARNING: Token '//' found at positions: {locations}")
-        if ';' not in tokens:
-            print("ALERT: No semicolon ';' tokens found!")
+            # Warnings for specific patterns
+            if '//' in texts:
+                locations = [i for i, t in enumerate(texts) if t == '//']
+                print(f"WARNING: Token '//' found at positions: {locations}")
+            if ';' not in texts:
+                print("ALERT: No semicolon ';' tokens found!")
+        else:
+            tokens = lexer.iter_tokens(source_code)
 
         # Parse AST
-        p = parser.Parser(tokens)
-        ast_tree = p.parse()
+        if jobs > 1 and not debug_mode:
+            ast_tree = parse_parallel(source_code, jobs, nodes)
+        else:
+            p = parser.Parser(tokens, nodes)
+            ast_tree = p.parse()
+
+        if arrays_mode == "minisil":
+            print("Expanding arrays and for-loops with Mini-SIL...")
+            ast_tree = expand_program(ast_tree, max_unroll, nodes)
+
+        if fold:
+            print("Folding constant expressions...")
+            ast_tree = fold_program(ast_tree, nodes)
 
         # Optionally show AST structure
         if debug_mode:
+            # Statements are parsed without rollback: each token is consumed once
+            print(f"\nParser consumed {p.consumed} of {len(tokens)} tokens")
+            if p.consumed != len(tokens):
+                print("WARNING: token consumption does not match token count")
+
             print("\nAST STRUCTURE:")
             for i, node in enumerate(ast_tree):
                 print(f"Node {i}: {type(node).__name__}")
@@ -84,66 +234,53 @@ def main():
                     print(f"  CpuBlock: {preview}...")
 
         # Separate CPU and GPU nodes
-        g = generator.Generator()
+        g = generator.Generator(max_unroll=max_unroll, cse=cse, mem2reg=mem2reg, dce=dce, licm=licm,
+                                peephole=peephole)
         gpu_nodes = [n for n in ast_tree if not isinstance(n, sil_ast.CpuBlock)]
         cpu_nodes = [n for n in ast_tree if isinstance(n, sil_ast.CpuBlock)]
 
-        # Compile GPU code to SPIR-V
-        spv_filename = None
+        # Compile GPU code to SPIR-V, encoded in-process (no spirv-as, no temporary files)
+        binary = None
         if gpu_nodes:
-            print("Generating SPIR-V assembly...")
-            assembly = g.generate(gpu_nodes)
-
-            spvasm_filename = os.path.join(folder, f"{basename}.spvasm")
-            spv_filename = os.path.join(folder, f"{basename}.spv")
-
-            # Save .spvasm file
-            with open(spvasm_filename, "w") as f:
-                f.write(assembly)
-
-            # Assemble to .spv binary
-            print(f"Assembling SPIR-V to {spv_filename}...")
-            result = subprocess.run(
-                ["spirv-as", spvasm_filename, "-o", spv_filename],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode != 0:
-                print("SPIR-V assembly failed:")
-                print(result.stderr)
-                sys.exit(1)
+            print("Generating SPIR-V...")
+            module = g.generate_module(gpu_nodes)
+            binary = encode(module).tobytes()
 
-            print("SPIR-V assembly succeeded.")
-
-        # Validate the .spv file
-        if spv_filename:
-            print(f"Validating {spv_filename}...")
-            result = subprocess.run(
-                ["spirv-val", spv_filename],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode != 0:
+            if emit_asm:
+                spvasm_filename = os.path.join(folder, f"{basename}.spvasm")
+                with open(spvasm_filename, "w") as f:
+                    f.write(module.text())
+                print(f"SPIR-V assembly written to {spvasm_filename}")
+
+        # Validate the module
+        if binary and validate_mode != "off":
+            print("Validating SPIR-V...")
+            errors = validate(module)
+            if errors:
                 print("SPIR-V validation failed:")
-                print(result.stderr)
+                for error in errors:
+                    print(f"  {error}")
                 sys.exit(1)
 
-            print("SPIR-V validation passed.")
-
-        # Execute CPU-side code if present
-        if cpu_nodes and spv_filename:
-            print("Running CPU block(s)...")
-            rt = HostRuntime()
-            rt.load_spirv(spv_filename)
+            if validate_mode == "full":
+                result = subprocess.run(
+                    ["spirv-val", "-"],
+                    input=binary,
+                    capture_output=True,
+                )
+                if result.returncode != 0:
+                    print("SPIR-V validation failed (spirv-val):")
+                    print(result.stderr.decode(errors="replace"))
+                    sys.exit(1)
 
-            # Expose runtime to CPU code blocks
-            globals()["rt"] = rt
-            globals()["gpu"] = rt  # alias
+            print("SPIR-V validation passed.")
 
-            for node in cpu_nodes:
-                exec(node.code, globals())
+        if binary and cache and not cache.store(cache_key, ast_tree, binary):
+            print("AST too deeply nested to cache; build not cached.")
 
-            print("CPU block execution completed.")
+        # Execute CPU-side code if present
+        if cpu_nodes and binary:
+            run_cpu_blocks(cpu_nodes, binary)
 
     except Exception as e:
         print(f"Error during compilation: {e}")
@@ -40,6 +40,8 @@ from __future__ import annotations
 
 import itertools
 import re
+import textwrap
+from bisect import bisect_right
 from typing import List, Tuple
 
 # ---------------------------------------------------------------------------
@@ -112,83 +114,148 @@ def expand_kernel_parameters(code: str) -> tuple[str, _ArrayMapping]:
 # 4) Substituir usos de arrays por variáveis escalares
 # ---------------------------------------------------------------------------
 
+_INDEX_CHAIN_RE = re.compile(r"\b(\w+)((?:\[\s*[0-9]+\s*])+)")
+_INDEX_RE = re.compile(r"\[\s*([0-9]+)\s*]")
+
+
 def substitute_array_uses(code: str, mapping: _ArrayMapping) -> str:
-    """Percorre o mapeamento (mais índices → primeiro) evitando colisões."""
-    for base, idxs, sc in sorted(mapping, key=lambda t: -len(t[1])):
-        idx_pat = ''.join(fr"\[\s*{i}\s*]" for i in idxs)
-        code = re.sub(fr"\b{base}{idx_pat}", sc, code)
-    return code
+    """
+    Substitui `nome[i][j]` pelo escalar correspondente numa única passagem.
+
+    O texto é percorrido uma vez; cada cadeia de índices é resolvida num
+    dicionário indexado por (base, índices). O resultado é idêntico ao da
+    versão antiga, que fazia um `re.sub` por elemento (mais índices
+    primeiro), inclusive nos casos em que a ordem desses `re.sub` importa:
+    - um escalar seguido de mais índices que também é um array
+      (`a[0][1]` → `a_0[1]` → `a_0_1`);
+    - um uso colado ao anterior (`a[0]b[1]`): depois de `a[0]` virar
+      `a_0`, `b` deixa de começar uma palavra.
+    A ordem de aplicação de cada elemento é guardada como "rank".
+    """
+    if not mapping:
+        return code
+
+    ordered = sorted(mapping, key=lambda t: -len(t[1]))
+    table = {}  # (base, índices) → (escalar, ranks em ordem crescente)
+    for rank, (base, idxs, sc) in enumerate(ordered):
+        table.setdefault((base, tuple(map(str, idxs))), (sc, []))[1].append(rank)
+    max_dims = len(ordered[0][1])
+
+    def resolve(base, indices, pieces, limit):
+        """Aplica os elementos na ordem original; devolve (texto, rank final)."""
+        name, used, rank = base, 0, -1
+        while used < len(indices):
+            best = None
+            for k in range(1, min(max_dims, len(indices) - used) + 1):
+                entry = table.get((name, tuple(indices[used:used + k])))
+                if entry is None:
+                    continue
+                ranks = entry[1]
+                pos = bisect_right(ranks, rank)
+                if pos < len(ranks) and ranks[pos] <= limit and (best is None or ranks[pos] < best[0]):
+                    best = (ranks[pos], k, entry[0])
+            if best is None:
+                break
+            rank, k, name = best
+            used += k
+        return name + "".join(pieces[used:]), (rank if used == len(indices) else None)
+
+    out = []
+    last = 0
+    prev_end, prev_rank = -1, None
+    no_limit = len(ordered)
+    for m in _INDEX_CHAIN_RE.finditer(code):
+        start = m.start()
+        chain = list(_INDEX_RE.finditer(m.group(2)))
+        indices = [c.group(1) for c in chain]
+        pieces = [c.group(0) for c in chain]
+
+        # Colado a um uso que virou escalar: só os elementos aplicados até
+        # aquele momento ainda o encontram
+        limit = prev_rank if start == prev_end and prev_rank is not None else no_limit
+        text, prev_rank = resolve(m.group(1), indices, pieces, limit)
+        prev_end = m.end()
+
+        out.append(code[last:start])
+        out.append(text)
+        last = prev_end
+    out.append(code[last:])
+    return "".join(out)
 
 # ---------------------------------------------------------------------------
 # 5) Unroll Loops
 # ---------------------------------------------------------------------------
-def unroll_for_loops(code: str) -> str:
-    import textwrap
-
-    def replace_indexed_vars(line: str) -> str:
-        # Converte a[0][1] para a_0_1
-        pattern = re.compile(r'(\w+)((?:\[\d+\])+)')
-        def repl(m):
-            name = m.group(1)
-            indices = re.findall(r'\[(\d+)\]', m.group(2))
-            return f"{name}_{'_'.join(indices)}"
-        return pattern.sub(repl, line)
-
-    def process_block(lines: list, loop_vars: dict) -> list:
-        """Substitui as variáveis do loop por valores fixos e converte índices."""
-        output = []
-        for line in lines:
-            for var, val in loop_vars.items():
-                line = re.sub(rf'\b{var}\b', str(val), line)
-            output.append(replace_indexed_vars(line))
-        return output
-
-    def collect_block(lines: list, start_idx: int, base_indent: int) -> tuple[list, int]:
-        block = []
-        i = start_idx
-        while i < len(lines):
-            line = lines[i]
-            if line.strip() == "":
-                block.append(line)
-                i += 1
-                continue
-            indent = len(line) - len(line.lstrip())
-            if indent <= base_indent:
-                break
-            block.append(line)
-            i += 1
-        return block, i
+_FOR_RE = re.compile(r'^(\s*)for\s+(\w+)\s+in\s+range\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*:')
+_INDEXED_VAR_RE = re.compile(r'(\w+)((?:\[\d+\])+)')
+
+
+def _join_indices(m) -> str:
+    # "[0][1]" → "_0_1"
+    return f"{m.group(1)}_{m.group(2)[1:-1].replace('][', '_')}"
 
-    lines = code.splitlines()
-    result = []
-    i = 0
 
-    stack = []
+def _replace_indexed_vars(line: str) -> str:
+    """Converte a[0][1] para a_0_1."""
+    if '[' not in line:
+        return line
+    return _INDEXED_VAR_RE.sub(_join_indices, line)
 
+
+def _collect_block(lines: list, start_idx: int, base_indent: int) -> tuple[list, int]:
+    block = []
+    i = start_idx
     while i < len(lines):
         line = lines[i]
-        match = re.match(r'^(\s*)for\s+(\w+)\s+in\s+range\(\s*(\d+)\s*,\s*(\d+)\s*\)\s*:', line)
-        if match:
-            indent, var, start, end = match.group(1), match.group(2), int(match.group(3)), int(match.group(4))
-            base_indent = len(indent)
-            body, next_i = collect_block(lines, i + 1, base_indent)
-            new_result = []
-
-            for val in range(start, end):
-                loop_vars = {var: val}
-                # Checar se a linha de loop seguinte também é um for
-                body_unrolled = unroll_for_loops(textwrap.dedent("\n".join(body)))
-                body_lines = body_unrolled.splitlines()
-                body_replaced = process_block(body_lines, loop_vars)
-                new_result.extend(body_replaced)
-
-            result.extend(new_result)
-            i = next_i
-        else:
-            result.append(line)
+        if line.strip() == "":
+            block.append(line)
             i += 1
+            continue
+        indent = len(line) - len(line.lstrip())
+        if indent <= base_indent:
+            break
+        block.append(line)
+        i += 1
+    return block, i
+
+
+def _iter_unrolled(lines: list):
+    """
+    Gera as linhas com os `for` desenrolados.
+
+    O corpo de um `for` não depende do valor da variável do laço, então é
+    desenrolado uma única vez (laços internos incluídos) e vira um molde:
+    cada linha é quebrada nas ocorrências da variável. Para cada valor só
+    resta juntar as partes com o número e converter os índices; linhas sem
+    a variável são convertidas uma vez e repetidas.
+    """
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        match = _FOR_RE.match(line)
+        if not match:
+            yield line
+            i += 1
+            continue
 
-    return "\n".join(result)
+        indent, var, start, end = match.group(1), match.group(2), int(match.group(3)), int(match.group(4))
+        body, i = _collect_block(lines, i + 1, len(indent))
+
+        template = list(_iter_unrolled(textwrap.dedent("\n".join(body)).splitlines()))
+        if template and template[-1] == "":
+            template.pop()  # como em "\n".join(...).splitlines()
+
+        var_re = re.compile(rf'\b{var}\b')
+        parts = [var_re.split(t) for t in template]
+        fixed = [_replace_indexed_vars(t) if len(p) == 1 else None for t, p in zip(template, parts)]
+
+        for val in range(start, end):
+            val = str(val)
+            for p, f in zip(parts, fixed):
+                yield f if f is not None else _replace_indexed_vars(val.join(p))
+
+
+def unroll_for_loops(code: str) -> str:
+    return "\n".join(_iter_unrolled(code.splitlines()))
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,371 @@
+"""
+AST-level Mini-SIL: expands arrays and for-loops in a parsed program.
+
+Does what minisil.transform does to the source text, but on the AST built
+by the parser, so the expanded program is never turned back into text and
+tokenized again:
+- local arrays become one scalar per element, named as Mini-SIL names
+  them (a[1][2] → a_1_2), starting at 0
+- for-loops are unrolled, with the loop variable replaced by its value in
+  each copy, so indices into expanded arrays become constants
+
+Array parameters stay arrays: the generator passes each one as a single
+buffer, which may also be indexed with runtime values. minisil.transform
+expands them into one scalar parameter per element, and so does this pass
+with scalar_params=True.
+
+Unlike the text pass, for-loops may appear in any block, including
+loop { } and if bodies, and their bounds and indices may be constant
+expressions (a[i + 1]).
+
+With max_unroll set, a for-loop whose trip count is unknown or larger than
+max_unroll is kept as a loop for the generator, as long as it does not
+index a local array with its loop variable.
+"""
+
+import itertools
+
+import sil_ast
+
+
+def expand_program(ast, max_unroll=None, nodes=None, scalar_params=False):
+    """
+    Expands the arrays and for-loops of every kernel.
+
+    The input AST is not modified; unchanged subtrees are shared with the
+    result.
+
+    Args:
+        ast (list): Top-level AST nodes, as returned by Parser.parse().
+        max_unroll (int): Keep for-loops with more iterations than this (or
+            with bounds that are not constant) as loops where possible.
+            None unrolls every loop that indexes an array or has constant
+            bounds.
+        nodes: Expression node factory, as for Parser. Defaults to a plain
+            sil_ast.NodeFactory.
+        scalar_params (bool): Also expand array parameters into one scalar
+            parameter per element, like minisil.transform.
+
+    Returns:
+        list: The expanded top-level AST nodes.
+    """
+    nodes = nodes or sil_ast.NodeFactory()
+    result = []
+    for node in ast:
+        if isinstance(node, sil_ast.Kernel) and _needs_expansion(node, scalar_params):
+            node = _KernelExpander(max_unroll, nodes, scalar_params).expand(node)
+        result.append(node)
+    return result
+
+
+def scalar_name(name, indices):
+    """Name of the scalar holding an array element: ('a', (1, 2)) → 'a_1_2'."""
+    return f"{name}_{'_'.join(map(str, indices))}"
+
+
+def _needs_expansion(kernel, scalar_params):
+    """Checks whether a kernel has array variables or for-loops (or array parameters to expand)."""
+    if scalar_params and any(p.dims for p in kernel.params):
+        return True
+    for stmt in _iter_statements(kernel.body):
+        if isinstance(stmt, sil_ast.For):
+            return True
+        if isinstance(stmt, sil_ast.VarDecl) and isinstance(stmt.value, sil_ast.Array):
+            return True
+    return False
+
+
+def _iter_statements(body):
+    """Yields every statement of a block, including those nested in other blocks."""
+    pending = list(body)
+    while pending:
+        stmt = pending.pop()
+        yield stmt
+        if isinstance(stmt, (sil_ast.Loop, sil_ast.For)):
+            pending.extend(stmt.body)
+        elif isinstance(stmt, sil_ast.If):
+            pending.extend(stmt.then_body)
+            pending.extend(stmt.else_body or ())
+
+
+def _statement_exprs(stmt):
+    """Returns the expressions a statement evaluates itself (not those of nested blocks)."""
+    if isinstance(stmt, sil_ast.Assign):
+        return [stmt.target, stmt.value]
+    if isinstance(stmt, (sil_ast.VarDecl, sil_ast.ConstDecl, sil_ast.Return)):
+        return [stmt.value] if stmt.value is not None else []
+    if isinstance(stmt, sil_ast.If):
+        return [stmt.condition]
+    if isinstance(stmt, sil_ast.For):
+        return [stmt.start, stmt.end]
+    return []
+
+
+def _children(expr):
+    """Returns the sub-expressions of an expression node."""
+    if isinstance(expr, sil_ast.BinaryOp):
+        return (expr.left, expr.right)
+    if isinstance(expr, sil_ast.Index):
+        return (expr.base, expr.index)
+    if isinstance(expr, (sil_ast.UnaryOp, sil_ast.Dereference, sil_ast.AddressOf,
+                         sil_ast.BitwiseExpr, sil_ast.CastExpr)):
+        return (expr.expr,)
+    return ()
+
+
+def _index_root(expr):
+    """Returns the node indexed by a[i][j]: normally the Ident a."""
+    while isinstance(expr, sil_ast.Index):
+        expr = expr.base
+    return expr
+
+
+def _indexes_with(body, var, buffers):
+    """
+    Checks whether any index expression in a block refers to `var`, not
+    counting indices into the arrays named in `buffers`.
+    """
+    for stmt in _iter_statements(body):
+        pending = _statement_exprs(stmt)
+        while pending:
+            expr = pending.pop()
+            root = _index_root(expr)
+            if (isinstance(expr, sil_ast.Index)
+                    and not (isinstance(root, sil_ast.Ident) and root.name in buffers)):
+                index = [expr.index]
+                while index:
+                    node = index.pop()
+                    if isinstance(node, sil_ast.Ident) and node.name == var:
+                        return True
+                    index.extend(_children(node))
+            pending.extend(_children(expr))
+    return False
+
+
+def _constant_int(expr):
+    """
+    Evaluates an integer expression made of literals and + - * // %.
+
+    Returns:
+        int or None: The value, or None if the expression is not constant.
+    """
+    if isinstance(expr, sil_ast.Literal):
+        return expr.value if isinstance(expr.value, int) else None
+    if isinstance(expr, sil_ast.BinaryOp) and expr.op in ('+', '-', '*', '//', '%'):
+        left = _constant_int(expr.left)
+        right = _constant_int(expr.right)
+        if left is None or right is None:
+            return None
+        if expr.op == '+':
+            return left + right
+        if expr.op == '-':
+            return left - right
+        if expr.op == '*':
+            return left * right
+        if right == 0:
+            return None
+        return left // right if expr.op == '//' else left % right
+    return None
+
+
+class _KernelExpander:
+    """
+    Expands one kernel. `arrays` maps the name of each array expanded into
+    scalars to its dimensions, `buffers` those of the array parameters that
+    stay arrays; `env` (passed along) maps unrolled loop variables to their
+    values.
+    """
+
+    def __init__(self, max_unroll, nodes, scalar_params):
+        self.max_unroll = max_unroll
+        self.nodes = nodes
+        self.scalar_params = scalar_params
+        self.arrays = {}
+        self.buffers = {}
+
+    def expand(self, kernel):
+        params = []
+        for p in kernel.params:
+            if not p.dims:
+                params.append(p)
+                continue
+            if not self.scalar_params:
+                self.buffers[p.name] = p.dims
+                params.append(p)
+                continue
+            self.arrays[p.name] = p.dims
+            for indices in itertools.product(*(range(size) for size in p.dims)):
+                params.append(sil_ast.Param(scalar_name(p.name, indices), p.param_type))
+
+        body = self.block(kernel.body, {})
+        return sil_ast.Kernel(kernel.name, params, kernel.return_type, body)
+
+    # === Statements ===
+
+    def block(self, body, env):
+        out = []
+        for stmt in body:
+            self.statement(stmt, env, out)
+        return out
+
+    def statement(self, stmt, env, out):
+        """Appends the expansion of one statement to `out`."""
+        if isinstance(stmt, sil_ast.Assign):
+            out.append(sil_ast.Assign(self.expr(stmt.target, env), self.expr(stmt.value, env)))
+        elif isinstance(stmt, sil_ast.VarDecl):
+            if isinstance(stmt.value, sil_ast.Array):
+                self.arrays[stmt.name] = stmt.value.dims
+                zero = self.nodes.Literal(0)
+                for indices in itertools.product(*(range(size) for size in stmt.value.dims)):
+                    out.append(sil_ast.VarDecl(scalar_name(stmt.name, indices), stmt.var_type, zero))
+            else:
+                out.append(sil_ast.VarDecl(stmt.name, stmt.var_type, self.expr(stmt.value, env)))
+        elif isinstance(stmt, sil_ast.ConstDecl):
+            out.append(sil_ast.ConstDecl(stmt.name, stmt.const_type, self.expr(stmt.value, env)))
+        elif isinstance(stmt, sil_ast.Return):
+            value = self.expr(stmt.value, env) if stmt.value is not None else None
+            out.append(sil_ast.Return(value))
+        elif isinstance(stmt, sil_ast.If):
+            else_body = self.block(stmt.else_body, env) if stmt.else_body is not None else None
+            out.append(sil_ast.If(self.expr(stmt.condition, env), self.block(stmt.then_body, env), else_body))
+        elif isinstance(stmt, sil_ast.Loop):
+            out.append(sil_ast.Loop(self.block(stmt.body, env)))
+        elif isinstance(stmt, sil_ast.For):
+            self.for_loop(stmt, env, out)
+        else:
+            out.append(stmt)
+
+    def for_loop(self, stmt, env, out):
+        """Unrolls a for-loop into `out`, or keeps it as a loop (see module docstring)."""
+        start = self.expr(stmt.start, env)
+        end = self.expr(stmt.end, env)
+        first, stop = _constant_int(start), _constant_int(end)
+        trips = None if first is None or stop is None else max(0, stop - first)
+
+        keep = trips is None or (self.max_unroll is not None and trips > self.max_unroll)
+        if keep and _indexes_with(stmt.body, stmt.var, self.buffers):
+            if trips is None:
+                raise Exception(
+                    f"for-loop over '{stmt.var}' indexes an array, so its bounds must be "
+                    f"constant (or compile with --arrays native)"
+                )
+            keep = False
+
+        if keep:
+            inner = {name: value for name, value in env.items() if name != stmt.var}
+            out.append(sil_ast.For(stmt.var, start, end, self.block(stmt.body, inner)))
+            return
+
+        for value in range(first, stop):
+            inner = dict(env)
+            inner[stmt.var] = value
+            for s in stmt.body:
+                self.statement(s, inner, out)
+
+    # === Expressions ===
+
+    def expr(self, expr, env):
+        """
+        Rewrites an expression: loop variables in `env` become literals,
+        elements of expanded arrays become their scalars and constant
+        indices into buffers become literals. Unchanged subtrees are returned
+        as they are.
+
+        Walks the tree with an explicit stack, like the generator, so deep
+        expressions do not hit the recursion limit.
+        """
+        if not env and not self.arrays:
+            return expr
+
+        nodes = self.nodes
+        values = []
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+
+            if isinstance(node, sil_ast.Ident):
+                if node.name in env:
+                    node = nodes.Literal(env[node.name])
+                values.append(node)
+            elif isinstance(node, (sil_ast.Literal, sil_ast.Builtin)):
+                values.append(node)
+            elif isinstance(node, sil_ast.Index):
+                if not ready:
+                    # Only the indices are rewritten; the chain becomes one
+                    # scalar, or stays an index chain into a buffer
+                    stack.append((node, True))
+                    chain = node
+                    while isinstance(chain, sil_ast.Index):
+                        stack.append((chain.index, False))
+                        chain = chain.base
+                    continue
+                values.append(self.element(node, values))
+            elif not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(_children(node)))
+            elif isinstance(node, sil_ast.BinaryOp):
+                right = values.pop()
+                left = values.pop()
+                if left is not node.left or right is not node.right:
+                    node = nodes.BinaryOp(left, node.op, right)
+                values.append(node)
+            else:
+                operand = values.pop()
+                if operand is not node.expr:
+                    if isinstance(node, sil_ast.UnaryOp):
+                        node = nodes.UnaryOp(node.op, operand)
+                    elif isinstance(node, sil_ast.CastExpr):
+                        node = nodes.CastExpr(operand, node.target_type)
+                    else:
+                        node = getattr(nodes, type(node).__name__)(operand)
+                values.append(node)
+
+        return values.pop()
+
+    def element(self, index, values):
+        """
+        Resolves an index chain a[i][j] to the scalar a_i_j, or to the chain
+        with its rewritten indices if a is a buffer. The rewritten indices
+        are on top of `values`, in source order.
+        """
+        links = []
+        chain = index
+        while isinstance(chain, sil_ast.Index):
+            links.append(chain)
+            chain = chain.base
+        if not isinstance(chain, sil_ast.Ident) or (
+                chain.name not in self.arrays and chain.name not in self.buffers):
+            raise Exception(f"Indexing a non-array: {chain}")
+        name = chain.name
+        dims = self.arrays.get(name) or self.buffers[name]
+
+        rewritten = values[-len(links):]
+        del values[-len(links):]
+        if len(rewritten) != len(dims):
+            raise Exception(f"Array '{name}' has {len(dims)} dimension(s) but is indexed with {len(rewritten)}")
+
+        indices = []
+        for expr, size in zip(rewritten, dims):
+            value = _constant_int(expr)
+            if value is None and name in self.arrays:
+                raise Exception(
+                    f"Array '{name}' is indexed with a runtime value "
+                    f"(only constant indices are supported; compile with --arrays native)"
+                )
+            if value is not None and not 0 <= value < size:
+                raise Exception(f"Index {value} out of range for array '{name}' of size {size}")
+            indices.append(value)
+
+        if name in self.arrays:
+            return self.nodes.Ident(scalar_name(name, indices))
+
+        # Buffer element: rebuild the chain (innermost first), folding
+        # constant indices so the generator computes the offset up front
+        node = chain
+        for link, expr, value in zip(reversed(links), rewritten, indices):
+            if value is not None and not isinstance(expr, sil_ast.Literal):
+                expr = self.nodes.Literal(value)
+            if node is not link.base or expr is not link.index:
+                link = self.nodes.Index(node, expr)
+            node = link
+        return node
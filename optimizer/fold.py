@@ -0,0 +1,457 @@
+"""
+Constant folding and algebraic simplification of the SIL AST.
+
+Runs between parsing (and Mini-SIL) and Generator.generate, and rewrites
+expressions the generator would otherwise compile one instruction per
+node:
+- operations on literals are evaluated, with the semantics of the
+  instructions the generator emits for them: uint arithmetic wraps at 32
+  bits, `/` is a signed division (OpSDiv), and float operations round to
+  IEEE float32 after every step
+- `const` names with a literal value are replaced by that value, and so
+  are variables declared once with a literal value and never assigned or
+  address-taken (&x) afterwards
+- identities: x + 0, x - 0, x * 1, x / 1, x | 0, x ^ 0, x << 0 and x >> 0
+  become x; x * 0, x & 0 and x % 1 become 0. For floats only the exact
+  ones are applied (x * 1.0, x / 1.0, x - 0.0)
+
+Results the generator could not have computed at compile time either are
+left alone: division by zero, shifts by 32 or more, float results that
+are not finite, float → uint casts out of range. Identities are applied
+only when the other operand is known to have the literal's type, so
+mismatched operands still reach the generator and its type error.
+"""
+
+import math
+import struct
+
+import sil_ast
+
+UINT_MASK = 0xFFFFFFFF
+
+_COMPARISONS = ('==', '!=', '<', '>', '<=', '>=')
+
+
+def fold_program(ast, nodes=None):
+    """
+    Folds the expressions of every kernel.
+
+    The input AST is not modified; unchanged subtrees are shared with the
+    result.
+
+    Args:
+        ast (list): Top-level AST nodes.
+        nodes: Expression node factory, as for Parser. Defaults to a plain
+            sil_ast.NodeFactory.
+
+    Returns:
+        list: The folded top-level AST nodes.
+    """
+    nodes = nodes or sil_ast.NodeFactory()
+    return [
+        _KernelFolder(node, nodes).fold() if isinstance(node, sil_ast.Kernel) else node
+        for node in ast
+    ]
+
+
+# === Evaluation ===
+
+def _literal_type(value):
+    """Returns 'uint' or 'float' for a literal the folder can evaluate, or None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return 'uint' if 0 <= value <= UINT_MASK else None
+    if isinstance(value, float):
+        return 'float' if _f32(value) is not None else None
+    return None
+
+
+def _f32(value):
+    """Rounds a float to float32, or returns None if it is not finite as one."""
+    try:
+        value = struct.unpack('f', struct.pack('f', value))[0]
+    except OverflowError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _signed(value):
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def _fold_binary(op, a, b):
+    """
+    Evaluates a binary operation on two literals of the same type.
+
+    Returns:
+        int or float or None: The result, or None if it cannot be folded.
+    """
+    if isinstance(a, int):
+        if op == '+':
+            return (a + b) & UINT_MASK
+        if op == '-':
+            return (a - b) & UINT_MASK
+        if op == '*':
+            return (a * b) & UINT_MASK
+        if op == '//':
+            return a // b if b else None
+        if op == '%':
+            return a % b if b else None
+        if op == '/':
+            sa, sb = _signed(a), _signed(b)
+            if sb == 0 or (sa == -2**31 and sb == -1):
+                return None
+            q = abs(sa) // abs(sb)
+            return (-q if (sa < 0) != (sb < 0) else q) & UINT_MASK
+        if op == '&':
+            return a & b
+        if op == '|':
+            return a | b
+        if op == '^':
+            return a ^ b
+        if op == '<<':
+            return (a << b) & UINT_MASK if b < 32 else None
+        if op == '>>':
+            return a >> b if b < 32 else None
+        return None
+
+    a, b = _f32(a), _f32(b)
+    if op == '+':
+        return _f32(a + b)
+    if op == '-':
+        return _f32(a - b)
+    if op == '*':
+        return _f32(a * b)
+    if op == '/':
+        return _f32(a / b) if b else None
+    return None
+
+
+def _fold_unary(op, a):
+    if isinstance(a, int):
+        if op == '-':
+            return -a & UINT_MASK
+        if op == '~':
+            return a ^ UINT_MASK
+        return None
+    if op == '-':
+        return -_f32(a)
+    return None
+
+
+def _fold_cast(a, target_type):
+    if isinstance(a, int):
+        if target_type == 'uint':
+            return a
+        if target_type == 'float':
+            return _f32(float(a))
+        return None
+    if target_type == 'float':
+        return _f32(a)
+    if target_type == 'uint':
+        value = math.trunc(_f32(a))
+        return value if 0 <= value <= UINT_MASK else None
+    return None
+
+
+def _identity(op, left, right, left_type, right_type):
+    """
+    Simplifies `left op right` when one side is a literal and the other
+    has the literal's type.
+
+    Returns:
+        The simplified node, a literal value for a constant result, or None.
+    """
+    lval = left.value if isinstance(left, sil_ast.Literal) else None
+    rval = right.value if isinstance(right, sil_ast.Literal) else None
+
+    if left_type == right_type == 'uint':
+        if op in ('+', '|', '^') and lval == 0:
+            return right
+        if op in ('+', '-', '|', '^', '<<', '>>') and rval == 0:
+            return left
+        if op == '*' and lval == 1:
+            return right
+        if op in ('*', '/', '//') and rval == 1:
+            return left
+        if op in ('*', '&') and (lval == 0 or rval == 0):
+            return 0
+        if op == '%' and rval == 1:
+            return 0
+        if op == '&' and lval == UINT_MASK:
+            return right
+        if op == '&' and rval == UINT_MASK:
+            return left
+        if op == '|' and UINT_MASK in (lval, rval):
+            return UINT_MASK
+
+    elif left_type == right_type == 'float':
+        if op == '*' and lval == 1.0:
+            return right
+        if op in ('*', '/') and rval == 1.0:
+            return left
+        if op == '-' and rval == 0.0 and math.copysign(1.0, rval) > 0:
+            return left     # x - 0.0 is x, even for x = -0.0; x - -0.0 is not (-0.0 - -0.0 is 0.0)
+
+    return None
+
+
+def _addresses_taken(stmt):
+    """Returns the names a statement takes the address of (&x), not counting nested blocks."""
+    if isinstance(stmt, sil_ast.Assign):
+        pending = [stmt.target, stmt.value]
+    elif isinstance(stmt, (sil_ast.VarDecl, sil_ast.ConstDecl, sil_ast.Return)):
+        pending = [stmt.value]
+    elif isinstance(stmt, sil_ast.If):
+        pending = [stmt.condition]
+    elif isinstance(stmt, sil_ast.For):
+        pending = [stmt.start, stmt.end]
+    else:
+        return ()
+
+    names = []
+    while pending:
+        expr = pending.pop()
+        if isinstance(expr, sil_ast.AddressOf) and isinstance(expr.expr, sil_ast.Ident):
+            names.append(expr.expr.name)
+        elif isinstance(expr, sil_ast.BinaryOp):
+            pending.extend((expr.left, expr.right))
+        elif isinstance(expr, sil_ast.Index):
+            pending.extend((expr.base, expr.index))
+        elif isinstance(expr, (sil_ast.UnaryOp, sil_ast.Dereference, sil_ast.AddressOf,
+                               sil_ast.BitwiseExpr, sil_ast.CastExpr)):
+            pending.append(expr.expr)
+    return names
+
+
+class _KernelFolder:
+    """
+    Folds one kernel. `types` maps every name declared in the kernel to its
+    type (None if it is declared with different types), `constants` the
+    names that stand for a literal to that literal.
+    """
+
+    def __init__(self, kernel, nodes):
+        self.kernel = kernel
+        self.nodes = nodes
+        self.types = {}
+        self.constants = {}
+
+    def declare(self, name, type_name):
+        if name in self.types and self.types[name] != type_name:
+            type_name = None
+        self.types[name] = type_name
+
+    def fold(self):
+        kernel = self.kernel
+        for p in kernel.params:
+            self.declare(p.name, p.param_type)
+
+        # Declarations, in source order of their enclosing blocks
+        decls = []
+        counts = {}
+        other_names = {p.name for p in kernel.params}
+        pending = list(kernel.body)
+        i = 0
+        while i < len(pending):
+            stmt = pending[i]
+            i += 1
+            if isinstance(stmt, sil_ast.VarDecl):
+                self.declare(stmt.name, stmt.var_type)
+            elif isinstance(stmt, sil_ast.ConstDecl):
+                self.declare(stmt.name, stmt.const_type)
+            elif isinstance(stmt, sil_ast.Assign) and isinstance(stmt.target, sil_ast.Ident):
+                other_names.add(stmt.target.name)
+            elif isinstance(stmt, sil_ast.For):
+                self.declare(stmt.var, 'uint')
+                other_names.add(stmt.var)
+                pending.extend(stmt.body)
+            elif isinstance(stmt, sil_ast.Loop):
+                pending.extend(stmt.body)
+            elif isinstance(stmt, sil_ast.If):
+                pending.extend(stmt.then_body)
+                pending.extend(stmt.else_body or ())
+            if isinstance(stmt, (sil_ast.VarDecl, sil_ast.ConstDecl)):
+                decls.append(stmt)
+                counts[stmt.name] = counts.get(stmt.name, 0) + 1
+            other_names.update(_addresses_taken(stmt))
+
+        # A const, or a var never assigned after its declaration, that is
+        # declared once with a literal value stands for that value
+        for stmt in decls:
+            if counts[stmt.name] != 1 or stmt.name in other_names or isinstance(stmt.value, sil_ast.Array):
+                continue
+            value = self.expr(stmt.value) if stmt.value is not None else None
+            if not isinstance(value, sil_ast.Literal):
+                continue
+            value_type = _literal_type(value.value)
+            if value_type and (isinstance(stmt, sil_ast.ConstDecl) or value_type == stmt.var_type):
+                self.constants[stmt.name] = value
+                self.types[stmt.name] = value_type
+
+        body = self.block(kernel.body)
+        if body is kernel.body:
+            return kernel
+        return sil_ast.Kernel(kernel.name, kernel.params, kernel.return_type, body)
+
+    # === Statements ===
+
+    def block(self, body):
+        """Folds a list of statements; returns `body` itself if nothing changed."""
+        out = [self.statement(stmt) for stmt in body]
+        if all(new is old for new, old in zip(out, body)):
+            return body
+        return out
+
+    def statement(self, stmt):
+        if isinstance(stmt, sil_ast.Assign):
+            target, value = self.expr(stmt.target), self.expr(stmt.value)
+            if target is not stmt.target or value is not stmt.value:
+                return sil_ast.Assign(target, value)
+        elif isinstance(stmt, sil_ast.VarDecl):
+            if stmt.value is not None and not isinstance(stmt.value, sil_ast.Array):
+                value = self.expr(stmt.value)
+                if value is not stmt.value:
+                    return sil_ast.VarDecl(stmt.name, stmt.var_type, value)
+        elif isinstance(stmt, sil_ast.ConstDecl):
+            value = self.constants.get(stmt.name) or self.expr(stmt.value)
+            if value is not stmt.value:
+                return sil_ast.ConstDecl(stmt.name, stmt.const_type, value)
+        elif isinstance(stmt, sil_ast.Return):
+            if stmt.value is not None:
+                value = self.expr(stmt.value)
+                if value is not stmt.value:
+                    return sil_ast.Return(value)
+        elif isinstance(stmt, sil_ast.If):
+            condition = self.expr(stmt.condition)
+            then_body = self.block(stmt.then_body)
+            else_body = self.block(stmt.else_body) if stmt.else_body is not None else None
+            if (condition is not stmt.condition or then_body is not stmt.then_body
+                    or else_body is not stmt.else_body):
+                return sil_ast.If(condition, then_body, else_body)
+        elif isinstance(stmt, sil_ast.Loop):
+            body = self.block(stmt.body)
+            if body is not stmt.body:
+                return sil_ast.Loop(body)
+        elif isinstance(stmt, sil_ast.For):
+            start, end, body = self.expr(stmt.start), self.expr(stmt.end), self.block(stmt.body)
+            if start is not stmt.start or end is not stmt.end or body is not stmt.body:
+                return sil_ast.For(stmt.var, start, end, body)
+        return stmt
+
+    # === Expressions ===
+
+    def expr(self, expr):
+        """
+        Folds an expression. Unchanged subtrees are returned as they are.
+
+        Walks the tree with an explicit stack, like the generator, so deep
+        expressions do not hit the recursion limit. Each value on the stack
+        is (node, type), with type None where it is not known.
+        """
+        nodes = self.nodes
+        values = []
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+
+            if isinstance(node, sil_ast.Literal):
+                values.append((node, _literal_type(node.value)))
+            elif isinstance(node, sil_ast.Builtin):
+                values.append((node, 'uint'))
+            elif isinstance(node, sil_ast.Ident):
+                if node.name in self.constants:
+                    values.append((self.constants[node.name], self.types[node.name]))
+                else:
+                    values.append((node, self.types.get(node.name)))
+            elif isinstance(node, sil_ast.AddressOf):
+                type_name = self.types.get(node.expr.name) if isinstance(node.expr, sil_ast.Ident) else None
+                values.append((node, type_name and 'ptr_' + type_name))
+            elif not ready:
+                stack.append((node, True))
+                if isinstance(node, sil_ast.BinaryOp):
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                elif isinstance(node, sil_ast.Index):
+                    stack.append((node.index, False))
+                    stack.append((node.base, False))
+                else:
+                    stack.append((node.expr, False))
+            elif isinstance(node, sil_ast.BinaryOp):
+                right, right_type = values.pop()
+                left, left_type = values.pop()
+                values.append(self.binary(node, left, right, left_type, right_type))
+            elif isinstance(node, sil_ast.Index):
+                index, _ = values.pop()
+                base, base_type = values.pop()
+                if base is not node.base or index is not node.index:
+                    node = nodes.Index(base, index)
+                values.append((node, base_type))   # element type of the array
+            else:
+                operand, operand_type = values.pop()
+                values.append(self.unary(node, operand, operand_type))
+
+        return values.pop()[0]
+
+    def binary(self, node, left, right, left_type, right_type):
+        op = node.op
+        if op in _COMPARISONS or op in ('&&', '||'):
+            result_type = 'bool'
+        else:
+            result_type = left_type if left_type == right_type else None
+
+        if isinstance(left, sil_ast.Literal) and isinstance(right, sil_ast.Literal) \
+                and left_type is not None and left_type == right_type:
+            value = _fold_binary(op, left.value, right.value)
+            if value is not None:
+                return self.nodes.Literal(value), left_type
+
+        simplified = _identity(op, left, right, left_type, right_type)
+        if isinstance(simplified, (int, float)):
+            return self.nodes.Literal(simplified), result_type
+        if simplified is not None:
+            return simplified, result_type
+
+        if left is not node.left or right is not node.right:
+            node = self.nodes.BinaryOp(left, op, right)
+        return node, result_type
+
+    def unary(self, node, operand, operand_type):
+        nodes = self.nodes
+        literal = operand_type in ('uint', 'float') and isinstance(operand, sil_ast.Literal)
+
+        if isinstance(node, sil_ast.BitwiseExpr):
+            # bitwise{ } only groups an expression; a folded one needs no group
+            if literal:
+                return operand, operand_type
+            if operand is not node.expr:
+                node = nodes.BitwiseExpr(operand)
+            return node, operand_type
+
+        if isinstance(node, sil_ast.UnaryOp):
+            if literal:
+                value = _fold_unary(node.op, operand.value)
+                if value is not None:
+                    return nodes.Literal(value), operand_type
+            if operand is not node.expr:
+                node = nodes.UnaryOp(node.op, operand)
+            return node, 'bool' if node.op == '!' else operand_type
+
+        if isinstance(node, sil_ast.CastExpr):
+            if operand_type == node.target_type:
+                return operand, operand_type    # the generator emits nothing either
+            if literal:
+                value = _fold_cast(operand.value, node.target_type)
+                if value is not None:
+                    return nodes.Literal(value), node.target_type
+            if operand is not node.expr:
+                node = nodes.CastExpr(operand, node.target_type)
+            return node, node.target_type
+
+        # Dereference
+        if operand is not node.expr:
+            node = nodes.Dereference(operand)
+        if operand_type and operand_type.startswith('ptr_'):
+            return node, operand_type[len('ptr_'):]
+        return node, None
@@ -1,156 +1,271 @@
 import sil_ast
 
+# === Operator tables ===
+#
+# Binary operators are resolved by their binding power from these tables,
+# instead of one function per precedence level.
 
-# === Logical / Binary Expressions (precedence-aware) ===
-
-def parse_logical_or(self):
-    """
-    Parses logical OR expressions (left-associative).
-    Example: a || b || c
-    """
-    left = self.parse_logical_and()
-    while self.peek() == '||':
-        op = self.next()
-        right = self.parse_logical_and()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
+LEFT, RIGHT = "left", "right"
 
 
-def parse_logical_and(self):
+class Grammar:
     """
-    Parses logical AND expressions.
-    Example: a && b && c
+    Operator table for one expression grammar.
+
+    Attributes:
+        name (str): Used in error messages.
+        binary (dict): Binary operator → (precedence, associativity).
+            Higher precedence binds tighter.
+        prefix (dict): Prefix operator → callable building the node from
+            (node factory, operator, operand).
+        blocks (bool): Whether 'bitwise { }' and 'cast { }' blocks may
+            appear as primaries.
     """
-    left = self.parse_equality()
-    while self.peek() == '&&':
-        op = self.next()
-        right = self.parse_equality()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
 
-
-def parse_equality(self):
+    __slots__ = ("name", "binary", "prefix", "blocks")
+
+    def __init__(self, name, binary, prefix, blocks):
+        self.name = name
+        self.binary = binary
+        self.prefix = prefix
+        self.blocks = blocks
+
+
+EXPRESSION = Grammar(
+    name="expression",
+    binary={
+        '||': (1, LEFT),
+        '&&': (2, LEFT),
+        '==': (3, LEFT), '!=': (3, LEFT),
+        '<': (4, LEFT), '>': (4, LEFT), '<=': (4, LEFT), '>=': (4, LEFT),
+        '+': (5, LEFT), '-': (5, LEFT),
+        '*': (6, LEFT), '/': (6, LEFT), '//': (6, LEFT), '%': (6, LEFT),
+    },
+    prefix={
+        '!': lambda nodes, op, operand: nodes.UnaryOp(op, operand),
+        '-': lambda nodes, op, operand: nodes.UnaryOp(op, operand),
+        '~': lambda nodes, op, operand: nodes.UnaryOp(op, operand),
+        '*': lambda nodes, op, operand: nodes.Dereference(operand),
+        '&': lambda nodes, op, operand: nodes.AddressOf(operand),
+    },
+    blocks=True,
+)
+
+# Inside 'bitwise { ... }' all operators share one left-associative level
+BITWISE = Grammar(
+    name="bitwise expression",
+    binary={
+        '&': (1, LEFT), '|': (1, LEFT), '^': (1, LEFT),
+        '<<': (1, LEFT), '>>': (1, LEFT),
+    },
+    prefix={
+        '~': lambda nodes, op, operand: nodes.UnaryOp(op, operand),
+        '-': lambda nodes, op, operand: nodes.UnaryOp(op, operand),
+    },
+    blocks=False,
+)
+
+
+# === Expression Parsing ===
+#
+# Expressions are parsed without recursion: operators and open groups
+# ('(', '[', 'bitwise {', 'cast {') live on an explicit stack, so nesting depth
+# is bounded by memory rather than by Python's recursion limit.
+
+# Operator stack entries, tagged by their first item:
+#   (_BINARY, precedence, associativity, op)
+#   (_PREFIX, build, op)
+#   (_GROUP, kind, enclosing_grammar, min_precedence)
+_BINARY, _PREFIX, _GROUP = 0, 1, 2
+
+# Group kinds
+_ROOT, _PAREN, _BITWISE_BLOCK, _CAST_BLOCK, _INDEX = 0, 1, 2, 3, 4
+
+# Minimum precedence that no binary operator reaches: stops after a unary expression
+_UNARY_ONLY = float("inf")
+
+
+def parse_expression(self, grammar=EXPRESSION, min_precedence=1):
     """
-    Parses equality and inequality expressions.
-    Example: a == b, a != b
+    Parses a binary expression whose operators all bind at least as
+    tightly as `min_precedence`.
+    Example: a + b * c || d
     """
-    left = self.parse_relational()
-    while self.peek() in ['==', '!=']:
-        op = self.next()
-        right = self.parse_relational()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
+    return _parse(self, grammar, min_precedence)
 
 
-def parse_relational(self):
-    """
-    Parses relational expressions.
-    Example: a < b, a >= c
+def _parse(self, grammar, min_precedence):
     """
-    left = self.parse_additive()
-    while self.peek() in ['<', '>', '<=', '>=']:
-        op = self.next()
-        right = self.parse_additive()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
+    Operator-precedence parser driven by an explicit stack.
 
+    Alternates between two positions:
+    - operand: pushes prefix operators and group openers, then reads one
+      atom (literal or identifier)
+    - operator: on '[', opens an index group on the operand just read;
+      on a binary operator, first reduces the stacked operators that
+      bind at least as tightly (prefix operators always do), then pushes
+      it; on anything else, closes the innermost group
 
-def parse_additive(self):
-    """
-    Parses addition and subtraction.
-    Example: a + b - c
+    The resulting tree is the same as precedence climbing would build.
     """
-    left = self.parse_multiplicative()
-    while self.peek() in ['+', '-']:
-        op = self.next()
-        right = self.parse_multiplicative()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
-
-
-def parse_multiplicative(self):
-    """
-    Parses multiplication, division, floor-division and modulo.
-    Example: a * b / c % d
-    """
-    left = self.parse_unary()
-    while self.peek() in ['*', '/', '//', '%']:
-        op = self.next()
-        right = self.parse_unary()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
+    # Lookahead goes straight to the token stream; only consumption goes
+    # through Parser.next() (which handles debug tracing).
+    peek = self.stream.peek
+    nodes = self.nodes
+    operands = []
+    group = (_GROUP, _ROOT, grammar, min_precedence)
+    ops = [group]
+    groups = [group]
+
+    while True:
+        # --- Operand position ---
+        tok = peek()
+        build = grammar.prefix.get(tok)
+        if build is not None:
+            ops.append((_PREFIX, build, self.next()))
+            continue
+        if tok == "(":
+            self.next()
+            group = (_GROUP, _PAREN, grammar, 1)
+        elif grammar.blocks and tok == "bitwise":
+            self.expect("bitwise")
+            self.expect("{")
+            group = (_GROUP, _BITWISE_BLOCK, grammar, 1)
+            grammar = BITWISE
+        elif grammar.blocks and tok == "cast":
+            self.expect("cast")
+            self.expect("{")
+            group = (_GROUP, _CAST_BLOCK, grammar, 1)
+            grammar = EXPRESSION
+        else:
+            operands.append(_parse_atom(self, grammar))
+            group = None
+        if group is not None:
+            ops.append(group)
+            groups.append(group)
+            group = None
+            continue
+
+        # --- Operator position ---
+        while True:
+            if peek() == "[":
+                # Indexing binds tighter than any prefix operator: a[i]
+                # applies to the operand on top of the stack
+                self.next()
+                group = (_GROUP, _INDEX, grammar, 1)
+                ops.append(group)
+                groups.append(group)
+                grammar = EXPRESSION
+                break
+
+            info = grammar.binary.get(peek())
+            if info is not None and info[0] >= groups[-1][3]:
+                precedence, associativity = info
+                top = ops[-1]
+                while top[0] != _GROUP and (
+                    top[0] == _PREFIX
+                    or top[1] > precedence
+                    or (top[1] == precedence and associativity == LEFT)
+                ):
+                    _reduce(nodes, ops.pop(), operands)
+                    top = ops[-1]
+                ops.append((_BINARY, precedence, associativity, self.next()))
+                break
+
+            # No operator continues the innermost group: close it
+            while ops[-1][0] != _GROUP:
+                _reduce(nodes, ops.pop(), operands)
+            _, kind, grammar, _ = ops.pop()
+            groups.pop()
+
+            if kind == _ROOT:
+                return operands.pop()
+            if kind == _PAREN:
+                if peek() != ")":
+                    raise Exception(f"Expected ')', but found '{peek()}'")
+                self.next()
+            elif kind == _INDEX:
+                self.expect("]")
+                index = operands.pop()
+                operands[-1] = nodes.Index(operands[-1], index)
+            elif kind == _BITWISE_BLOCK:
+                self.expect("}")
+                operands[-1] = nodes.BitwiseExpr(operands[-1])
+            else:
+                self.expect("as")
+                target_type = self.next()
+                self.expect("}")
+                operands[-1] = nodes.CastExpr(operands[-1], target_type)
+
+
+def _reduce(nodes, entry, operands):
+    """Applies one stacked operator to the operands on top of the operand stack."""
+    if entry[0] == _PREFIX:
+        operands[-1] = entry[1](nodes, entry[2], operands[-1])
+    else:
+        right = operands.pop()
+        operands[-1] = nodes.BinaryOp(operands[-1], entry[3], right)
 
 
 # === Unary & Primary Expressions ===
 
-def parse_unary(self):
-    """
-    Parses unary operators and dereferencing/address-of.
-    Supported: !, -, ~, *, &
-    """
-    tok = self.peek()
-    if tok == '!':
-        self.next()
-        return sil_ast.UnaryOp('!', self.parse_unary())
-    elif tok == '-':
-        self.next()
-        return sil_ast.UnaryOp('-', self.parse_unary())
-    elif tok == '~':
-        self.next()
-        return sil_ast.UnaryOp('~', self.parse_unary())
-    elif tok == '*':
-        self.next()
-        return sil_ast.Dereference(self.parse_unary())
-    elif tok == '&':
-        self.next()
-        return sil_ast.AddressOf(self.parse_unary())
-    else:
-        return self.parse_primary()
+def parse_unary(self, grammar=EXPRESSION):
+    """
+    Parses prefix operators followed by a primary expression.
+    Supported in expressions: !, -, ~, * (dereference), & (address-of)
+    Supported in bitwise blocks: ~, -
+    """
+    return _parse(self, grammar, _UNARY_ONLY)
 
 
-def parse_primary(self):
+def parse_primary(self, grammar=EXPRESSION):
     """
     Parses primary expressions:
     - literals
     - identifiers
     - grouped expressions in parentheses
-    - cast and bitwise blocks
-    """
-    tok = self.peek()
-
-    if tok == "bitwise":
-        return self.parse_bitwise_block()
-    if tok == "cast":
-        return self.parse_cast_block()
-    if tok == "(":
-        self.next()
-        expr = self.parse_expression()
-        if self.peek() != ")":
-            raise Exception(f"Expected ')', but found '{self.peek()}'")
-        self.next()
-        return expr
+    - cast and bitwise blocks (outside bitwise blocks only)
+    """
+    if self.stream.peek() in grammar.prefix:
+        raise Exception(f"Unexpected token in {grammar.name}: '{self.next()}'")
+    return _parse(self, grammar, _UNARY_ONLY)
+
 
+def _parse_atom(self, grammar):
+    """
+    Parses a literal, an identifier or a work-item function call such as
+    global_id(0).
+    """
     tok = self.next()
     if tok is None:
-        raise Exception("Unexpected end of input while parsing expression")
+        raise Exception(f"Unexpected end of input while parsing {grammar.name}")
 
     # Numeric literals: decimal, float, hex
     if isinstance(tok, str):
         try:
             if tok.startswith(("0x", "0X")):
-                return sil_ast.Literal(int(tok, 16))
+                return self.nodes.Literal(int(tok, 16))
             elif '.' in tok:
-                return sil_ast.Literal(float(tok))
+                return self.nodes.Literal(float(tok))
             elif tok.lstrip('-').isdigit():
-                return sil_ast.Literal(int(tok))
+                return self.nodes.Literal(int(tok))
         except ValueError:
             pass
 
+    # Work-item functions: the dimension is a literal 0, 1 or 2
+    if tok in sil_ast.BUILTINS and self.stream.peek() == "(":
+        self.expect("(")
+        dim = self.next()
+        if dim not in ("0", "1", "2"):
+            raise Exception(f"{tok}() takes a dimension 0, 1 or 2, got '{dim}'")
+        self.expect(")")
+        return self.nodes.Builtin(tok, int(dim))
+
     # Identifiers
     if self._is_identifier(tok):
-        return sil_ast.Ident(tok)
+        return self.nodes.Ident(tok)
 
-    raise Exception(f"Unexpected token in expression: '{tok}'")
+    raise Exception(f"Unexpected token in {grammar.name}: '{tok}'")
 
 
 # === Bitwise Block Expressions ===
@@ -162,71 +277,9 @@ def parse_bitwise_block(self):
     """
     self.expect("bitwise")
     self.expect("{")
-    expr = self.parse_bitwise_expression()
+    expr = parse_expression(self, BITWISE)
     self.expect("}")
-    return sil_ast.BitwiseExpr(expr)
-
-
-def parse_bitwise_expression(self):
-    """
-    Parses a chain of bitwise binary operations.
-    """
-    left = self.parse_bitwise_unary()
-    while self.peek() in ['&', '|', '^', '<<', '>>']:
-        op = self.next()
-        right = self.parse_bitwise_unary()
-        left = sil_ast.BinaryOp(left, op, right)
-    return left
-
-
-def parse_bitwise_unary(self):
-    """
-    Parses unary ops within a bitwise expression.
-    Supported: ~, -
-    """
-    tok = self.peek()
-    if tok in ['~', '-']:
-        self.next()
-        operand = self.parse_bitwise_unary()
-        return sil_ast.UnaryOp(tok, operand)
-    else:
-        return self.parse_bitwise_primary()
-
-
-def parse_bitwise_primary(self):
-    """
-    Parses literals and identifiers inside a bitwise block.
-    Supports parentheses to group expressions.
-    """
-    tok = self.peek()
-
-    if tok == "(":
-        self.next()
-        expr = self.parse_bitwise_expression()
-        if self.peek() != ")":
-            raise Exception(f"Expected ')', but found '{self.peek()}'")
-        self.next()
-        return expr
-
-    tok = self.next()
-    if tok is None:
-        raise Exception("Unexpected end of input in bitwise expression")
-
-    if isinstance(tok, str) and tok.isdigit():
-        return sil_ast.Literal(int(tok))
-
-    try:
-        if '.' in tok:
-            return sil_ast.Literal(float(tok))
-        if tok.lstrip('-').isdigit():
-            return sil_ast.Literal(int(tok))
-    except ValueError:
-        pass
-
-    if self._is_identifier(tok):
-        return sil_ast.Ident(tok)
-
-    raise Exception(f"Unexpected token in bitwise expression: '{tok}'")
+    return self.nodes.BitwiseExpr(expr)
 
 
 # === Cast Block ===
@@ -242,4 +295,4 @@ def parse_cast_block(self):
     self.expect("as")
     target_type = self.next()
     self.expect("}")
-    return sil_ast.CastExpr(expr, target_type)
+    return self.nodes.CastExpr(expr, target_type)
@@ -66,3 +66,64 @@ def parse_loop(self):
     self.expect("}")
 
     return sil_ast.Loop(body)
+
+
+def parse_for(self):
+    """
+    Parses a counted loop over a half-open integer range.
+
+    Syntax:
+        for i in range(start, end):
+            // body: the statements indented deeper than 'for'
+
+        for i in range(start, end) {
+            // body
+        }
+
+    range(end) is short for range(0, end).
+
+    Returns:
+        sil_ast.For: an AST node representing the loop.
+    """
+    location = self.stream.location()
+    self.expect("for")
+    var = self.next()
+    if not self._is_identifier(var):
+        raise Exception(f"Invalid loop variable: '{var}'")
+
+    self.expect("in")
+    self.expect("range")
+    self.expect("(")
+    start = self.parse_expression()
+    if self.peek() == ",":
+        self.next()
+        end = self.parse_expression()
+    else:
+        start, end = self.nodes.Literal(0), start
+    self.expect(")")
+
+    body = []
+    if self.peek() == "{":
+        self.next()
+        while self.peek() != "}":
+            if self.peek() is None:
+                raise Exception("Unexpected end of file inside 'for' body")
+            body.append(self.parse_statement())
+        self.expect("}")
+        return sil_ast.For(var, start, end, body)
+
+    self.expect(":")
+    if location is None:
+        raise Exception(
+            "An indented 'for' body needs token positions; "
+            "pass lexer.Token records or use a '{ }' body"
+        )
+
+    # The body ends at the first token not indented deeper than 'for'
+    column = location[1]
+    while self.peek() not in (None, "}") and self.stream.location()[1] > column:
+        body.append(self.parse_statement())
+    if not body:
+        raise Exception(f"Expected an indented block after 'for' on line {location[0]}")
+
+    return sil_ast.For(var, start, end, body)
@@ -27,19 +27,20 @@ def parse_kernel(self):
     # Optional debug: print the tokens inside the kernel body
     if self.debug:
         print(f"Kernel '{name}' - tokens in body:")
-        debug_pos = self.pos
+        offset = 0
         debug_tokens = []
         open_braces = 1  # We're already inside the opening '{'
 
         # Collect all tokens inside the kernel block (without the final '}')
-        while debug_pos < len(self.tokens) and open_braces > 0:
-            if self.tokens[debug_pos] == '{':
+        while self.peek(offset) is not None and open_braces > 0:
+            tok = self.peek(offset)
+            if tok == '{':
                 open_braces += 1
-            elif self.tokens[debug_pos] == '}':
+            elif tok == '}':
                 open_braces -= 1
             if open_braces > 0:
-                debug_tokens.append(self.tokens[debug_pos])
-            debug_pos += 1
+                debug_tokens.append(tok)
+            offset += 1
 
         print(debug_tokens)
 
@@ -70,7 +71,7 @@ def parse_kernel(self):
 def parse_params(self):
     """
     Parses the parameter list inside a kernel's parentheses:
-        (name1: type1, name2: type2, ...)
+        (name1: type1, name2: type2 = array[N][M], ...)
 
     Returns:
         list[sil_ast.Param]: list of parameter AST nodes.
@@ -84,7 +85,11 @@ def parse_params(self):
 
         self.expect(":")
         ptype = self.normalize_type(self.next())
-        params.append(sil_ast.Param(pname, ptype))
+        dims = None
+        if self.peek() == "=":
+            self.next()
+            dims = self.parse_array_dims()
+        params.append(sil_ast.Param(pname, ptype, dims))
 
         if self.peek() == ",":
             self.next()
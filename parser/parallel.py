@@ -0,0 +1,142 @@
+import contextlib
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lexer import _SPECIALS, iter_tokens
+from .parser import Parser
+
+
+# Finds only what the pre-scan needs: braces, block comments (skipped),
+# "@cpu" (the rest of the file is raw code) and 'kernel'. The pattern starts
+# with a character set so the regex engine can skip ahead quickly; a lone
+# '/', '@' or 'k' matches as well and is ignored. Whether 'kernel' is a
+# whole token is checked separately.
+_BOUNDARY_RE = re.compile(
+    r"[{}/@k](?:(?<=/)\*[\s\S]*?(?:\*/|\Z)|(?<=@)cpu(?!\w)|(?<=k)ernel)?"
+)
+
+# A character the lexer would glue to an adjacent word
+_WORD_CHAR_RE = re.compile(r"[^\s@" + _SPECIALS + r"]")
+
+
+def _is_whole_token(source_code, start, end):
+    """Checks that source_code[start:end] is lexed as a token of its own."""
+    if start and (source_code[start - 1] == "@" or _WORD_CHAR_RE.match(source_code, start - 1)):
+        return False
+    return not _WORD_CHAR_RE.match(source_code, end)
+
+
+def split_kernels(source_code):
+    """
+    Pre-scans the source and splits it at top-level kernel boundaries.
+
+    Every 'kernel ... { ... }' whose braces balance becomes its own chunk;
+    everything between kernels (e.g. the @cpu block) is kept as a separate
+    chunk. Chunks cover the whole source in order.
+
+    Args:
+        source_code (str): The SIL source code as a string.
+
+    Returns:
+        list[tuple[bool, str]]: (is_kernel, source text) per chunk.
+    """
+    chunks = []
+    start = 0           # source offset where the current chunk begins
+    kernel_start = None
+    depth = 0
+
+    for m in _BOUNDARY_RE.finditer(source_code):
+        text = m.group()
+        brace = text == "{" or text == "}"
+        if text == "@cpu":
+            break
+        if text == "kernel" and kernel_start is None and _is_whole_token(source_code, m.start(), m.end()):
+            kernel_start = m.start()
+            # Text before this kernel (other top-level statements)
+            if source_code[start:kernel_start].strip():
+                chunks.append((False, source_code[start:kernel_start]))
+        elif brace and kernel_start is not None:
+            depth += 1 if text == "{" else -1
+            if depth == 0:
+                start = m.end()
+                chunks.append((True, source_code[kernel_start:start]))
+                kernel_start = None
+
+    if kernel_start is not None:
+        # Unbalanced braces: the parser reports the error
+        chunks.append((True, source_code[kernel_start:]))
+    elif source_code[start:].strip():
+        chunks.append((False, source_code[start:]))
+    return chunks
+
+
+def _parse_chunk(text, nodes):
+    """
+    Worker entry point: parses one chunk.
+
+    Returns (ast, output), where output is what the parser printed (the
+    statements it reported and skipped), or None on a syntax error the
+    parser raises.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            ast = Parser(iter_tokens(text), nodes).parse()
+        except Exception:
+            return None
+    return ast, output.getvalue()
+
+
+def parse_parallel(source_code, jobs=None, nodes=None):
+    """
+    Parses a program, handing each top-level kernel to a process pool.
+
+    Results are merged back into one AST list in source order. If a
+    worker reports anything (a statement it skipped, a syntax error) or
+    cannot send its tree back (e.g. too deep to pickle), the whole program
+    is parsed again in this process: token positions and line numbers in
+    the messages then count from the start of the file, exactly as in a
+    serial parse. Programs with fewer than two kernels are parsed serially.
+
+    Args:
+        source_code (str): The SIL source code as a string.
+        jobs (int): Number of worker processes (defaults to os.cpu_count()).
+        nodes: Expression node factory, as for Parser. Each worker uses
+            its own copy.
+
+    Returns:
+        list: The top-level AST nodes.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs < 2:
+        return Parser(iter_tokens(source_code), nodes).parse()
+
+    chunks = split_kernels(source_code)
+    kernels = [text for is_kernel, text in chunks if is_kernel]
+    if len(kernels) < 2:
+        return Parser(iter_tokens(source_code), nodes).parse()
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(kernels))) as pool:
+        futures = [
+            pool.submit(_parse_chunk, text, nodes) if is_kernel else None
+            for is_kernel, text in chunks
+        ]
+
+        ast = []
+        for (is_kernel, text), future in zip(chunks, futures):
+            if future is None:
+                ast.extend(Parser(iter_tokens(text), nodes).parse())
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                result = None
+            if result is None or result[1]:
+                break
+            ast.extend(result[0])
+        else:
+            return ast
+
+    return Parser(iter_tokens(source_code), nodes).parse()
@@ -1,4 +1,6 @@
 import sil_ast
+from lexer import PackedTokens
+from .stream import ListTokenStream, PackedTokenStream, TokenStream
 from . import statements
 from . import flow
 from . import kernels
@@ -16,26 +18,45 @@ class Parser:
     - expressions.py: all expression handling
     """
 
-    def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
+    def __init__(self, tokens, nodes=None):
+        """
+        Args:
+            tokens: A list of tokens (strings or lexer.Token records),
+                a lexer.PackedTokens stream, or any iterable of tokens,
+                e.g. lexer.iter_tokens(source). Iterables are consumed
+                lazily through a bounded buffer.
+            nodes: Factory for expression nodes, e.g.
+                sil_ast.InterningNodeFactory() to share identical nodes.
+                Defaults to a plain sil_ast.NodeFactory.
+        """
+        if isinstance(tokens, list):
+            self.stream = ListTokenStream(tokens)
+        elif isinstance(tokens, PackedTokens):
+            self.stream = PackedTokenStream(tokens)
+        else:
+            self.stream = TokenStream(tokens)
         self.binary_operators = [
             '+', '-', '*', '/', '//', '%', '==', '!=',
             '<', '>', '<=', '>=', '&&', '||', '<<', '>>'
         ]
+        self.nodes = nodes or sil_ast.NodeFactory()
         self.debug = False
+        self.consumed = 0  # tokens consumed through next(); no rollback re-reads them
 
-    def peek(self):
-        """Returns the current token without consuming it."""
-        if self.pos < len(self.tokens):
-            return self.tokens[self.pos]
-        return None
+    @property
+    def pos(self):
+        """Absolute index of the current token."""
+        return self.stream.pos
+
+    def peek(self, offset=0):
+        """Returns the current token (or one further ahead) without consuming it."""
+        return self.stream.peek(offset)
 
     def next(self):
         """Consumes and returns the next token."""
-        tok = self.peek()
+        tok = self.stream.next()
         if tok is not None:
-            self.pos += 1
+            self.consumed += 1
             if self.debug:
                 print(f"Consumed token: {tok}")
         return tok
@@ -47,9 +68,7 @@ class Parser:
         """
         tok = self.next()
         if tok != expected:
-            start_pos = max(0, self.pos - 5)
-            end_pos = min(len(self.tokens), self.pos + 5)
-            context = self.tokens[start_pos:end_pos]
+            context = self.stream.context(5)
             raise Exception(f"Expected '{expected}', but got '{tok}'. Context: {context}")
 
     def normalize_type(self, typ):
@@ -108,6 +127,9 @@ class Parser:
     def parse_const_decl(self):
         return statements.parse_const_decl(self)
 
+    def parse_array_dims(self):
+        return statements.parse_array_dims(self)
+
     def parse_assign(self):
         return statements.parse_assign(self)
 
@@ -120,6 +142,9 @@ class Parser:
     def parse_loop(self):
         return flow.parse_loop(self)
 
+    def parse_for(self):
+        return flow.parse_for(self)
+
     def parse_kernel(self):
         return kernels.parse_kernel(self)
 
@@ -127,25 +152,7 @@ class Parser:
         return kernels.parse_params(self)
 
     def parse_expression(self):
-        return self.parse_logical_or()
-
-    def parse_logical_or(self):
-        return expressions.parse_logical_or(self)
-
-    def parse_logical_and(self):
-        return expressions.parse_logical_and(self)
-
-    def parse_equality(self):
-        return expressions.parse_equality(self)
-
-    def parse_relational(self):
-        return expressions.parse_relational(self)
-
-    def parse_additive(self):
-        return expressions.parse_additive(self)
-
-    def parse_multiplicative(self):
-        return expressions.parse_multiplicative(self)
+        return expressions.parse_expression(self)
 
     def parse_unary(self):
         return expressions.parse_unary(self)
@@ -157,13 +164,7 @@ class Parser:
         return expressions.parse_bitwise_block(self)
 
     def parse_bitwise_expression(self):
-        return expressions.parse_bitwise_expression(self)
-
-    def parse_bitwise_primary(self):
-        return expressions.parse_bitwise_primary(self)
-
-    def parse_bitwise_unary(self):
-        return expressions.parse_bitwise_unary(self)
+        return expressions.parse_expression(self, expressions.BITWISE)
 
     def parse_cast_block(self):
         return expressions.parse_cast_block(self)
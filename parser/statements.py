@@ -1,10 +1,15 @@
+import re
+
 import sil_ast
 
+_ASCII_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
 
 def parse_var_decl(self):
     """
     Parses a variable declaration of the form:
         var name: type = expression;
+        var name: type = array[N][M]...;
     Infers the correct type if the value is a literal.
     """
     self.expect("var")
@@ -15,7 +20,10 @@ def parse_var_decl(self):
     self.expect(":")
     declared_type = self.normalize_type(self.next())
     self.expect("=")
-    value = self.parse_expression()
+    if self.peek() == "array":
+        value = sil_ast.Array(parse_array_dims(self))
+    else:
+        value = self.parse_expression()
 
     if self.debug:
         print(f"Before expect(';'), pos={self.pos}, next token={self.peek()}")
@@ -32,6 +40,28 @@ def parse_var_decl(self):
     return sil_ast.VarDecl(name, declared_type, value)
 
 
+def parse_array_dims(self):
+    """
+    Parses the dimensions of an array type:
+        array[N][M]...
+    Every dimension must be a positive integer literal.
+
+    Returns:
+        tuple[int, ...]: The dimensions, outermost first.
+    """
+    self.expect("array")
+    dims = []
+    while True:
+        self.expect("[")
+        size = self.next()
+        if size is None or not size.isdigit() or int(size) == 0:
+            raise Exception(f"Array dimension must be a positive integer, found '{size}'")
+        dims.append(int(size))
+        self.expect("]")
+        if self.peek() != "[":
+            return tuple(dims)
+
+
 def parse_const_decl(self):
     """
     Parses a constant declaration of the form:
@@ -57,18 +87,37 @@ def parse_const_decl(self):
 
 def parse_assign(self):
     """
-    Parses a simple assignment:
+    Parses an assignment:
         x = expression;
+        *pointer_expression = expression;
     """
-    name = self.next()
-    if name is None:
-        raise Exception("Expected identifier at start of assignment")
-    if self.peek() != "=":
-        raise Exception(f"Expected '=' after '{name}', found '{self.peek()}'")
+    target = parse_assign_target(self)
     self.expect("=")
     value = self.parse_expression()
     self.expect(";")
-    return sil_ast.Assign(name, value)
+    return sil_ast.Assign(target, value)
+
+
+def parse_assign_target(self):
+    """
+    Parses the left-hand side of an assignment. One token of lookahead
+    picks the rule:
+        Ident ('[' expression ']')*
+        '*' unary_expression
+    """
+    if self.peek() == "*":
+        self.next()
+        return self.nodes.Dereference(self.parse_unary())
+
+    name = self.next()
+    if not self._is_identifier(name):
+        raise Exception(f"Expected identifier at start of assignment, found '{name}'")
+    target = self.nodes.Ident(name)
+    while self.peek() == "[":
+        self.next()
+        target = self.nodes.Index(target, self.parse_expression())
+        self.expect("]")
+    return target
 
 
 def parse_return(self):
@@ -87,7 +136,10 @@ def parse_return(self):
 def parse_statement(self):
     """
     Parses any valid statement: variable/const declarations, return, if, loop,
-    break, or assignment. Handles expressions and @cpu blocks.
+    for, break, or assignment. Handles expressions and @cpu blocks.
+
+    The first token alone decides which rule applies, so every statement
+    is parsed exactly once, without rollback.
     """
     tok = self.peek()
 
@@ -106,30 +158,18 @@ def parse_statement(self):
         return self.parse_if()
     elif tok == "loop":
         return self.parse_loop()
+    elif tok == "for":
+        return self.parse_for()
     elif tok == "break":
         self.next()
         self.expect(";")
         return sil_ast.Break()
     elif tok == "@cpu":
         return self.parse_cpu_block()
-    else:
-        # Handle potential assignment (identifier or pointer deref)
-        if self.peek() == "*" or self._is_identifier(self.peek()):
-            start_pos = self.pos
-            try:
-                lhs = self.parse_expression()
-                if self.peek() == "=":
-                    self.expect("=")
-                    rhs = self.parse_expression()
-                    self.expect(";")
-                    return sil_ast.Assign(lhs, rhs)
-                else:
-                    # Roll back if not a valid assignment
-                    self.pos = start_pos
-            except Exception:
-                self.pos = start_pos
-
-        raise Exception(f"Unexpected token: '{tok}' at position {self.pos}")
+    elif tok == "*" or self._is_identifier(tok):
+        return self.parse_assign()
+
+    raise Exception(f"Unexpected token: '{tok}' at position {self.pos}")
 
 
 def is_identifier(self, token):
@@ -139,6 +179,8 @@ def is_identifier(self, token):
     """
     if token is None or not isinstance(token, str):
         return False
+    if _ASCII_IDENTIFIER.fullmatch(token):
+        return True
     if not token:
         return False
     if not (token[0].isalpha() or token[0] == "_"):
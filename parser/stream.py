@@ -0,0 +1,180 @@
+from lexer import CODE_TEXTS
+
+
+class ListTokenStream:
+    """
+    Token source backed by a fully materialized list of tokens.
+
+    Tokens may be plain strings or lexer.Token records; peek() and next()
+    always return the token text.
+    """
+
+    def __init__(self, tokens):
+        if tokens and not isinstance(tokens[0], str):
+            self._locations = [(tok.line, tok.column) for tok in tokens]
+            tokens = [tok.text for tok in tokens]
+        else:
+            self._locations = None
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self, offset=0):
+        """Returns the token `offset` positions ahead without consuming it."""
+        i = self.pos + offset
+        if i < len(self.tokens):
+            return self.tokens[i]
+        return None
+
+    def next(self):
+        """Consumes and returns the next token."""
+        if self.pos < len(self.tokens):
+            tok = self.tokens[self.pos]
+            self.pos += 1
+            return tok
+        return None
+
+    def location(self, offset=0):
+        """Returns (line, column) of a token, or None if unknown."""
+        i = self.pos + offset
+        if self._locations is None or i >= len(self._locations):
+            return None
+        return self._locations[i]
+
+    def context(self, radius=5):
+        """Returns the tokens around the current position, for error messages."""
+        return self.tokens[max(0, self.pos - radius):self.pos + radius]
+
+
+class TokenStream:
+    """
+    Token source that pulls tokens lazily from an iterator.
+
+    Only a sliding window is kept in memory: tokens behind the current
+    position are dropped, apart from a few kept for error context. The
+    buffer is therefore bounded by the furthest lookahead the parser
+    performs, not by the size of the program.
+    """
+
+    def __init__(self, tokens, context=5):
+        self._source = iter(tokens)
+        self._texts = []        # buffered token texts
+        self._locations = []    # (line, column) per buffered token, or None
+        self._base = 0          # absolute index of self._texts[0]
+        self._context = context
+        self._exhausted = False
+        self.pos = 0
+
+    def _fill(self, index):
+        """Buffers tokens until absolute position `index` is available."""
+        while index - self._base >= len(self._texts):
+            if self._exhausted:
+                return False
+            tok = next(self._source, None)
+            if tok is None:
+                self._exhausted = True
+                return False
+            if isinstance(tok, str):
+                self._texts.append(tok)
+                self._locations.append(None)
+            else:
+                self._texts.append(tok.text)
+                self._locations.append((tok.line, tok.column))
+        return True
+
+    def _trim(self):
+        """Drops buffered tokens that can no longer be revisited."""
+        drop = self.pos - self._context - self._base
+        if drop > 64:
+            del self._texts[:drop]
+            del self._locations[:drop]
+            self._base += drop
+
+    def peek(self, offset=0):
+        """Returns the token `offset` positions ahead without consuming it."""
+        i = self.pos + offset
+        if i - self._base < len(self._texts) or self._fill(i):
+            return self._texts[i - self._base]
+        return None
+
+    def next(self):
+        """Consumes and returns the next token."""
+        tok = self.peek()
+        if tok is not None:
+            self.pos += 1
+            self._trim()
+        return tok
+
+    def location(self, offset=0):
+        """Returns (line, column) of a token, or None if unknown."""
+        i = self.pos + offset
+        if i - self._base < len(self._texts) or self._fill(i):
+            return self._locations[i - self._base]
+        return None
+
+    def context(self, radius=5):
+        """Returns the buffered tokens around the current position, for error messages."""
+        self._fill(self.pos + radius - 1)
+        start = max(self._base, self.pos - radius) - self._base
+        return self._texts[start:self.pos - self._base + radius]
+
+    @property
+    def buffered(self):
+        """Number of tokens currently held in memory."""
+        return len(self._texts)
+
+
+class PackedTokenStream:
+    """
+    Token source that reads a lexer.PackedTokens stream in place.
+
+    Operator and keyword tokens are resolved from their kind code alone;
+    identifiers and other variable lexemes are re-read from the source and
+    interned. The text of the current token is cached, since the parser
+    usually peeks at a token several times before consuming it.
+    """
+
+    def __init__(self, packed):
+        self.packed = packed
+        self._kinds = packed.kinds
+        self._texts = CODE_TEXTS
+        self._count = len(packed)
+        self._cached_index = -1
+        self._cached_text = None
+        self.pos = 0
+
+    def _text(self, i):
+        text = self._texts[self._kinds[i]]
+        if text is None:
+            if i != self._cached_index:
+                self._cached_text = self.packed.text(i)
+                self._cached_index = i
+            text = self._cached_text
+        return text
+
+    def peek(self, offset=0):
+        """Returns the token `offset` positions ahead without consuming it."""
+        i = self.pos + offset
+        if i < self._count:
+            return self._text(i)
+        return None
+
+    def next(self):
+        """Consumes and returns the next token."""
+        i = self.pos
+        if i < self._count:
+            self.pos = i + 1
+            return self._text(i)
+        return None
+
+    def location(self, offset=0):
+        """Returns (line, column) of a token, or None past the end."""
+        i = self.pos + offset
+        if i < self._count:
+            return self.packed.location(i)
+        return None
+
+    def context(self, radius=5):
+        """Returns the tokens around the current position, for error messages."""
+        start = max(0, self.pos - radius)
+        end = min(self._count, self.pos + radius)
+        return [self.packed.text(i) for i in range(start, end)]
@@ -1,5 +1,7 @@
 # runtime/host.py
 
+import os
+
 import pyopencl as cl
 import numpy as np
 
@@ -11,17 +13,30 @@ class HostRuntime:
 
     Provides helpers for:
     - Creating buffers
+    - Uploading NumPy arrays into the single buffer of an array parameter
     - Loading SPIR-V binaries
-    - Executing kernels with or without buffers
+    - Executing kernels with or without buffers, on one work-item or an
+      NDRange of them
     - Reading back data from device
+
+    The first OpenCL platform is used, unless SIL_OPENCL_PLATFORM names
+    another one: any part of its name, e.g. "Portable Computing Language"
+    or "pocl" for POCL's CPU device.
     """
 
     def __init__(self):
-        # Select the first available OpenCL platform and device
         platforms = cl.get_platforms()
         if not platforms:
             raise Exception("No OpenCL platforms found!")
 
+        wanted = os.environ.get("SIL_OPENCL_PLATFORM")
+        if wanted:
+            matching = [p for p in platforms if wanted.lower() in p.name.lower()]
+            if not matching:
+                names = ", ".join(p.name for p in platforms)
+                raise Exception(f"No OpenCL platform matches '{wanted}' (found: {names})")
+            platforms = matching
+
         self.platform = platforms[0]
         self.device = self.platform.get_devices()[0]
 
@@ -37,9 +52,16 @@ class HostRuntime:
             path (str): Path to a compiled .spv file.
         """
         with open(path, 'rb') as f:
-            binary = f.read()
+            self.load_spirv_binary(f.read())
 
-        self.program = cl.Program(self.context, [self.device], [binary]).build()
+    def load_spirv_binary(self, binary):
+        """
+        Build a SPIR-V binary held in memory, e.g. from generator.binary.encode().
+
+        Args:
+            binary (bytes or array): The SPIR-V module's words.
+        """
+        self.program = cl.Program(self.context, [self.device], [bytes(binary)]).build()
 
     def create_buffer(self, np_array, flags=cl.mem_flags.READ_WRITE):
         """
@@ -55,20 +77,58 @@ class HostRuntime:
         mf = cl.mem_flags
         return cl.Buffer(self.context, flags | mf.COPY_HOST_PTR, hostbuf=np_array)
 
-    def run_kernel(self, kernel_name, global_size, inputs):
+    def upload_array(self, np_array, dtype, flags=cl.mem_flags.READ_WRITE):
+        """
+        Upload a whole NumPy array into one buffer, as an array parameter
+        (e.g. `a: uint = array[128][128]`) expects it: the elements in
+        row-major order, so a[i][j] is element i * 128 + j.
+
+        Args:
+            np_array (array-like): Host data, of any shape.
+            dtype (np.dtype): Element type of the parameter (np.uint32 for
+                uint, np.float32 for float). Required: the data is converted
+                to it, so a wrong type would silently truncate or garble
+                the values.
+            flags (OpenCL flags): Optional memory flags.
+
+        Returns:
+            cl.Buffer: A buffer object ready to be passed to a kernel.
+        """
+        host = np.ascontiguousarray(np_array, dtype=dtype)
+        return self.create_buffer(host, flags)
+
+    def write_array(self, buf, np_array, dtype):
+        """
+        Overwrite an array parameter's buffer with new host data, without
+        allocating a new buffer.
+
+        Args:
+            buf (cl.Buffer): A buffer returned by upload_array().
+            np_array (array-like): Host data with the same number of elements.
+            dtype (np.dtype): Element type of the parameter, as for
+                upload_array().
+        """
+        host = np.ascontiguousarray(np_array, dtype=dtype)
+        cl.enqueue_copy(self.queue, buf, host)
+        self.queue.finish()
+
+    def run_kernel(self, kernel_name, global_size, inputs, local_size=None):
         """
         Run a kernel with the given input buffers.
 
         Args:
             kernel_name (str): The kernel function name.
-            global_size (int): Number of work-items to launch.
+            global_size (int or tuple): Number of work-items to launch, per
+                dimension.
             inputs (dict): A mapping of parameter names to cl.Buffer objects.
+            local_size (int or tuple): Work-group size, per dimension; None
+                lets the driver choose.
         """
         kernel = getattr(self.program, kernel_name)
         args = list(inputs.values())
         kernel.set_args(*args)
 
-        cl.enqueue_nd_range_kernel(self.queue, kernel, (global_size,), None)
+        cl.enqueue_nd_range_kernel(self.queue, kernel, _nd_range(global_size), _nd_range(local_size))
 
     def read_buffer(self, buf, dtype, shape):
         """
@@ -87,7 +147,7 @@ class HostRuntime:
         self.queue.finish()
         return output
 
-    def run_scalar(self, kernel_name, *scalar_args):
+    def run_scalar(self, kernel_name, *scalar_args, global_size=1, local_size=None):
         """
         Shortcut for running kernels that only take scalar values (no buffers).
 
@@ -97,24 +157,42 @@ class HostRuntime:
         Args:
             kernel_name (str): The kernel function name.
             *scalar_args: Positional scalar arguments.
+            global_size (int or tuple): Number of work-items, as in run().
+            local_size (int or tuple): Work-group size, as in run().
         """
         kernel = getattr(self.program, kernel_name)
         if scalar_args:
             kernel.set_args(*scalar_args)
 
-        cl.enqueue_nd_range_kernel(self.queue, kernel, (1,), None)
+        cl.enqueue_nd_range_kernel(self.queue, kernel, _nd_range(global_size), _nd_range(local_size))
         self.queue.finish()
 
-    def run(self, kernel_name, *args):
+    def run(self, kernel_name, *args, global_size=1, local_size=None):
         """
         Run a kernel with any positional arguments (scalar or buffer).
 
+        Example:
+            gpu.run("vector_add", a, b, c, global_size=1 << 20)
+
         Args:
             kernel_name (str): The kernel function name.
             *args: Positional arguments to pass to the kernel.
+            global_size (int or tuple): Number of work-items to launch, per
+                dimension; each reads its own index with global_id(d).
+            local_size (int or tuple): Work-group size, per dimension; None
+                lets the driver choose.
         """
         kernel = getattr(self.program, kernel_name)
         kernel.set_args(*args)
 
-        cl.enqueue_nd_range_kernel(self.queue, kernel, (1,), None)
+        cl.enqueue_nd_range_kernel(self.queue, kernel, _nd_range(global_size), _nd_range(local_size))
         self.queue.finish()
+
+
+def _nd_range(size):
+    """Returns a launch size as the tuple OpenCL takes: 1024 → (1024,)."""
+    if size is None or isinstance(size, tuple):
+        return size
+    if isinstance(size, int):
+        return (size,)
+    return tuple(size)
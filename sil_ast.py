@@ -1,4 +1,6 @@
 class VarDecl:
+    __slots__ = ("name", "var_type", "value")
+
     def __init__(self, name, var_type, value):
         self.name = name
         self.var_type = var_type
@@ -8,6 +10,8 @@ class VarDecl:
         return f"VarDecl(name={self.name}, type={self.var_type}, value={self.value})"
 
 class ConstDecl:
+    __slots__ = ("name", "const_type", "value")
+
     def __init__(self, name, const_type, value):
         self.name = name
         self.const_type = const_type
@@ -17,14 +21,21 @@ class ConstDecl:
         return f"ConstDecl(name={self.name}, type={self.const_type}, value={self.value})"
 
 class Param:
-    def __init__(self, name, param_type):
+    __slots__ = ("name", "param_type", "dims")
+
+    def __init__(self, name, param_type, dims=None):
         self.name = name
         self.param_type = param_type
+        self.dims = dims  # array dimensions, e.g. (2, 3), or None for scalars
 
     def __repr__(self):
+        if self.dims:
+            return f"Param(name={self.name}, type={self.param_type}, dims={self.dims})"
         return f"Param(name={self.name}, type={self.param_type})"
 
 class Kernel:
+    __slots__ = ("name", "params", "return_type", "body")
+
     def __init__(self, name, params, return_type, body):
         self.name = name
         self.params = params
@@ -35,6 +46,8 @@ class Kernel:
         return f"Kernel(name={self.name}, params={self.params}, return_type={self.return_type}, body={self.body})"
 
 class Return:
+    __slots__ = ("value",)
+
     def __init__(self, value=None):
         self.value = value
 
@@ -42,6 +55,8 @@ class Return:
         return f"Return(value={self.value})"
 
 class Assign:
+    __slots__ = ("target", "value")
+
     def __init__(self, target, value):
         self.target = target  # Ident ou Dereference
         self.value = value
@@ -49,6 +64,8 @@ class Assign:
         return f"Assign(target={self.target}, value={self.value})"
 
 class If:
+    __slots__ = ("condition", "then_body", "else_body")
+
     def __init__(self, condition, then_body, else_body=None):
         self.condition = condition
         self.then_body = then_body
@@ -58,21 +75,41 @@ class If:
         return f"If(condition={self.condition}, then_body={self.then_body}, else_body={self.else_body})"
 
 class Loop:
+    __slots__ = ("body",)
+
     def __init__(self, body):
         self.body = body
 
     def __repr__(self):
         return f"Loop(body={self.body})"
 
+class For:
+    __slots__ = ("var", "start", "end", "body")
+
+    def __init__(self, var, start, end, body):
+        self.var = var      # name of the induction variable
+        self.start = start
+        self.end = end      # exclusive
+        self.body = body
+
+    def __repr__(self):
+        return f"For(var={self.var}, start={self.start}, end={self.end}, body={self.body})"
+
 class Break:
+    __slots__ = ()
+
     def __repr__(self):
         return "Break()"
 
 class Continue:
+    __slots__ = ()
+
     def __repr__(self):
         return "Continue()"
 
 class BinaryOp:
+    __slots__ = ("left", "op", "right")
+
     def __init__(self, left, op, right):
         self.left = left
         self.op = op
@@ -82,6 +119,8 @@ class BinaryOp:
         return f"BinaryOp(left={self.left}, op='{self.op}', right={self.right})"
 
 class UnaryOp:
+    __slots__ = ("op", "expr")
+
     def __init__(self, op, expr):
         self.op = op
         self.expr = expr
@@ -90,6 +129,8 @@ class UnaryOp:
         return f"UnaryOp(op='{self.op}', expr={self.expr})"
 
 class Literal:
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -97,13 +138,49 @@ class Literal:
         return f"Literal(value={self.value})"
 
 class Ident:
+    __slots__ = ("name",)
+
     def __init__(self, name):
         self.name = name
 
     def __repr__(self):
         return f"Ident(name={self.name})"
 
+class Builtin:
+    __slots__ = ("name", "dim")
+
+    def __init__(self, name, dim):
+        self.name = name    # one of BUILTINS, e.g. "global_id"
+        self.dim = dim      # 0, 1 or 2
+
+    def __repr__(self):
+        return f"Builtin(name={self.name}, dim={self.dim})"
+
+# Work-item functions, called with a dimension: global_id(0)
+BUILTINS = ("global_id", "local_id", "group_id", "global_size", "local_size", "num_groups")
+
+class Index:
+    __slots__ = ("base", "index")
+
+    def __init__(self, base, index):
+        self.base = base    # Ident, or Index for further dimensions
+        self.index = index
+
+    def __repr__(self):
+        return f"Index(base={self.base}, index={self.index})"
+
+class Array:
+    __slots__ = ("dims",)
+
+    def __init__(self, dims):
+        self.dims = dims    # e.g. (2, 3) for array[2][3]
+
+    def __repr__(self):
+        return f"Array(dims={self.dims})"
+
 class CpuBlock:
+    __slots__ = ("code",)
+
     def __init__(self, code):
         self.code = code
 
@@ -111,22 +188,120 @@ class CpuBlock:
         return f"CpuBlock(code={self.code})"
 
 class BitwiseExpr:
+    __slots__ = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
 
 class CastExpr:
+    __slots__ = ("expr", "target_type")
+
     def __init__(self, expr, target_type):
         self.expr = expr
         self.target_type = target_type
 
 class Dereference:
+    __slots__ = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
     def __repr__(self):
         return f"Dereference({self.expr})"
 
 class AddressOf:
+    __slots__ = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
     def __repr__(self):
         return f"AddressOf({self.expr})"
+
+
+class NodeFactory:
+    """
+    Builds expression nodes for the parser. Every call creates a new node.
+    """
+    __slots__ = ()
+
+    Literal = Literal
+    Ident = Ident
+    Builtin = Builtin
+    BinaryOp = BinaryOp
+    UnaryOp = UnaryOp
+    Dereference = Dereference
+    AddressOf = AddressOf
+    BitwiseExpr = BitwiseExpr
+    CastExpr = CastExpr
+    Index = Index
+
+
+class InterningNodeFactory(NodeFactory):
+    """
+    Builds expression nodes, sharing identical ones.
+
+    Literal, Ident and Builtin nodes with the same value are always shared. With
+    hash_cons=True, identical expression subtrees are shared as well, so a
+    subexpression repeated across an unrolled kernel exists only once.
+
+    Shared nodes must be treated as immutable: passes that rewrite the tree
+    have to build new nodes instead of assigning to existing ones.
+    """
+    __slots__ = ("hash_cons", "_leaves", "_trees")
+
+    def __init__(self, hash_cons=False):
+        self.hash_cons = hash_cons
+        self._leaves = {}
+        self._trees = {}
+
+    def Literal(self, value):
+        # repr keeps 1 and 1.0 (and 0.0 and -0.0) apart
+        key = (Literal, repr(value))
+        node = self._leaves.get(key)
+        if node is None:
+            node = self._leaves[key] = Literal(value)
+        return node
+
+    def Ident(self, name):
+        key = (Ident, name)
+        node = self._leaves.get(key)
+        if node is None:
+            node = self._leaves[key] = Ident(name)
+        return node
+
+    def Builtin(self, name, dim):
+        key = (Builtin, name, dim)
+        node = self._leaves.get(key)
+        if node is None:
+            node = self._leaves[key] = Builtin(name, dim)
+        return node
+
+    def _shared(self, cls, *fields):
+        # Children come from this factory, so their identity is their value
+        if not self.hash_cons:
+            return cls(*fields)
+        key = (cls,) + tuple(f if isinstance(f, str) else id(f) for f in fields)
+        node = self._trees.get(key)
+        if node is None:
+            node = self._trees[key] = cls(*fields)
+        return node
+
+    def BinaryOp(self, left, op, right):
+        return self._shared(BinaryOp, left, op, right)
+
+    def UnaryOp(self, op, expr):
+        return self._shared(UnaryOp, op, expr)
+
+    def Dereference(self, expr):
+        return self._shared(Dereference, expr)
+
+    def AddressOf(self, expr):
+        return self._shared(AddressOf, expr)
+
+    def BitwiseExpr(self, expr):
+        return self._shared(BitwiseExpr, expr)
+
+    def CastExpr(self, expr, target_type):
+        return self._shared(CastExpr, expr, target_type)
+
+    def Index(self, base, index):
+        return self._shared(Index, base, index)
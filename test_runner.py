@@ -2,6 +2,8 @@ import subprocess
 import sys
 import os
 import glob
+import shutil
+import struct
 
 # ANSI escape codes for terminal color formatting
 RED = "\033[91m"
@@ -30,12 +32,91 @@ def run_command(command, description):
         return False, e.stdout.strip(), e.stderr.strip()
 
 
+def _normalize_number(word):
+    """
+    Writes a numeric literal the way both the generator and spirv-dis can
+    be compared: integers as 32-bit words, floats rounded to float32 (the
+    generator writes 1.0 or 0.1 where spirv-dis may write 1 or 0.100000001).
+    Other words are returned unchanged.
+    """
+    try:
+        return str(int(word) & 0xFFFFFFFF)
+    except ValueError:
+        pass
+    try:
+        value = float.fromhex(word) if word.lower().lstrip("-+").startswith("0x") else float(word)
+        value = struct.unpack("<f", struct.pack("<f", value))[0]
+    except (ValueError, OverflowError):
+        return word
+    if value != value or value in (float("inf"), float("-inf")):
+        return word
+    return str(int(value) & 0xFFFFFFFF) if value.is_integer() else repr(value)
+
+
+def _normalize_asm(text):
+    """
+    Returns the instruction lines of SPIR-V assembly, comments dropped and
+    numeric literals normalized.
+    """
+    lines = []
+    for line in text.splitlines():
+        if line and not line.startswith(";"):
+            lines.append(" ".join(_normalize_number(word) for word in line.split()))
+    return lines
+
+
+def check_roundtrip(test_file):
+    """
+    Encodes a test program in-process and disassembles the binary with
+    spirv-dis; the result must match the generator's own assembly.
+
+    Parameters:
+        test_file (str): Path of the .sil file.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    import lexer
+    import sil_ast
+    from generator import generator
+    from generator.binary import encode
+    from minisil_ast import expand_program
+    from optimizer.fold import fold_program
+    from parser import parser
+
+    with open(test_file, "r", encoding="utf-8") as f:
+        source = f.read()
+    ast = fold_program(expand_program(parser.Parser(lexer.iter_tokens(source)).parse()))
+    kernels = [n for n in ast if not isinstance(n, sil_ast.CpuBlock)]
+    if not kernels:
+        return True, "no kernels"
+    module = generator.Generator().generate_module(kernels)
+
+    result = subprocess.run(
+        ["spirv-dis", "--raw-id", "--no-header", "--no-indent", "-"],
+        input=encode(module).tobytes(), capture_output=True,
+    )
+    if result.returncode != 0:
+        return False, result.stderr.decode(errors="replace").strip()
+
+    expected = _normalize_asm(module.text())
+    actual = _normalize_asm(result.stdout.decode())
+    for i, (want, got) in enumerate(zip(expected, actual)):
+        if want != got:
+            return False, f"instruction {i}: expected '{want}', spirv-dis gave '{got}'"
+    if len(expected) != len(actual):
+        return False, f"{len(expected)} instructions expected, spirv-dis gave {len(actual)}"
+    return True, f"{len(expected)} instructions"
+
+
 def main():
     """
     Entry point for the SIL test runner.
 
     - Finds all `.sil` test files recursively under `sil_tests/`
     - Runs each test via `main.py`
+    - If spirv-dis is installed, checks that the in-process binary encoding
+      of each test disassembles to the generator's assembly
     - Collects and reports passed/failed results
     - Exits with code 1 if any test fails
     """
@@ -47,6 +128,10 @@ def main():
         print(f"{RED}No test files found in sil_tests/**/*{RESET}")
         return
 
+    # Validate with spirv-val too where it is installed; the built-in
+    # validator alone otherwise
+    validate_mode = "full" if shutil.which("spirv-val") else "fast"
+
     passed = []  # List of test files that passed
     failed = []  # List of test files that failed
 
@@ -54,7 +139,7 @@ def main():
     for test_file in sorted(test_files):
         print(f"\n{YELLOW}>> Running test: {test_file}{RESET}")
         ok, stdout, stderr = run_command(
-            f"python main.py {test_file}",
+            f"python main.py {test_file} --validate {validate_mode}",
             f"Compiling and executing {os.path.basename(test_file)}",
         )
 
@@ -73,6 +158,24 @@ def main():
                 print(stderr)
             failed.append(test_file)
 
+    # Binary encoding round trip, where spirv-dis is available
+    if shutil.which("spirv-dis"):
+        print(f"\n{YELLOW}==== SPIR-V BINARY ROUND TRIP (spirv-dis) ===={RESET}")
+        for test_file in sorted(test_files):
+            try:
+                ok, message = check_roundtrip(test_file)
+            except Exception as e:
+                ok, message = False, f"{type(e).__name__}: {e}"
+            name = f"{test_file} (round trip)"
+            if ok:
+                print(f"{GREEN}✓ Passed:{RESET} {name}: {message}")
+                passed.append(name)
+            else:
+                print(f"{RED}✗ Failed:{RESET} {name}: {message}")
+                failed.append(name)
+    else:
+        print(f"\n{YELLOW}spirv-dis not found: skipping the binary round trip{RESET}")
+
     # Summary report
     print(f"\n{YELLOW}==== TEST SUMMARY ===={RESET}")
     print(f"{GREEN}✓ Passed ({len(passed)}):{RESET}")